@@ -1,9 +1,24 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+import json
 import logging
 import os
 from backend.services.extractor import ContentExtractor
 from backend.services.processor import ContentProcessor
+from backend.services.ingestion import IngestionPipeline
+from backend.services.http_cache import HTTPCache
+from backend.services.document import ProcessedDocument
+from backend.services.document_store import DocumentStore
+from backend.services.jobs import JobQueue
+from backend.services.crawler import Crawler
+from backend.services.dedup import Deduplicator
+from backend.services.lexical_index import LexicalIndex
+from backend.services.embedding_store import EmbeddingStore
+from backend.services.ann_index import IVFIndex
+from backend.services.retrieval import HybridRetriever
+from backend.services.cascade import ModelCascade
+from backend.services.answer_cache import AnswerCache
+from backend.services.model_registry import ModelRegistry, LazyModel, resident_bytes
 from backend.services.qa_model import QuestionAnsweringModel
 
 # Optional import of alternative models
@@ -31,6 +46,12 @@ try:
 except ImportError:
     SENTENCE_TRANSFORMER_AVAILABLE = False
 
+try:
+    from backend.services.encoder_pool import EncoderPool
+    ENCODER_POOL_AVAILABLE = True
+except ImportError:
+    ENCODER_POOL_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -53,84 +74,348 @@ app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # Initialize services
-extractor = ContentExtractor()
+extractor = ContentExtractor(
+    max_per_host=int(os.environ.get('EXTRACT_MAX_PER_HOST', 4)),
+    engine=os.environ.get('EXTRACTOR_ENGINE', 'html2text'),
+    max_bytes=int(os.environ.get('EXTRACT_MAX_BYTES', 5 * 1024 * 1024))
+)
 processor = ContentProcessor()
-qa_model = QuestionAnsweringModel()
+# Processed documents, persisted so restarted and forked workers can reuse them
+document_store = DocumentStore(
+    os.environ.get('DOCUMENT_STORE_PATH', os.path.join('data', 'documents.sqlite3')),
+    memory_budget=int(os.environ.get('DOCUMENT_STORE_MEMORY_MB', 64)) * 1024 * 1024
+)
+# Sentence and chunk embeddings computed at ingestion, memory-mapped and keyed by content hash
+embedding_store = EmbeddingStore(
+    os.environ.get('EMBEDDING_STORE_DIR', os.path.join('data', 'embeddings')),
+    dtype=os.environ.get('EMBEDDING_DTYPE', 'float16')
+)
+if os.environ.get('EMBEDDING_GC', '1') != '0':
+    # Drop matrices of page versions replaced while the app was down, and of pasted text
+    embedding_store.collect(document_store.content_hashes())
+# BM25 postings of ingested documents, built at ingestion and shared by the lexical QA backends
+lexical_index = LexicalIndex(store=document_store)
+pipeline = IngestionPipeline(
+    extractor,
+    processor,
+    max_workers=int(os.environ.get('EXTRACT_WORKERS', 8)),
+    cache=HTTPCache(
+        os.environ.get('HTTP_CACHE_PATH', os.path.join('data', 'http_cache.sqlite3')),
+        max_bytes=int(os.environ.get('HTTP_CACHE_MAX_MB', 256)) * 1024 * 1024
+    ),
+    store=document_store,
+    # Pages and paragraphs (sidebars, banners, footers) repeated across URLs are stored once
+    deduplicator=Deduplicator(
+        os.environ.get('DEDUP_PATH', os.path.join('data', 'fingerprints.sqlite3')),
+        document_distance=int(os.environ.get('DEDUP_DOCUMENT_DISTANCE', 6)),
+        paragraph_distance=int(os.environ.get('DEDUP_PARAGRAPH_DISTANCE', 3))
+    ) if os.environ.get('DEDUP_ENABLED', '1') != '0' else None,
+    lexical_index=lexical_index,
+    embedding_store=embedding_store
+)
+# Same-site crawls, kept polite with their own per-host concurrency and rate limits
+crawler = Crawler(
+    pipeline,
+    max_per_host=int(os.environ.get('CRAWL_MAX_PER_HOST', 2)),
+    min_interval=float(os.environ.get('CRAWL_MIN_INTERVAL', 0.5))
+)
+CRAWL_MAX_PAGES = int(os.environ.get('CRAWL_MAX_PAGES', 500))
+CRAWL_MAX_DEPTH = int(os.environ.get('CRAWL_MAX_DEPTH', 5))
+# Background ingestion jobs, persisted so they survive a restart
+job_queue = JobQueue(
+    os.environ.get('JOB_QUEUE_PATH', os.path.join('data', 'jobs.sqlite3')),
+    pipeline,
+    processor,
+    max_workers=int(os.environ.get('JOB_WORKERS', 2)),
+    crawler=crawler
+)
+# Candidate passages for every backend: BM25, re-ranked with embeddings by the dense backends
+retriever = HybridRetriever(
+    lexical_index,
+    candidates=int(os.environ.get('RETRIEVAL_CANDIDATES', 50)),
+    rrf_k=int(os.environ.get('RETRIEVAL_RRF_K', 60)),
+    dense=os.environ.get('RETRIEVAL_DENSE', '1') != '0'
+)
 
-# Initialize TensorFlow model if available
-tensorflow_model = None
-if TENSORFLOW_AVAILABLE:
-    try:
-        tensorflow_model = TensorFlowQuestionAnsweringModel()
-        logger.info("TensorFlow model initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize TensorFlow model: {str(e)}")
-        tensorflow_model = None
+ANN_MIN_CHUNKS = int(os.environ.get('ANN_MIN_CHUNKS', 2000))
 
-# Initialize NLTK Advanced model if available
-nltk_model = None
-if NLTK_ADVANCED_AVAILABLE:
-    try:
-        nltk_model = NLTKQuestionAnsweringModel()
-        logger.info("NLTK Advanced model initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize NLTK Advanced model: {str(e)}")
-        nltk_model = None
+# CPU inference engine of the transformer models: torch, onnx or onnx-int8
+INFERENCE_OPTIONS = {
+    'engine': os.environ.get('INFERENCE_ENGINE', 'torch'),
+    'intra_op_threads': int(os.environ.get('ONNX_INTRA_OP_THREADS', 0)) or None,
+    'inter_op_threads': int(os.environ.get('ONNX_INTER_OP_THREADS', 0)) or None
+}
+# Concurrent requests share forward passes: a request waits up to INFERENCE_BATCH_WAIT_MS for others
+BATCHING_OPTIONS = {
+    'batch_wait_ms': float(os.environ.get('INFERENCE_BATCH_WAIT_MS', 5))
+        if os.environ.get('INFERENCE_BATCHING', '1') != '0' else None,
+    'max_batch_size': int(os.environ.get('INFERENCE_MAX_BATCH', 32))
+}
 
-# Initialize DistilBERT model if available
-distilbert_model = None
-if DISTILBERT_AVAILABLE:
-    try:
-        distilbert_model = DistilBERTQuestionAnsweringModel()
-        logger.info("DistilBERT model initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize DistilBERT model: {str(e)}")
-        distilbert_model = None
+# One copy of each sentence encoder and one embedding cache for the backends built on it
+encoder_pool = EncoderPool(
+    cache_bytes=int(os.environ.get('EMBEDDING_CACHE_MB', 64)) * 1024 * 1024,
+    **INFERENCE_OPTIONS,
+    **BATCHING_OPTIONS
+) if ENCODER_POOL_AVAILABLE else None
+
+def create_ann_index(name, namespace):
+    """
+    Create the persistent ANN index of a dense backend's chunk embeddings
+    
+    Args:
+        name (str): Backend name, used for the file name
+        namespace (str): Embedding store namespace of the indexed chunks
+        
+    Returns:
+        IVFIndex: Index, or None when disabled with ANN_ENABLED=0
+    """
+    if os.environ.get('ANN_ENABLED', '1') == '0':
+        return None
+    return IVFIndex(
+        os.path.join(os.environ.get('ANN_DIR', os.path.join('data', 'ann')), f"{name}.sqlite3"),
+        embedding_store,
+        namespace,
+        n_lists=int(os.environ.get('ANN_LISTS', 256)),
+        n_probe=int(os.environ.get('ANN_PROBE', 8)),
+        min_train_size=int(os.environ.get('ANN_MIN_TRAIN_SIZE', 4096)),
+        # int8 or binary vectors hold 2-16x more chunks in memory, rescored at full precision
+        quantization=os.environ.get('ANN_QUANTIZATION', 'float16'),
+        rescore=int(os.environ.get('ANN_RESCORE', 0)) or None,
+        compact_ratio=float(os.environ.get('ANN_COMPACT_RATIO', 0.25))
+    )
+
+# Backends by model_type, built on first use and unloaded when idle or over the memory budget
+models = ModelRegistry(
+    idle_ttl=float(os.environ.get('MODEL_IDLE_TTL', 0)) or None,
+    memory_budget=int(os.environ.get('MODEL_MEMORY_MB', 0)) * 1024 * 1024 or None
+)
 
-# Initialize SentenceTransformer model if available
-sentence_transformer_model = None
+def create_qa_model():
+    return QuestionAnsweringModel(retriever=retriever)
+
+def create_tensorflow_model():
+    tensorflow_model = TensorFlowQuestionAnsweringModel(
+        embedding_store=embedding_store, ann_min_chunks=ANN_MIN_CHUNKS, retriever=retriever,
+        encoder_pool=encoder_pool
+    )
+    # Large multi-page requests search the chunks through an IVF index instead of exhaustively
+    tensorflow_model.ann_index = create_ann_index('tensorflow', tensorflow_model.chunk_namespace())
+    return tensorflow_model
+
+def create_nltk_model():
+    return NLTKQuestionAnsweringModel(retriever=retriever)
+
+def create_distilbert_model():
+    return DistilBERTQuestionAnsweringModel(
+        retriever=retriever,
+        batch_size=int(os.environ.get('DISTILBERT_BATCH_SIZE', 8)),
+        num_threads=int(os.environ.get('DISTILBERT_THREADS', 0)) or None,
+        reader=os.environ.get('DISTILBERT_READER', 'window'),
+        reader_chunks=int(os.environ.get('DISTILBERT_READER_CHUNKS', 3)),
+        doc_stride=int(os.environ.get('DISTILBERT_DOC_STRIDE', 128)),
+        max_answer_length=int(os.environ.get('DISTILBERT_MAX_ANSWER_LENGTH', 30)),
+        onnx_dir=os.environ.get('ONNX_DIR', os.path.join('data', 'onnx')),
+        **INFERENCE_OPTIONS,
+        **BATCHING_OPTIONS
+    )
+
+def create_sentence_transformer_model():
+    sentence_transformer_model = SentenceTransformerQuestionAnsweringModel(
+        embedding_store=embedding_store, ann_min_chunks=ANN_MIN_CHUNKS, retriever=retriever,
+        encoder_pool=encoder_pool
+    )
+    # Large multi-page requests search the chunks through an IVF index instead of exhaustively
+    sentence_transformer_model.ann_index = create_ann_index('sentence_transformer', sentence_transformer_model.chunk_namespace())
+    return sentence_transformer_model
+
+def index_with(name):
+    """
+    Ingestion indexer precomputing a dense backend's embeddings while it is loaded
+    
+    Documents ingested while the backend is unloaded are embedded on their
+    first question instead, and searched exactly rather than through the index.
+    """
+    def indexer(url, document):
+        model = models.loaded(name)
+        if model is not None:
+            model.index_document(url, document)
+    return indexer
+
+models.register('default', create_qa_model)
+if TENSORFLOW_AVAILABLE:
+    models.register('tensorflow', create_tensorflow_model)
+    pipeline.add_indexer(index_with('tensorflow'))
+if NLTK_ADVANCED_AVAILABLE:
+    models.register('nltk-advanced', create_nltk_model)
+if DISTILBERT_AVAILABLE:
+    models.register('distilbert', create_distilbert_model)
 if SENTENCE_TRANSFORMER_AVAILABLE:
-    try:
-        sentence_transformer_model = SentenceTransformerQuestionAnsweringModel()
-        logger.info("SentenceTransformer model initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize SentenceTransformer model: {str(e)}")
-        sentence_transformer_model = None
+    models.register('sentence-transformer', create_sentence_transformer_model)
+    pipeline.add_indexer(index_with('sentence-transformer'))
 
-# In-memory content store (in a real app, consider using a database)
-extracted_content = {}
+# Backends loaded at startup rather than on their first request, e.g. MODEL_PRELOAD=default
+for name in filter(None, os.environ.get('MODEL_PRELOAD', '').split(',')):
+    with models.use(name.strip()):
+        pass
+
+def parse_cascade_stages(spec):
+    """
+    Build the stages of the 'auto' model
+    
+    Args:
+        spec (str): Comma-separated model_type:threshold pairs, cheapest first,
+            e.g. "default:0.6,sentence-transformer:0.5,distilbert:0"
+        
+    Returns:
+        list: (model_type, model, threshold) tuples of the available backends
+    """
+    stages = []
+    for item in spec.split(','):
+        name, _, threshold = item.strip().partition(':')
+        if not models.available(name):
+            logger.warning(f"Cascade stage {name} is not available, skipping it")
+            continue
+        # Stages load when the cascade first escalates to them
+        stages.append((name, LazyModel(models, name), float(threshold or 0)))
+    return stages
+
+# Answers to repeated questions about unchanged pages; paraphrases match too with a semantic threshold
+answer_cache = None
+if int(os.environ.get('ANSWER_CACHE_SIZE', 1024)) > 0:
+    semantic_threshold = float(os.environ.get('ANSWER_CACHE_SEMANTIC_THRESHOLD', 0)) or None
+    question_encoder = None
+    if semantic_threshold and encoder_pool is not None:
+        # The paraphrase encoder loads on the first semantic lookup and unloads when idle, like the backends
+        cache_encoders = ModelRegistry(
+            idle_ttl=float(os.environ.get('MODEL_IDLE_TTL', 0)) or None,
+            memory_budget=int(os.environ.get('MODEL_MEMORY_MB', 0)) * 1024 * 1024 or None
+        )
+        cache_encoders.register('all-MiniLM-L6-v2', lambda: encoder_pool.get('all-MiniLM-L6-v2'))
+        question_encoder = lambda: cache_encoders.use('all-MiniLM-L6-v2')
+    answer_cache = AnswerCache(
+        max_entries=int(os.environ.get('ANSWER_CACHE_SIZE', 1024)),
+        ttl=float(os.environ.get('ANSWER_CACHE_TTL', 3600)) or None,
+        encoder=question_encoder,
+        semantic_threshold=semantic_threshold
+    )
+    # Answers about a URL are dropped as soon as it is extracted again
+    pipeline.add_indexer(lambda url, document: answer_cache.invalidate(url))
+
+# Largest number of questions in one /api/answer/batch request
+BATCH_MAX_QUESTIONS = int(os.environ.get('BATCH_MAX_QUESTIONS', 100))
+
+# 'auto' answers with the cheapest backend that is confident enough, escalating to heavier ones
+cascade = ModelCascade(
+    parse_cascade_stages(os.environ.get('CASCADE_STAGES', 'default:0.6,sentence-transformer:0.5,distilbert:0')),
+    extractive=['distilbert'],
+    # Checked per request: a stage whose model failed to load stops being tried
+    available=models.available
+)
+
+def parse_crawl_options(crawl, urls):
+    """
+    Validate the crawl options of an extraction request
+    
+    Args:
+        crawl (dict): 'seed' (defaults to the first URL), 'depth', 'max_pages'
+            and optional 'time_budget' in seconds
+        urls (list): URLs of the request
+        
+    Returns:
+        tuple: (seed URL, options dict for the crawler)
+        
+    Raises:
+        ValueError: If the options are invalid
+    """
+    if not isinstance(crawl, dict):
+        crawl = {}
+    seed = crawl.get('seed') or (urls[0] if urls else None)
+    if not seed:
+        raise ValueError("No seed URL provided")
+    
+    options = {
+        "depth": min(int(crawl.get('depth', 2)), CRAWL_MAX_DEPTH),
+        "max_pages": min(int(crawl.get('max_pages', 50)), CRAWL_MAX_PAGES),
+        "time_budget": float(crawl['time_budget']) if crawl.get('time_budget') else None
+    }
+    if options["depth"] < 0 or options["max_pages"] < 1:
+        raise ValueError("Crawl depth must be >= 0 and max_pages >= 1")
+    return seed, options
 
 @app.route('/api/extract', methods=['POST'])
 def extract_content():
-    """Extract content from URLs"""
+    """Extract content from URLs, or crawl a site from a seed URL"""
     try:
         data = request.json
         urls = data.get('urls', [])
+        crawl = data.get('crawl')
+        
+        if crawl:
+            try:
+                seed, crawl_options = parse_crawl_options(crawl, urls)
+            except (TypeError, ValueError) as e:
+                return jsonify({"error": f"Invalid crawl options: {str(e)}"}), 400
+            urls = [seed]
         
         if not urls:
             return jsonify({"error": "No URLs provided"}), 400
         
-        logger.info(f"Extracting content from {len(urls)} URLs")
+        if data.get('async'):
+            # Run the extraction in the background and let the client poll for progress
+            job_id = job_queue.submit(urls, crawl=crawl_options if crawl else None)
+            return jsonify({
+                "message": "Crawl job queued" if crawl else "Extraction job queued",
+                "job_id": job_id,
+                "status_url": f"/api/jobs/{job_id}",
+                "url_count": len(urls)
+            }), 202
+        
+        if crawl:
+            logger.info(f"Crawling from {seed} with {crawl_options}")
+            results = crawler.crawl(
+                seed,
+                max_depth=crawl_options["depth"],
+                max_pages=crawl_options["max_pages"],
+                time_budget=crawl_options["time_budget"]
+            )
+        else:
+            logger.info(f"Extracting content from {len(urls)} URLs")
+            results = pipeline.ingest(urls)
         
-        # Process each URL
+        # Fetch and process all URLs concurrently
+        results = list(results)
+        succeeded = {result["url"] for result in results if not result["error"]}
         all_content = ""
-        for url in urls:
-            try:
-                # Extract content
-                content = extractor.extract(url)
-                
-                # Process content
-                processed_content = processor.process(content)
-                
-                # Add to combined content
-                all_content += f"\n\n--- Content from {url} ---\n\n{processed_content}"
-                
-                # Store content for this URL
-                extracted_content[url] = processed_content
-                
-            except Exception as e:
-                logger.error(f"Error processing {url}: {str(e)}")
-                return jsonify({"error": f"Error processing {url}: {str(e)}"}), 500
+        failed = []
+        documents = []
+        dedup = {"duplicate_documents": 0, "removed_paragraphs": 0, "removed_chars": 0}
+        for result in results:
+            url = result["url"]
+            if result["error"]:
+                failed.append({"url": url, "error": result["error"]})
+                continue
+            
+            document = result["content"]
+            metadata = result["metadata"]
+            documents.append(metadata)
+            
+            if metadata and metadata.get("dedup"):
+                dedup["duplicate_documents"] += metadata["duplicate_of"] is not None
+                dedup["removed_paragraphs"] += metadata["dedup"]["removed_paragraphs"]
+                dedup["removed_chars"] += metadata["dedup"]["removed_chars"]
+                if metadata["duplicate_of"] in succeeded:
+                    # Same page as another URL of this request; its content is already included
+                    continue
+            
+            # Add to combined content
+            all_content += f"\n\n--- Content from {url} ---\n\n{document.text}"
+        
+        if not all_content and failed:
+            return jsonify({
+                "error": f"Error processing {failed[0]['url']}: {failed[0]['error']}",
+                "failed": failed
+            }), 500
         
         # Create a summary
         summary = processor.summarize(all_content)
@@ -139,13 +424,116 @@ def extract_content():
             "message": "Content extracted successfully",
             "content": all_content,
             "summary": summary,
-            "url_count": len(urls)
+            "url_count": len(results),
+            "documents": documents,
+            "dedup": dedup,
+            "failed": failed
         })
         
     except Exception as e:
         logger.error(f"Extraction error: {str(e)}")
         return jsonify({"error": f"Failed to process request: {str(e)}"}), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status and per-URL progress of a background extraction job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return jsonify(job)
+
+def resolve_model_type(model_type):
+    """Get the model_type a request is answered with, the default backend if the requested one is unavailable"""
+    # Check if requested model is available; it is loaded when first used
+    if model_type != 'auto' and not models.available(model_type):
+        logger.warning(f"{model_type} model requested but not available, falling back to default model")
+        return 'default'
+    if model_type == 'auto' and not any(models.available(name) for name, _, _ in cascade.stages):
+        logger.warning("No cascade stage available, falling back to default model")
+        return 'default'
+    return model_type
+
+def load_documents(urls, stored_metadata):
+    """
+    Get the stored documents of the URLs of a request, extracting them now if none is stored
+    
+    Args:
+        urls (list): URLs of the request
+        stored_metadata (list): document_store.metadata() of each URL
+        
+    Returns:
+        list: (url, document) pairs, each with the page's own text less
+            the text it repeats from other URLs of the request
+    """
+    if not any(stored_metadata):
+        # If no content in cache, extract it now (fallback)
+        for result in pipeline.ingest(urls):
+            if result["error"]:
+                logger.error(f"Error extracting content from {result['url']}: {result['error']}")
+        stored_metadata = [document_store.metadata(url) for url in urls]
+    
+    # Text a page repeats from another URL of the request is only served once, from that URL
+    served = {url for url, metadata in zip(urls, stored_metadata) if metadata and not metadata["duplicate_of"]}
+    documents = []
+    included = set()
+    for url, metadata in zip(urls, stored_metadata):
+        if metadata is None:
+            logger.warning(f"Content for {url} not found in cache")
+            continue
+        # Duplicate pages are served once, from the page they duplicate if it is requested
+        key = metadata["duplicate_of"] or url
+        if key in included or (metadata["duplicate_of"] is not None and key in served):
+            continue
+        document = document_store.get(url, alongside=served - {url})
+        if document is not None:
+            included.add(key)
+            documents.append((url, document))
+    return documents
+
+def answer_with(model_type, question, content):
+    """
+    Answer a question with a backend, loading it if needed
+    
+    Returns:
+        tuple: (answer, confidence, context, model_type of the backend used),
+            from the default backend if the requested one failed to load
+    """
+    with models.use(model_type) as model:
+        if model is not None:
+            return model.answer_question(question, content) + (model_type,)
+    logger.warning(f"{model_type} model failed to load, falling back to default model")
+    with models.use('default') as model:
+        return model.answer_question(question, content) + ('default',)
+
+def answer_many(model_type, questions, content):
+    """
+    Answer several questions about the same content, loading the backend if needed
+    
+    Backends with answer_questions() prepare the content once and batch the
+    questions; the others, and the cascade, answer them one at a time.
+    
+    Yields:
+        tuple: (answer, confidence, context, model_type of the backend used,
+            cascade stages or None) for each question, in order
+    """
+    if model_type == 'auto':
+        for question in questions:
+            yield cascade.answer_question(question, content)
+        return
+    with models.use(model_type) as model:
+        if model is not None:
+            if hasattr(model, 'answer_questions'):
+                answers = model.answer_questions(questions, content)
+            else:
+                answers = (model.answer_question(question, content) for question in questions)
+            for answer in answers:
+                yield answer + (model_type, None)
+            return
+    logger.warning(f"{model_type} model failed to load, falling back to default model")
+    with models.use('default') as model:
+        for question in questions:
+            yield model.answer_question(question, content) + ('default', None)
+
 @app.route('/api/answer', methods=['POST'])
 def answer_question():
     """Answer a question based on extracted content"""
@@ -153,7 +541,7 @@ def answer_question():
         data = request.json
         question = data.get('question', '')
         urls = data.get('urls', [])
-        model_type = data.get('model_type', 'default')  # 'default', 'tensorflow', 'nltk-advanced', 'distilbert', or 'sentence-transformer'
+        model_type = data.get('model_type', 'default')  # 'auto', 'default', 'tensorflow', 'nltk-advanced', 'distilbert', or 'sentence-transformer'
         
         if not question:
             return jsonify({"error": "No question provided"}), 400
@@ -162,102 +550,181 @@ def answer_question():
             return jsonify({"error": "No URLs provided"}), 400
         
         logger.info(f"Answering question using {model_type} model: {question}")
+        model_type = resolve_model_type(model_type)
         
-        # Check if requested model is available
-        if model_type == 'tensorflow' and not tensorflow_model:
-            logger.warning("TensorFlow model requested but not available, falling back to default model")
-            model_type = 'default'
-        elif model_type == 'nltk-advanced' and not nltk_model:
-            logger.warning("NLTK Advanced model requested but not available, falling back to default model")
-            model_type = 'default'
-        elif model_type == 'distilbert' and not distilbert_model:
-            logger.warning("DistilBERT model requested but not available, falling back to default model")
-            model_type = 'default'
-        elif model_type == 'sentence-transformer' and not sentence_transformer_model:
-            logger.warning("SentenceTransformer model requested but not available, falling back to default model")
-            model_type = 'default'
+        # Content version of each URL: the hash of its stored copy
+        stored_metadata = [document_store.metadata(url) for url in urls]
+        versions = [metadata["content_hash"] if metadata else None for metadata in stored_metadata]
+        cacheable = answer_cache is not None and None not in versions
+        if cacheable:
+            cached, match = answer_cache.get(question, urls, versions, model_type)
+            if cached is not None:
+                return jsonify(dict(cached, cached=match))
         
         # Combine content from all URLs
-        combined_content = ""
-        for url in urls:
-            if url in extracted_content:
-                combined_content += f"\n\n{extracted_content[url]}"
-            else:
-                logger.warning(f"Content for {url} not found in cache")
+        documents = load_documents(urls, stored_metadata)
         
-        if not combined_content:
-            # If no content in cache, extract it now (fallback)
-            for url in urls:
-                try:
-                    content = extractor.extract(url)
-                    processed_content = processor.process(content)
-                    combined_content += f"\n\n{processed_content}"
-                    extracted_content[url] = processed_content
-                except Exception as e:
-                    logger.error(f"Error extracting content from {url}: {str(e)}")
+        # Backends use the document's paragraph and sentence offsets directly
+        combined_content = ProcessedDocument.combine(documents)
         
         # Get answer based on selected model
-        if model_type == 'tensorflow' and tensorflow_model:
-            answer, confidence, context = tensorflow_model.answer_question(question, combined_content)
-            model_used = 'tensorflow'
-        elif model_type == 'nltk-advanced' and nltk_model:
-            answer, confidence, context = nltk_model.answer_question(question, combined_content)
-            model_used = 'nltk-advanced'
-        elif model_type == 'distilbert' and distilbert_model:
-            answer, confidence, context = distilbert_model.answer_question(question, combined_content)
-            model_used = 'distilbert'
-        elif model_type == 'sentence-transformer' and sentence_transformer_model:
-            answer, confidence, context = sentence_transformer_model.answer_question(question, combined_content)
-            model_used = 'sentence-transformer'
+        stages = None
+        if model_type == 'auto':
+            answer, confidence, context, model_used, stages = cascade.answer_question(question, combined_content)
         else:
-            answer, confidence, context = qa_model.answer_question(question, combined_content)
-            model_used = 'default'
+            answer, confidence, context, model_used = answer_with(model_type, question, combined_content)
         
-        return jsonify({
+        response = {
             "answer": answer,
             "confidence": confidence,
             "context": context,
             "model_used": model_used
-        })
+        }
+        if stages is not None:
+            # Which cascade stages ran, their confidence and latency
+            response["stages"] = stages
+        if cacheable and confidence > 0 and model_type in ('auto', model_used):
+            # Errors (zero confidence) and answers of the fallback model are not cached
+            answer_cache.put(question, urls, versions, model_type, response)
+        return jsonify(response)
         
     except Exception as e:
         logger.error(f"Error answering question: {str(e)}")
         return jsonify({"error": f"Failed to answer question: {str(e)}"}), 500
 
+@app.route('/api/answer/batch', methods=['POST'])
+def answer_questions():
+    """
+    Answer many questions about one set of URLs, streaming one JSON line per question
+    
+    The content is loaded and combined once, and backends that support it
+    prepare it once, encode the questions together and batch their reader
+    inputs. Each line carries the question's index and is written as soon as
+    it is answered, cached answers first.
+    """
+    try:
+        data = request.json
+        questions = data.get('questions', [])
+        urls = data.get('urls', [])
+        model_type = data.get('model_type', 'default')
+        
+        if not questions or not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+            return jsonify({"error": "No questions provided"}), 400
+        
+        if len(questions) > BATCH_MAX_QUESTIONS:
+            return jsonify({"error": f"At most {BATCH_MAX_QUESTIONS} questions can be asked at once"}), 400
+        
+        if not urls:
+            return jsonify({"error": "No URLs provided"}), 400
+        
+        logger.info(f"Answering {len(questions)} questions using {model_type} model")
+        model_type = resolve_model_type(model_type)
+        
+        stored_metadata = [document_store.metadata(url) for url in urls]
+        versions = [metadata["content_hash"] if metadata else None for metadata in stored_metadata]
+        cacheable = answer_cache is not None and None not in versions
+        cached = {}
+        pending = []
+        for index, question in enumerate(questions):
+            hit, match = answer_cache.get(question, urls, versions, model_type) if cacheable else (None, None)
+            if hit is not None:
+                cached[index] = dict(hit, cached=match)
+            else:
+                pending.append(index)
+        
+        # Content is only combined once, for all the questions not answered from the cache
+        combined_content = ProcessedDocument.combine(load_documents(urls, stored_metadata)) if pending else None
+        
+    except Exception as e:
+        logger.error(f"Error answering questions: {str(e)}")
+        return jsonify({"error": f"Failed to answer questions: {str(e)}"}), 500
+    
+    def line(index, response):
+        return json.dumps(dict(response, index=index, question=questions[index])) + "\n"
+    
+    def generate():
+        for index, response in cached.items():
+            yield line(index, response)
+        
+        answered = 0
+        try:
+            answers = answer_many(model_type, [questions[index] for index in pending], combined_content)
+            for index, (answer, confidence, context, model_used, stages) in zip(pending, answers):
+                response = {
+                    "answer": answer,
+                    "confidence": confidence,
+                    "context": context,
+                    "model_used": model_used
+                }
+                if stages is not None:
+                    response["stages"] = stages
+                if cacheable and confidence > 0 and model_type in ('auto', model_used):
+                    answer_cache.put(questions[index], urls, versions, model_type, response)
+                answered += 1
+                yield line(index, response)
+        except Exception as e:
+            # The 200 response and the earlier answer lines have already gone out,
+            # so the remaining questions each get the error
+            logger.error(f"Error answering questions: {str(e)}")
+            for index in pending[answered:]:
+                yield line(index, {"error": f"Failed to answer question: {str(e)}"})
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/models', methods=['GET'])
 def get_available_models():
     """Get available QA models"""
-    models = {
+    descriptions = {
+        "auto": {
+            "name": "Auto",
+            "description": "Answers with the fastest model first and escalates to heavier models only when its confidence is low",
+            "available": bool(cascade.stages),
+            "stages": [name for name, _, _ in cascade.stages]
+        },
         "default": {
             "name": "TF-IDF + spaCy",
             "description": "Lightweight model using TF-IDF and spaCy for efficient question answering",
-            "available": True
+            "available": models.available('default')
         },
         "tensorflow": {
             "name": "Universal Sentence Encoder",
             "description": "TensorFlow-based semantic model with excellent performance and medium resource usage",
-            "available": tensorflow_model is not None
+            "available": models.available('tensorflow')
         },
         "nltk-advanced": {
             "name": "NLTK Advanced",
             "description": "Enhanced NLTK model with advanced text processing and minimal resource requirements",
-            "available": nltk_model is not None
+            "available": models.available('nltk-advanced')
         },
         "distilbert": {
             "name": "DistilBERT",
             "description": "HuggingFace's DistilBERT model fine-tuned for question answering (resource intensive)",
-            "available": distilbert_model is not None
+            "available": models.available('distilbert')
         },
         "sentence-transformer": {
             "name": "Sentence Transformer",
             "description": "Efficient semantic search using sentence embeddings (moderate resource usage, high accuracy)",
-            "available": sentence_transformer_model is not None
+            "available": models.available('sentence-transformer')
         }
     }
     
+    # Whether each backend is loaded, how long its last load took and the memory it holds
+    status = models.status()
+    for name, description in descriptions.items():
+        if name != 'auto':
+            description.update(status.get(name, {"loaded": False}))
+    # Requests and inputs per forward pass of the DistilBERT batcher
+    distilbert_model = models.loaded('distilbert')
+    if distilbert_model is not None and distilbert_model.batcher is not None:
+        descriptions["distilbert"]["batching"] = distilbert_model.batcher.stats()
+    
     return jsonify({
-        "models": models,
-        "default": "default"
+        "models": descriptions,
+        "default": "default",
+        # Shared encoders, embedding cache hit rate and the worker's resident memory
+        "encoders": encoder_pool.stats() if encoder_pool is not None else None,
+        "answer_cache": answer_cache.stats() if answer_cache is not None else None,
+        "resident_bytes": resident_bytes()
     })
 
 if __name__ == '__main__':
@@ -0,0 +1,415 @@
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import numpy as np
+
+QUANTIZATIONS = ('float16', 'int8', 'binary')
+
+# Default number of candidates rescored per result; sign bits rank much more coarsely than int8
+DEFAULT_RESCORE = {'int8': 4, 'binary': 50}
+
+# Number of set bits of each byte value, for Hamming distances between packed codes
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8).reshape(-1, 1), axis=1).sum(axis=1).astype(np.uint16)
+
+
+def quantize(matrix, quantization):
+    """
+    Encode unit-length vectors for the in-memory lists
+
+    Args:
+        matrix (numpy.ndarray): Vectors, one per row
+        quantization (str): 'float16' (2 bytes per dimension), 'int8' (1 byte
+            per dimension plus a 4-byte scale per vector) or 'binary' (1 bit
+            per dimension, the sign)
+
+    Returns:
+        tuple: Arrays with one row per vector
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if quantization == 'int8':
+        scales = np.abs(matrix).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        codes = np.round(matrix / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    if quantization == 'binary':
+        return (np.packbits(matrix > 0, axis=1),)
+    return (matrix.astype(np.float16),)
+
+
+def approximate_scores(encoded, query, quantization):
+    """
+    Score encoded vectors against a query; higher is closer
+
+    Args:
+        encoded (tuple): Arrays returned by quantize()
+        query (numpy.ndarray): Unit-length query vector
+        quantization (str): Encoding of the vectors
+
+    Returns:
+        numpy.ndarray: Cosine similarities, or negated Hamming distances for
+            binary codes
+    """
+    query = np.asarray(query, dtype=np.float32)
+    if quantization == 'int8':
+        codes, scales = encoded
+        return (codes @ query) * scales
+    if quantization == 'binary':
+        signs = np.packbits(query > 0)
+        return -_POPCOUNT[np.bitwise_xor(encoded[0], signs)].sum(axis=1, dtype=np.int32)
+    return np.asarray(encoded[0] @ query, dtype=np.float32)
+
+
+def kmeans(vectors, n_clusters, iterations=10, seed=0):
+    """
+    Spherical k-means over unit-length vectors
+
+    Args:
+        vectors (numpy.ndarray): Training vectors, one per row
+        n_clusters (int): Number of centroids
+        iterations (int): Number of refinement passes
+        seed (int): Seed of the initial centroid choice
+
+    Returns:
+        numpy.ndarray: Unit-length centroids, one per row
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=n_clusters)
+        empty = counts == 0
+        # Re-seed empty clusters with random vectors
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = sums / norms
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index for approximate nearest-neighbour search
+
+    Vectors are the embedding matrices of ingested documents, read from an
+    EmbeddingStore namespace. Once enough vectors have been added, they are
+    clustered with k-means and each vector is kept in the list of its
+    nearest centroid; a query only scores the vectors of the n_probe lists
+    whose centroids are closest to it. Until then, and whenever the corpus
+    has grown by retrain_factor since the last training, all vectors are
+    (re)clustered. Queries are restricted to a set of documents, so each
+    request only sees the URLs it asked about.
+
+    Vectors in the lists can be quantised to int8 or to sign bits to fit more
+    pages in memory. Quantised candidates are then rescored with the
+    full-precision vectors of the embedding store, so only the final
+    ordering of the top few hundred candidates reads them.
+
+    Vectors of replaced document versions are dropped from a list once they
+    make up compact_ratio of it, without waiting for the next clustering.
+
+    The document table lives in SQLite and the centroids in a .npy file next
+    to it; vectors are reloaded from the embedding store on startup.
+    """
+
+    def __init__(self, path, embedding_store, namespace, n_lists=256, n_probe=8,
+                 min_train_size=4096, retrain_factor=4, quantization='float16', rescore=None,
+                 compact_ratio=0.25):
+        """
+        Args:
+            path (str): Path of the SQLite database holding the document table
+            embedding_store (EmbeddingStore): Store holding the document vectors
+            namespace (str): Embedding store namespace of the vectors
+            n_lists (int): Maximum number of clusters
+            n_probe (int): Number of clusters scored per query; higher values
+                raise recall and latency
+            min_train_size (int): Number of vectors before clustering starts;
+                smaller corpora are searched exhaustively
+            retrain_factor (float): Growth of the corpus that triggers re-clustering
+            quantization (str): Encoding of the vectors kept in memory: 'float16',
+                'int8' or 'binary'
+            rescore (int): With quantised vectors, number of candidates per
+                requested result rescored at full precision (default: 4 for
+                int8, 50 for binary)
+            compact_ratio (float): Share of a list's vectors belonging to
+                replaced document versions at which they are dropped from it
+        """
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.embedding_store = embedding_store
+        self.namespace = namespace
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self.retrain_factor = retrain_factor
+        self.quantization = quantization
+        self.rescore = rescore or DEFAULT_RESCORE.get(quantization, 1)
+        self.compact_ratio = compact_ratio
+        self.centroids_path = os.path.splitext(path)[0] + '.centroids.npy'
+
+        # url -> (doc id, content hash, number of vectors)
+        self._documents = {}
+        self._next_doc_id = 0
+        self._vector_count = 0
+        self._trained_count = 0
+        self.centroids = None
+        # Per list: pending (doc ids, rows, *encoded vectors) array tuples, merged on demand
+        self._pending = []
+        self._lists = []
+        # Per list: number of vectors, and doc id -> vectors of replaced versions
+        self._sizes = []
+        self._dead = []
+        # doc id -> {list id: number of vectors}
+        self._placement = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS documents (
+                    url TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL
+                )"""
+            )
+            rows = conn.execute("SELECT url, content_hash FROM documents").fetchall()
+
+        if os.path.exists(self.centroids_path):
+            self.centroids = np.load(self.centroids_path)
+        self._reset_lists()
+
+        for url, content_hash in rows:
+            matrix = self.embedding_store.get(self.namespace, content_hash)
+            if matrix is not None:
+                self._insert(url, content_hash, matrix)
+        self._trained_count = self._vector_count if self.centroids is not None else 0
+        self.logger.info(f"Loaded ANN index {namespace} with {self._vector_count} vectors from {len(self._documents)} documents")
+
+    def _connect(self):
+        # A connection per operation keeps the index safe to use from worker threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    def __len__(self):
+        return self._vector_count
+
+    def memory_usage(self):
+        """Number of bytes held by the lists, including replaced vectors not yet dropped"""
+        with self._lock:
+            total = 0
+            for list_id in range(len(self._lists)):
+                entry = self._list(list_id)
+                if entry is not None:
+                    total += sum(array.nbytes for array in entry)
+            return total
+
+    def _reset_lists(self):
+        list_count = len(self.centroids) if self.centroids is not None else 1
+        self._pending = [[] for _ in range(list_count)]
+        self._lists = [None] * list_count
+        self._sizes = [0] * list_count
+        self._dead = [{} for _ in range(list_count)]
+        self._placement = {}
+
+    def _assign(self, matrix):
+        """Get the list of each vector of a matrix"""
+        if self.centroids is None:
+            return np.zeros(len(matrix), dtype=np.int64)
+        return np.argmax(np.asarray(matrix, dtype=np.float32) @ self.centroids.T, axis=1)
+
+    def _insert(self, url, content_hash, matrix):
+        """Add a document's vectors to the lists; the caller holds the lock"""
+        previous = self._documents.get(url)
+        if previous is not None:
+            # Vectors of the old version are never searched again
+            self._vector_count -= previous[2]
+            self._retire(previous[0])
+
+        doc_id = self._next_doc_id
+        self._next_doc_id += 1
+        self._documents[url] = (doc_id, content_hash, len(matrix))
+        self._vector_count += len(matrix)
+
+        assignment = self._assign(matrix)
+        placement = {}
+        for list_id in np.unique(assignment):
+            rows = np.flatnonzero(assignment == list_id).astype(np.int32)
+            encoded = quantize(matrix[rows], self.quantization)
+            self._pending[list_id].append((np.full(len(rows), doc_id, dtype=np.int32), rows) + encoded)
+            placement[int(list_id)] = len(rows)
+            self._sizes[list_id] += len(rows)
+        self._placement[doc_id] = placement
+
+    def _retire(self, doc_id):
+        """Mark the vectors of a replaced document version as dead; the caller holds the lock"""
+        for list_id, count in self._placement.pop(doc_id, {}).items():
+            dead = self._dead[list_id]
+            dead[doc_id] = count
+            if sum(dead.values()) >= self.compact_ratio * self._sizes[list_id]:
+                self._compact(list_id)
+
+    def _compact(self, list_id):
+        """Drop the dead vectors of a list; the caller holds the lock"""
+        entry = self._list(list_id)
+        dead = self._dead[list_id]
+        if entry is not None:
+            keep = ~np.isin(entry[0], np.fromiter(dead, dtype=np.int32, count=len(dead)))
+            self._lists[list_id] = tuple(array[keep] for array in entry) if keep.any() else None
+        self._sizes[list_id] -= sum(dead.values())
+        self._dead[list_id] = {}
+
+    def add(self, url, content_hash):
+        """
+        Index the stored vectors of a document, replacing its previous version
+
+        Args:
+            url (str): URL of the document
+            content_hash (str): Content hash under which the vectors are stored
+        """
+        matrix = self.embedding_store.get(self.namespace, content_hash)
+        if matrix is None or not len(matrix):
+            return
+
+        with self._lock:
+            current = self._documents.get(url)
+            if current is not None and current[1] == content_hash:
+                return
+            self._insert(url, content_hash, matrix)
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?)", (url, content_hash))
+
+            if self._vector_count >= self.min_train_size and self._vector_count >= self._trained_count * self.retrain_factor:
+                self._train()
+
+    def _train(self):
+        """Cluster all indexed vectors and rebuild the lists; the caller holds the lock"""
+        matrices = []
+        for url, (_, content_hash, _) in self._documents.items():
+            matrix = self.embedding_store.get(self.namespace, content_hash)
+            if matrix is not None:
+                matrices.append(matrix)
+        vectors = np.concatenate(matrices).astype(np.float32)
+
+        n_clusters = max(1, min(self.n_lists, len(vectors) // 39))
+        sample = vectors
+        if len(vectors) > n_clusters * 256:
+            sample = vectors[np.random.default_rng(0).choice(len(vectors), n_clusters * 256, replace=False)]
+        self.centroids = kmeans(sample, n_clusters)
+
+        directory = os.path.dirname(self.centroids_path) or '.'
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, self.centroids)
+        os.replace(temporary, self.centroids_path)
+
+        # Rebuild the lists from live documents only, dropping replaced versions
+        documents = self._documents
+        self._documents = {}
+        self._vector_count = 0
+        self._reset_lists()
+        for url, (_, content_hash, _) in documents.items():
+            matrix = self.embedding_store.get(self.namespace, content_hash)
+            if matrix is not None:
+                self._insert(url, content_hash, matrix)
+        self._trained_count = self._vector_count
+        self.logger.info(f"Trained ANN index {self.namespace}: {n_clusters} lists over {self._vector_count} vectors")
+
+    def _list(self, list_id):
+        """Get the (doc ids, rows, *encoded vectors) arrays of a list, merging pending additions"""
+        pending = self._pending[list_id]
+        if pending:
+            parts = ([self._lists[list_id]] if self._lists[list_id] is not None else []) + pending
+            self._lists[list_id] = tuple(np.concatenate(arrays) for arrays in zip(*parts))
+            self._pending[list_id] = []
+        return self._lists[list_id]
+
+    def search(self, query, documents, k=3, n_probe=None):
+        """
+        Find the vectors closest to a query among some documents
+
+        Args:
+            query (numpy.ndarray): Unit-length query vector
+            documents (dict): url -> content hash of the documents to search
+            k (int): Number of results
+            n_probe (int): Number of lists to scan, overriding the default
+
+        Returns:
+            tuple: (list of (url, row, score) sorted by decreasing score, set of
+                URLs that are not indexed at the requested content hash and
+                must be searched separately)
+        """
+        with self._lock:
+            allowed = []
+            missing = set()
+            for url, content_hash in documents.items():
+                entry = self._documents.get(url)
+                if entry is None or entry[1] != content_hash:
+                    missing.add(url)
+                else:
+                    allowed.append(entry[0])
+            if not allowed:
+                return [], missing
+
+            if self.centroids is None:
+                order = [0]
+            else:
+                order = np.argsort(-(self.centroids @ np.asarray(query, dtype=np.float32)))
+            doc_urls = {self._documents[url][0]: url for url in documents if url not in missing}
+            doc_hashes = {doc_id: documents[url] for doc_id, url in doc_urls.items()}
+            allowed = np.array(allowed, dtype=np.int32)
+            n_probe = min(n_probe or self.n_probe, len(order))
+            wanted = min(k, sum(self._documents[url][2] for url in doc_urls.values()))
+
+            # Probe more lists when the requested documents are rare in the nearest ones
+            while True:
+                lists = [self._list(list_id) for list_id in order[:n_probe]]
+                lists = [entry for entry in lists if entry is not None]
+                if lists:
+                    doc_ids = np.concatenate([entry[0] for entry in lists])
+                    mask = np.isin(doc_ids, allowed)
+                    found = int(mask.sum())
+                else:
+                    found = 0
+                if found >= wanted or n_probe >= len(order):
+                    break
+                n_probe = min(n_probe * 2, len(order))
+
+        if not found:
+            return [], missing
+
+        rows = np.concatenate([entry[1] for entry in lists])[mask]
+        encoded = tuple(np.concatenate([entry[i] for entry in lists])[mask] for i in range(2, len(lists[0])))
+        doc_ids = doc_ids[mask]
+        scores = approximate_scores(encoded, query, self.quantization)
+
+        if self.quantization != 'float16':
+            # Keep the best quantised candidates and rescore them at full precision
+            candidates = min(k * self.rescore, len(scores))
+            top = np.argpartition(-scores, candidates - 1)[:candidates]
+            doc_ids, rows = doc_ids[top], rows[top]
+            scores = self._rescore(query, doc_ids, rows, doc_hashes)
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(doc_urls[int(doc_ids[i])], int(rows[i]), float(scores[i])) for i in top], missing
+
+    def _rescore(self, query, doc_ids, rows, doc_hashes):
+        """Exact similarities of candidate vectors, read from the embedding store"""
+        query = np.asarray(query, dtype=np.float32)
+        scores = np.full(len(rows), -np.inf, dtype=np.float32)
+        for doc_id in np.unique(doc_ids):
+            matrix = self.embedding_store.get(self.namespace, doc_hashes[int(doc_id)])
+            if matrix is None:
+                continue
+            selected = np.flatnonzero(doc_ids == doc_id)
+            scores[selected] = np.asarray(matrix[rows[selected]], dtype=np.float32) @ query
+        return scores
@@ -0,0 +1,196 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from .text_normalizer import normalize_whitespace
+
+
+def normalize_question(question):
+    """Normalise a question for exact matching: case, whitespace and trailing punctuation"""
+    return normalize_whitespace(question).lower().rstrip(' ?!.')
+
+
+class AnswerCache:
+    """
+    Cache of answers keyed by question, URLs, content version and model
+
+    An exact hit needs the same normalised question about the same set of
+    URLs, with the same content hashes, answered by the same model_type. A
+    URL re-extracted with new content changes its hash, so its answers are
+    no longer found. invalidate() also drops them at once, which is how
+    this process frees them when it ingests the URL itself. Entries expire
+    after the TTL and the least recently used ones are evicted beyond
+    max_entries.
+
+    With an encoder and a threshold, a semantic tier also matches
+    paraphrases: a question whose embedding is close enough to a cached
+    question about the same URLs, versions and model gets its answer.
+    Cached questions are embedded on the first lookup that compares them,
+    and the encoder is only held for the duration of a lookup, so whoever
+    provides it (e.g. a ModelRegistry) decides when it is loaded and freed.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, encoder=None, semantic_threshold=None):
+        """
+        Args:
+            max_entries (int): Number of answers kept
+            ttl (float): Seconds an answer stays valid, or None for no expiry
+            encoder (callable): Optional function returning a context manager
+                that yields the question encoder (SharedEncoder) for the
+                semantic tier, or None if it is unavailable, e.g.
+                lambda: registry.use(name)
+            semantic_threshold (float): Cosine similarity from which a
+                paraphrase reuses a cached answer; the tier is off if None
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.encoder = encoder
+        self.semantic_threshold = semantic_threshold if encoder is not None else None
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # key -> (value, expiry time, question embedding once computed)
+        self._entries = OrderedDict()
+        # (URLs, versions, model_type) -> keys of the answers about them, for the semantic tier and invalidation
+        self._scopes = {}
+        self._lock = threading.Lock()
+
+    def _key(self, question, urls, versions, model_type):
+        scope = (tuple(sorted(zip(urls, versions))), model_type)
+        return (normalize_question(question),) + scope, scope
+
+    def get(self, question, urls, versions, model_type):
+        """
+        Look up the answer to a question
+
+        Args:
+            question (str): Question
+            urls (list): URLs the question is about
+            versions (list): Content hash of each URL
+            model_type (str): Requested model
+
+        Returns:
+            tuple: (cached value, 'exact' or 'semantic'), or (None, None)
+        """
+        key, scope = self._key(question, urls, versions, model_type)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], 'exact'
+            if entry is not None:
+                self._remove(key)
+            candidates = list(self._scopes.get(scope, ())) if self.semantic_threshold else []
+
+        if candidates:
+            value = self._semantic_get(key[0], candidates, now)
+            if value is not None:
+                return value, 'semantic'
+
+        with self._lock:
+            self.misses += 1
+        return None, None
+
+    def _semantic_get(self, question, candidates, now):
+        """Find the answer of the closest cached paraphrase of a normalised question about the same content"""
+        with self._lock:
+            entries = [(key, self._entries.get(key)) for key in candidates]
+            entries = [(key, entry) for key, entry in entries
+                       if entry is not None and (entry[1] is None or entry[1] > now)]
+        if not entries:
+            return None
+
+        # Cached questions not compared before are embedded along with this one
+        unembedded = [key for key, entry in entries if entry[2] is None]
+        with self.encoder() as encoder:
+            if encoder is None:
+                return None
+            embeddings = encoder.encode([question] + [key[0] for key in unembedded])
+        embedding = embeddings[0]
+        computed = dict(zip(unembedded, embeddings[1:]))
+
+        with self._lock:
+            for key, question_embedding in computed.items():
+                entry = self._entries.get(key)
+                if entry is not None and entry[2] is None:
+                    self._entries[key] = (entry[0], entry[1], question_embedding)
+            similarities = np.stack([
+                entry[2] if entry[2] is not None else computed[key] for key, entry in entries
+            ]) @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.semantic_threshold:
+                return None
+            key, entry = entries[best]
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.semantic_hits += 1
+        self.logger.info(f"Semantic cache hit for '{question}' (similarity {similarities[best]:.3f})")
+        return entry[0]
+
+    def put(self, question, urls, versions, model_type, value):
+        """
+        Cache the answer to a question
+
+        Args:
+            question (str): Question
+            urls (list): URLs the question is about
+            versions (list): Content hash of each URL
+            model_type (str): Requested model
+            value: Answer to cache, returned as is by get()
+        """
+        key, scope = self._key(question, urls, versions, model_type)
+        expiry = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, expiry, None)
+            self._scopes.setdefault(scope, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, url):
+        """
+        Drop every answer about a URL, e.g. when it is extracted again
+
+        Args:
+            url (str): URL whose content changed or may have changed
+        """
+        with self._lock:
+            scopes = [scope for scope in self._scopes if any(u == url for u, _ in scope[0])]
+            for scope in scopes:
+                for key in list(self._scopes.get(scope, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def _remove(self, key):
+        if self._entries.pop(key, None) is None:
+            return
+        scope = key[1:]
+        keys = self._scopes.get(scope)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._scopes[scope]
+
+    def stats(self):
+        """
+        Describe the cache
+
+        Returns:
+            dict: 'entries', 'hits', 'semantic_hits', 'misses', 'hit_rate'
+                and 'invalidations'
+        """
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.semantic_hits) / lookups, 4) if lookups else None,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,137 @@
+import logging
+import threading
+import time
+from collections import deque
+
+
+class MicroBatcher:
+    """
+    Merge concurrent inference calls into batches
+
+    Request handlers submit lists of inputs (texts, tokenised windows) and
+    wait. One worker thread takes the oldest waiting request, keeps
+    collecting others until max_batch_size inputs are queued or max_wait
+    seconds have passed since that request arrived, runs the batch function
+    once over all of them and hands every caller its own slice of the
+    results. A lone request waits at most max_wait; under load, many small
+    forward passes competing for the same cores become a few large ones.
+
+    The worker exits after idle_timeout seconds without requests and is
+    started again by the next one, so an idle batcher holds no thread and
+    does not keep its model alive.
+    """
+
+    def __init__(self, function, max_batch_size=32, max_wait=0.005, idle_timeout=1.0, name='batcher'):
+        """
+        Args:
+            function (callable): Takes a list of inputs and returns a list
+                with one result per input, in order
+            max_batch_size (int): Number of inputs from which a batch runs
+                without waiting; a larger single request runs alone
+            max_wait (float): Seconds the oldest request may wait for others
+            idle_timeout (float): Seconds without requests before the worker exits
+            name (str): Name of the worker thread
+        """
+        self.logger = logging.getLogger(__name__)
+        self.function = function
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.idle_timeout = idle_timeout
+        self.name = name
+        self.batches = 0
+        self.requests = 0
+        self.items = 0
+        # [inputs, arrival time, results, error, done event]
+        self._queue = deque()
+        self._queued_items = 0
+        self._condition = threading.Condition()
+        self._worker = None
+
+    def submit(self, inputs):
+        """
+        Run the batch function over inputs, together with other callers' inputs
+
+        Args:
+            inputs (list): Inputs of this caller
+
+        Returns:
+            list: Results for these inputs, in order
+
+        Raises:
+            Exception: Whatever the batch function raised for the batch
+        """
+        if not inputs:
+            return []
+        request = [list(inputs), time.monotonic(), None, None, threading.Event()]
+        with self._condition:
+            self._queue.append(request)
+            self._queued_items += len(request[0])
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True, name=self.name)
+                self._worker.start()
+            self._condition.notify()
+        request[4].wait()
+        if request[3] is not None:
+            raise request[3]
+        return request[2]
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._queue:
+                    self._condition.wait(self.idle_timeout)
+                    if not self._queue:
+                        self._worker = None
+                        return
+                # Collect until the batch is full or the oldest request has waited long enough
+                deadline = self._queue[0][1] + self.max_wait
+                while self._queued_items < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch = []
+                size = 0
+                while self._queue and (not batch or size + len(self._queue[0][0]) <= self.max_batch_size):
+                    request = self._queue.popleft()
+                    batch.append(request)
+                    size += len(request[0])
+                self._queued_items -= size
+            self._execute(batch)
+
+    def _execute(self, batch):
+        inputs = [item for request in batch for item in request[0]]
+        try:
+            results = self.function(inputs)
+            offset = 0
+            for request in batch:
+                request[2] = results[offset:offset + len(request[0])]
+                offset += len(request[0])
+        except Exception as e:
+            self.logger.error(f"Error running a batch of {len(inputs)} inputs: {str(e)}")
+            for request in batch:
+                request[3] = e
+        with self._condition:
+            self.batches += 1
+            self.requests += len(batch)
+            self.items += len(inputs)
+        for request in batch:
+            request[4].set()
+
+    def stats(self):
+        """
+        Describe the batches run so far
+
+        Returns:
+            dict: 'batches', 'requests', 'items' and the mean number of
+                requests and inputs per batch
+        """
+        with self._condition:
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "items": self.items,
+                "requests_per_batch": round(self.requests / self.batches, 2) if self.batches else None,
+                "items_per_batch": round(self.items / self.batches, 2) if self.batches else None
+            }
@@ -0,0 +1,119 @@
+import logging
+import re
+import time
+
+# Questions whose answer is a short span (a name, date, place or quantity),
+# which only extractive readers return; other backends answer with sentences
+SPAN_QUESTION_RE = re.compile(
+    r"^\s*(?:who|whom|whose|when|where|which)\b"
+    r"|\bhow\s+(?:many|much|long|old|far|big|tall)\b"
+    r"|\bwhat\s+(?:year|date|time|day|month|age|percentage|number|is the name)\b",
+    re.IGNORECASE
+)
+
+
+def needs_span(question):
+    """Check whether a question asks for a short factual span rather than an explanation"""
+    return bool(SPAN_QUESTION_RE.search(question))
+
+
+class ModelCascade:
+    """
+    Answer with the cheapest backend that is confident enough
+
+    Stages run in order, cheapest first. A stage's answer is accepted when
+    its confidence reaches the stage's threshold; otherwise the next stage
+    runs, and the answer of the last stage that ran is returned. Questions
+    asking for a short span (who, when, how many...) go straight to the
+    extractive stages when there are any, since the sentence-level backends
+    cannot answer them precisely whatever their confidence; if all of those
+    fail, the other stages answer after all. A stage that fails, e.g.
+    because its model could not be loaded, is skipped, and stages reported
+    unavailable are left out of later requests.
+    """
+
+    def __init__(self, stages, extractive=(), available=None):
+        """
+        Args:
+            stages (list): (name, model, threshold) tuples, cheapest first;
+                each model has answer_question(question, content)
+            extractive (iterable): Names of the stages that extract answer spans
+            available (callable): Optional check of a stage name run on each
+                request, e.g. ModelRegistry.available; stages it rejects are skipped
+        """
+        self.logger = logging.getLogger(__name__)
+        self.stages = stages
+        self.extractive = set(extractive)
+        self.available = available
+
+    def answer_question(self, question, content):
+        """
+        Answer a question based on the content
+
+        Args:
+            question (str): Question to answer
+            content (ProcessedDocument or str): Content to search for answers
+
+        Returns:
+            tuple: (answer, confidence, context, name of the stage whose answer
+                is returned, list of dicts describing each stage: 'model',
+                'confidence', 'threshold', 'time_ms' and 'accepted', or
+                'model' and 'skipped' for stages that did not run or failed)
+        """
+        trace = []
+        stages = []
+        for stage in self.stages:
+            if self.available is None or self.available(stage[0]):
+                stages.append(stage)
+            else:
+                trace.append({"model": stage[0], "skipped": "unavailable"})
+
+        deferred = []
+        if needs_span(question) and any(name in self.extractive for name, _, _ in stages):
+            deferred = [stage for stage in stages if stage[0] not in self.extractive]
+            stages = [stage for stage in stages if stage[0] in self.extractive]
+
+        result = self._run(stages, question, content, trace)
+        if result is None and deferred:
+            self.logger.warning("Every extractive stage failed, answering the span question with the other stages")
+            result = self._run(deferred, question, content, trace)
+        elif deferred:
+            trace[:0] = [{"model": name, "skipped": "span question"} for name, _, _ in deferred]
+
+        if result is None:
+            raise ValueError("No cascade stage could answer the question")
+        return result + (trace,)
+
+    def _run(self, stages, question, content, trace):
+        """
+        Run stages in order until one is confident enough, appending to trace
+
+        Returns:
+            tuple: (answer, confidence, context, stage name) of the last stage
+                that answered, or None if every stage failed
+        """
+        result = None
+        for index, (name, model, threshold) in enumerate(stages):
+            start = time.perf_counter()
+            try:
+                answer, confidence, context = model.answer_question(question, content)
+            except Exception as e:
+                self.logger.error(f"Cascade stage {name} failed: {str(e)}")
+                trace.append({"model": name, "skipped": "error"})
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            confidence = float(confidence)
+            accepted = confidence >= threshold
+            trace.append({
+                "model": name,
+                "confidence": confidence,
+                "threshold": threshold,
+                "time_ms": round(elapsed, 2),
+                "accepted": accepted
+            })
+            result = (answer, confidence, context, name)
+            if accepted:
+                break
+            if index + 1 < len(stages):
+                self.logger.info(f"{name} confidence {confidence:.2f} below {threshold}, escalating to {stages[index + 1][0]}")
+        return result
@@ -0,0 +1,167 @@
+import hashlib
+import logging
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from urllib.parse import urlsplit, urlunsplit
+from .scheduler import HostScheduler
+
+# Links to files that are never HTML; skipped without a request
+SKIPPED_EXTENSIONS = frozenset([
+    ".7z", ".avi", ".bmp", ".css", ".csv", ".doc", ".docx", ".epub", ".exe", ".gif",
+    ".gz", ".ico", ".jpeg", ".jpg", ".js", ".json", ".mov", ".mp3", ".mp4", ".pdf",
+    ".png", ".ppt", ".pptx", ".rar", ".svg", ".tar", ".tgz", ".wav", ".webm", ".webp",
+    ".woff", ".woff2", ".xls", ".xlsx", ".xml", ".zip"
+])
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url):
+    """
+    Normalise a URL so equivalent spellings compare equal
+
+    Lowercases the scheme and host, drops default ports and the fragment,
+    and gives empty paths a trailing slash.
+
+    Args:
+        url (str): Absolute URL
+
+    Returns:
+        str: Normalised URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+def site_of(url):
+    """Get the host a URL belongs to, ignoring a leading 'www.'"""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class URLSet:
+    """
+    Compact set of normalised URLs
+
+    Stores a 64-bit hash of each URL instead of the string, so a crawl of
+    many thousands of pages keeps only a few dozen bytes per seen URL.
+    """
+
+    def __init__(self, urls=()):
+        self._hashes = set()
+        for url in urls:
+            self.add(url)
+
+    def _key(self, url):
+        return int.from_bytes(hashlib.blake2b(normalize_url(url).encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def add(self, url):
+        """
+        Add a URL
+
+        Returns:
+            bool: True if the URL was not in the set yet
+        """
+        key = self._key(url)
+        if key in self._hashes:
+            return False
+        self._hashes.add(key)
+        return True
+
+    def __contains__(self, url):
+        return self._key(url) in self._hashes
+
+    def __len__(self):
+        return len(self._hashes)
+
+
+class Crawler:
+    """Ingest a site by following same-site links from a seed URL"""
+
+    def __init__(self, pipeline, max_per_host=2, min_interval=0.5, max_in_flight=8):
+        """
+        Args:
+            pipeline (IngestionPipeline): Pipeline used to fetch, process and store pages
+            max_per_host (int): Maximum number of concurrent requests to the crawled host
+            min_interval (float): Minimum number of seconds between requests to the host
+            max_in_flight (int): Maximum number of pages queued on the pipeline at once
+        """
+        self.logger = logging.getLogger(__name__)
+        self.pipeline = pipeline
+        self.max_per_host = max_per_host
+        self.min_interval = min_interval
+        self.max_in_flight = max_in_flight
+
+    def _follow(self, url, site):
+        """Check whether a discovered link should be crawled"""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or site_of(url) != site:
+            return False
+        path = parts.path.lower()
+        dot = path.rfind(".")
+        return dot <= path.rfind("/") or path[dot:] not in SKIPPED_EXTENSIONS
+
+    def crawl(self, seed, max_depth=2, max_pages=50, time_budget=None):
+        """
+        Crawl a site breadth-first, yielding a result per page as it completes
+
+        Pages are fetched through the pipeline's worker pool, with requests to
+        the site limited by a politeness scheduler shared by the whole crawl.
+        The crawl stops scheduling pages once max_pages pages have been
+        scheduled, the frontier is exhausted or the time budget is spent.
+
+        Args:
+            seed (str): URL to start from
+            max_depth (int): Number of link hops followed from the seed
+            max_pages (int): Maximum number of pages fetched
+            time_budget (float): Optional number of seconds after which no new
+                pages are scheduled
+
+        Yields:
+            dict: Result for one page, shaped like the items returned by
+                IngestionPipeline.ingest(), plus its 'depth'
+        """
+        seed = normalize_url(seed)
+        site = site_of(seed)
+        scheduler = HostScheduler(self.max_per_host, self.min_interval)
+        deadline = time.monotonic() + time_budget if time_budget else None
+
+        seen = URLSet([seed])
+        frontier = deque([(seed, 0)])
+        futures = {}
+        scheduled = 0
+        self.logger.info(f"Crawling {site} from {seed} (depth {max_depth}, up to {max_pages} pages)")
+
+        while frontier or futures:
+            out_of_time = deadline is not None and time.monotonic() > deadline
+            while frontier and not out_of_time and scheduled < max_pages and len(futures) < self.max_in_flight:
+                url, depth = frontier.popleft()
+                futures[self.pipeline.executor.submit(self.pipeline.ingest_and_store, url, scheduler)] = (url, depth)
+                scheduled += 1
+
+            if not futures:
+                break
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, depth = futures.pop(future)
+                try:
+                    document, metadata = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error processing {url}: {str(e)}")
+                    yield {"url": url, "content": None, "metadata": None, "error": str(e), "depth": depth}
+                    continue
+
+                if depth < max_depth:
+                    for link in document.links:
+                        if self._follow(link, site) and seen.add(link):
+                            frontier.append((normalize_url(link), depth + 1))
+
+                yield {"url": url, "content": document, "metadata": metadata, "error": None, "depth": depth}
+
+        self.logger.info(f"Finished crawling {site}: {scheduled} pages fetched, {len(seen)} URLs seen")
@@ -0,0 +1,224 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import numpy as np
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# Fingerprint kinds
+PARAGRAPH = 'p'
+DOCUMENT = 'd'
+
+
+def simhash(text, shingle_size=3):
+    """
+    Compute the 64-bit SimHash of a text over word shingles
+
+    Texts that share most of their shingles get fingerprints that differ in
+    only a few bits.
+
+    Args:
+        text (str): Text to fingerprint
+        shingle_size (int): Number of words per shingle
+
+    Returns:
+        int: Unsigned 64-bit fingerprint (0 for texts without words)
+    """
+    words = _TOKEN_RE.findall(text.lower())
+    if not words:
+        return 0
+    if len(words) <= shingle_size:
+        shingles = [' '.join(words)]
+    else:
+        shingles = [' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    digests = b''.join(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(majority, bitorder='little').tobytes(), 'little')
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two fingerprints"""
+    return bin(a ^ b).count('1')
+
+
+def _to_signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class Deduplicator:
+    """
+    Detect documents and paragraphs that repeat across ingested URLs
+
+    Every ingested page is fingerprinted with SimHash, as a whole and per
+    paragraph. A page that nearly matches a page from another URL is
+    reported as a duplicate of it; paragraphs that nearly match a paragraph
+    already seen on another URL (sidebars, cookie banners, footers) are
+    removed, so repeated text is indexed and searched only once. The URL each
+    removal points to is reported, so the page's own text can be restored
+    when that URL is not part of a request, and the page checked again when
+    that URL changes. Fingerprints are persisted in SQLite and kept in memory
+    in a banded index.
+    """
+
+    def __init__(self, path, document_distance=6, paragraph_distance=3, min_paragraph_length=40):
+        """
+        Args:
+            path (str): Path of the SQLite database holding the fingerprints
+            document_distance (int): Maximum number of differing fingerprint bits
+                for two pages to count as near duplicates
+            paragraph_distance (int): Same for paragraphs, which are shorter and
+                so need a tighter limit
+            min_paragraph_length (int): Paragraphs shorter than this many
+                characters are never removed
+        """
+        for distance in (document_distance, paragraph_distance):
+            if not 0 <= distance <= 15:
+                raise ValueError("Fingerprint distances must be between 0 and 15")
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.max_distance = {DOCUMENT: document_distance, PARAGRAPH: paragraph_distance}
+        self.min_paragraph_length = min_paragraph_length
+        self.stats = {"documents": 0, "duplicate_documents": 0, "removed_paragraphs": 0, "removed_chars": 0}
+
+        # Fingerprints are split into distance + 1 bands; two fingerprints within
+        # the distance always agree on at least one band, so only fingerprints
+        # sharing a band with the query need to be compared
+        self._layout = {kind: (distance + 1, 64 // (distance + 1)) for kind, distance in self.max_distance.items()}
+        # kind -> one dict per band of band value -> set of (fingerprint, url)
+        self._bands = {kind: [{} for _ in range(count)] for kind, (count, _) in self._layout.items()}
+        # url -> list of (kind, fingerprint) registered for it
+        self._by_url = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS fingerprints (
+                    url TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    fingerprint INTEGER NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS fingerprints_url ON fingerprints (url)")
+            rows = conn.execute("SELECT url, kind, fingerprint FROM fingerprints").fetchall()
+
+        for url, kind, fingerprint in rows:
+            self._add(url, kind, fingerprint & 0xFFFFFFFFFFFFFFFF)
+        self.logger.info(f"Loaded {len(rows)} fingerprints for {len(self._by_url)} URLs")
+
+    def _connect(self):
+        # A connection per operation keeps the index safe to use from worker threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _band_keys(self, kind, fingerprint):
+        count, bits = self._layout[kind]
+        mask = (1 << bits) - 1
+        return [(fingerprint >> (band * bits)) & mask for band in range(count)]
+
+    def _add(self, url, kind, fingerprint):
+        bands = self._bands[kind]
+        for band, key in enumerate(self._band_keys(kind, fingerprint)):
+            bands[band].setdefault(key, set()).add((fingerprint, url))
+        self._by_url.setdefault(url, []).append((kind, fingerprint))
+
+    def _forget(self, url):
+        """Remove the fingerprints registered for a URL from memory"""
+        for kind, fingerprint in self._by_url.pop(url, []):
+            bands = self._bands[kind]
+            for band, key in enumerate(self._band_keys(kind, fingerprint)):
+                entries = bands[band].get(key)
+                if entries is not None:
+                    entries.discard((fingerprint, url))
+                    if not entries:
+                        del bands[band][key]
+
+    def _match(self, kind, fingerprint, url):
+        """Find another URL with a fingerprint within the kind's maximum distance"""
+        bands = self._bands[kind]
+        max_distance = self.max_distance[kind]
+        for band, key in enumerate(self._band_keys(kind, fingerprint)):
+            for other, other_url in bands[band].get(key, ()):
+                if other_url != url and hamming_distance(fingerprint, other) <= max_distance:
+                    return other_url
+        return None
+
+    def deduplicate(self, url, document):
+        """
+        Remove text that repeats content already ingested from other URLs
+
+        Re-ingesting a URL replaces the fingerprints it registered before.
+
+        Args:
+            url (str): URL the document was extracted from
+            document (ProcessedDocument): Processed single-page document
+
+        Returns:
+            tuple: (ProcessedDocument without repeated paragraphs, dict with
+                'duplicate_of' (URL of a near-identical page, or None),
+                'removed_paragraphs' and 'removed_chars', and a dict giving
+                the URL each removed paragraph repeats, by paragraph index)
+        """
+        document_fingerprint = simhash(document.text)
+        heading_spans = {(start, end) for start, end, _ in document.headings}
+
+        with self._lock:
+            self._forget(url)
+
+            duplicate_of = None
+            if document_fingerprint:
+                duplicate_of = self._match(DOCUMENT, document_fingerprint, url)
+
+            removed = {}
+            registered = []
+            if duplicate_of is None:
+                if document_fingerprint:
+                    registered.append((DOCUMENT, document_fingerprint))
+                for index, (start, end) in enumerate(document.paragraphs):
+                    if end - start < self.min_paragraph_length or (start, end) in heading_spans:
+                        continue
+                    fingerprint = simhash(document.text[start:end])
+                    source = self._match(PARAGRAPH, fingerprint, url)
+                    if source is not None:
+                        removed[index] = source
+                    else:
+                        registered.append((PARAGRAPH, fingerprint))
+
+            for kind, fingerprint in registered:
+                self._add(url, kind, fingerprint)
+            with self._connect() as conn:
+                conn.execute("DELETE FROM fingerprints WHERE url = ?", (url,))
+                conn.executemany(
+                    "INSERT INTO fingerprints VALUES (?, ?, ?)",
+                    [(url, kind, _to_signed(fingerprint)) for kind, fingerprint in registered]
+                )
+
+            if duplicate_of is not None:
+                removed_chars = len(document)
+            else:
+                removed_chars = sum(document.paragraphs[index][1] - document.paragraphs[index][0] for index in removed)
+            self.stats["documents"] += 1
+            self.stats["duplicate_documents"] += duplicate_of is not None
+            self.stats["removed_paragraphs"] += len(removed)
+            self.stats["removed_chars"] += removed_chars
+
+        if duplicate_of is not None:
+            self.logger.info(f"{url} is a near duplicate of {duplicate_of}")
+        elif removed:
+            self.logger.info(f"Removed {len(removed)} repeated paragraphs ({removed_chars} chars) from {url}")
+            document = document.without_paragraphs(set(removed))
+
+        return document, {
+            "duplicate_of": duplicate_of,
+            "removed_paragraphs": len(removed),
+            "removed_chars": removed_chars
+        }, removed
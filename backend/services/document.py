@@ -0,0 +1,324 @@
+import bisect
+import hashlib
+import json
+import re
+from .text_normalizer import NormalizedText, normalize_whitespace
+
+# Sentence boundaries: whitespace after ., ? or ! that does not follow an abbreviation
+_SENTENCE_BREAK_RE = re.compile(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s')
+_PARAGRAPH_BREAK_RE = re.compile(r'\n\s*\n')
+
+
+def sentence_spans(text, offset=0):
+    """
+    Find sentence boundaries in normalised text
+
+    Args:
+        text (str): Normalised text of a single paragraph
+        offset (int): Offset added to every span
+
+    Returns:
+        list: (start, end) character offsets of each sentence
+    """
+    spans = []
+    start = 0
+    for match in _SENTENCE_BREAK_RE.finditer(text):
+        if match.start() > start:
+            spans.append((offset + start, offset + match.start()))
+        start = match.end()
+    if start < len(text):
+        spans.append((offset + start, offset + len(text)))
+    return spans
+
+
+class ProcessedDocument:
+    """
+    Normalised text of one or more pages with structure stored as offsets
+
+    All paragraphs are joined with single spaces into one normalised buffer,
+    so str(document) is a drop-in replacement for the flat processed text.
+    Headings, paragraphs and sentences are (start, end) character offsets
+    into that buffer.
+    """
+
+    def __init__(self, text, title="", paragraphs=None, headings=None, sentences=None, sources=None,
+                 links=None):
+        """
+        Args:
+            text (str): Normalised text buffer
+            title (str): Page title
+            paragraphs (list): (start, end) offsets of each paragraph
+            headings (list): (start, end, level) offsets of paragraphs that are headings
+            sentences (list): (start, end) offsets of each sentence, in order
+            sources (list): (url, start, end) offsets of the text taken from each URL
+            links (list): Absolute URLs linked from the page, used by crawls
+        """
+        self.text = NormalizedText(text)
+        self.title = title
+        self.paragraphs = paragraphs if paragraphs is not None else []
+        self.headings = headings if headings is not None else []
+        self.sentences = sentences if sentences is not None else []
+        self.sources = sources if sources is not None else []
+        self.links = links if links is not None else []
+        self._content_hash = None
+
+    def __str__(self):
+        return self.text
+
+    def __len__(self):
+        return len(self.text)
+
+    @classmethod
+    def from_blocks(cls, blocks, title=""):
+        """
+        Build a document from cleaned paragraphs
+
+        Args:
+            blocks (list): (text, heading_level) pairs; heading_level is 0 for
+                body paragraphs. Texts must already be normalised.
+            title (str): Page title
+
+        Returns:
+            ProcessedDocument: The document
+        """
+        parts = []
+        paragraphs = []
+        headings = []
+        sentences = []
+        position = 0
+        for text, level in blocks:
+            if not text:
+                continue
+            if parts:
+                position += 1  # Separating space
+            end = position + len(text)
+            parts.append(text)
+            paragraphs.append((position, end))
+            if level:
+                headings.append((position, end, level))
+                sentences.append((position, end))
+            else:
+                sentences.extend(sentence_spans(text, position))
+            position = end
+
+        return cls(' '.join(parts), title, paragraphs, headings, sentences)
+
+    @classmethod
+    def from_text(cls, text):
+        """
+        Build a document from plain text, treating blank lines as paragraph breaks
+
+        Args:
+            text (str): Text to segment
+
+        Returns:
+            ProcessedDocument: The document
+        """
+        if isinstance(text, ProcessedDocument):
+            return text
+        blocks = [(normalize_whitespace(block), 0) for block in _PARAGRAPH_BREAK_RE.split(text)]
+        return cls.from_blocks(blocks)
+
+    @classmethod
+    def combine(cls, documents):
+        """
+        Concatenate documents from several URLs into one
+
+        Args:
+            documents (list): (url, ProcessedDocument) pairs
+
+        Returns:
+            ProcessedDocument: Combined document whose sources record where
+                each URL's text starts and ends
+        """
+        parts = []
+        paragraphs = []
+        headings = []
+        sentences = []
+        sources = []
+        position = 0
+        for url, document in documents:
+            if not document.text:
+                continue
+            if parts:
+                position += 1  # Separating space
+            parts.append(document.text)
+            paragraphs.extend((start + position, end + position) for start, end in document.paragraphs)
+            headings.extend((start + position, end + position, level) for start, end, level in document.headings)
+            sentences.extend((start + position, end + position) for start, end in document.sentences)
+            sources.append((url, position, position + len(document.text)))
+            position += len(document.text)
+
+        title = documents[0][1].title if len(documents) == 1 else ""
+        return cls(' '.join(parts), title, paragraphs, headings, sentences, sources)
+
+    def content_hash(self):
+        """SHA-1 hex digest of the text, identifying this version of the content"""
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha1(self.text.encode('utf-8')).hexdigest()
+        return self._content_hash
+
+    def split_sources(self):
+        """
+        Split a combined document back into one document per source URL
+
+        Returns:
+            list: (url, index of the source's first sentence, ProcessedDocument)
+                triples; a document without sources is returned whole with url None
+        """
+        if not self.sources:
+            return [(None, 0, self)]
+
+        span_lists = (self.paragraphs, self.headings, self.sentences)
+        starts = [[span[0] for span in spans] for spans in span_lists]
+        parts = []
+        for url, start, end in self.sources:
+            rebased = []
+            for spans, span_starts in zip(span_lists, starts):
+                first = bisect.bisect_left(span_starts, start)
+                last = bisect.bisect_left(span_starts, end)
+                rebased.append([(span[0] - start, span[1] - start) + tuple(span[2:]) for span in spans[first:last]])
+            part = ProcessedDocument(
+                self.text[start:end],
+                paragraphs=rebased[0],
+                headings=rebased[1],
+                sentences=rebased[2]
+            )
+            parts.append((url, bisect.bisect_left(starts[2], start), part))
+        return parts
+
+    def sentence_texts(self, min_length=0):
+        """
+        Get the text of each sentence
+
+        Args:
+            min_length (int): Skip sentences with this many characters or fewer
+
+        Returns:
+            list: Sentence strings
+        """
+        text = self.text
+        return [text[start:end] for start, end in self.sentences if end - start > min_length]
+
+    def sentence_indices(self, min_length=0):
+        """
+        Get the positions of the sentences returned by sentence_texts()
+
+        Args:
+            min_length (int): Skip sentences with this many characters or fewer
+
+        Returns:
+            list: Indices into self.sentences
+        """
+        return [index for index, (start, end) in enumerate(self.sentences) if end - start > min_length]
+
+    def paragraph_texts(self):
+        """Get the text of each paragraph"""
+        text = self.text
+        return [text[start:end] for start, end in self.paragraphs]
+
+    def blocks(self):
+        """
+        Get the paragraphs in the form accepted by from_blocks()
+
+        Returns:
+            list: (text, heading_level) pairs
+        """
+        text = self.text
+        levels = {(start, end): level for start, end, level in self.headings}
+        return [(text[start:end], levels.get((start, end), 0)) for start, end in self.paragraphs]
+
+    def without_paragraphs(self, indices):
+        """
+        Build a copy of a single-page document with some paragraphs removed
+
+        Args:
+            indices (set): Indices of the paragraphs to drop
+
+        Returns:
+            ProcessedDocument: The new document, keeping title and links
+        """
+        blocks = [block for index, block in enumerate(self.blocks()) if index not in indices]
+        document = ProcessedDocument.from_blocks(blocks, self.title)
+        document.links = self.links
+        return document
+
+    def paragraph_sentences(self):
+        """
+        Group sentences by the paragraph containing them
+
+        Returns:
+            list: One list of sentence strings per paragraph
+        """
+        text = self.text
+        return [
+            [text[self.sentences[index][0]:self.sentences[index][1]] for index in group]
+            for group in self.paragraph_sentence_indices()
+        ]
+
+    def paragraph_sentence_indices(self):
+        """
+        Group sentence positions by the paragraph containing them
+
+        Returns:
+            list: One list of indices into self.sentences per paragraph
+        """
+        groups = []
+        index = 0
+        for start, end in self.paragraphs:
+            group = []
+            while index < len(self.sentences) and self.sentences[index][0] < end:
+                if self.sentences[index][0] >= start:
+                    group.append(index)
+                index += 1
+            groups.append(group)
+        return groups
+
+    def to_dict(self):
+        """Serialise the document to JSON-compatible data"""
+        return {
+            "text": str(self.text),
+            "title": self.title,
+            "paragraphs": self.paragraphs,
+            "headings": self.headings,
+            "sentences": self.sentences,
+            "sources": self.sources,
+            "links": self.links
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a document serialised with to_dict()"""
+        return cls(
+            data["text"],
+            data.get("title", ""),
+            [tuple(span) for span in data.get("paragraphs", [])],
+            [tuple(span) for span in data.get("headings", [])],
+            [tuple(span) for span in data.get("sentences", [])],
+            [tuple(source) for source in data.get("sources", [])],
+            data.get("links", [])
+        )
+
+    def to_json(self):
+        """Serialise the document to a JSON string"""
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, data):
+        """Restore a document serialised with to_json()"""
+        return cls.from_dict(json.loads(data))
+
+
+def as_document(content):
+    """
+    Get a ProcessedDocument for content passed to a QA backend
+
+    Args:
+        content (ProcessedDocument or str): Processed document or plain text
+
+    Returns:
+        ProcessedDocument: The document
+    """
+    if isinstance(content, ProcessedDocument):
+        return content
+    return ProcessedDocument.from_text(content)
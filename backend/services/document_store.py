@@ -0,0 +1,280 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from .document import ProcessedDocument
+from .lru_cache import LRUCache
+
+
+def document_size(document):
+    """Approximate in-memory size of a processed document in bytes"""
+    spans = len(document.paragraphs) + len(document.headings) + len(document.sentences)
+    return len(document.text) + 64 * spans
+
+
+class DocumentStore:
+    """
+    Persistent store of processed documents keyed by URL
+
+    Documents live in SQLite so they survive restarts and are shared by all
+    worker processes; recently used documents are also kept in memory, within
+    a byte budget. A URL whose page duplicates another URL's is stored as a
+    reference to that URL, and a page with paragraphs repeated from other
+    URLs is stored without them. The page's own text is kept alongside, so
+    requests that do not include the URLs it repeats still get all of it,
+    and the URLs each page depends on are recorded so it can be checked
+    again when they change.
+    """
+
+    def __init__(self, path, memory_budget=64 * 1024 * 1024):
+        """
+        Args:
+            path (str): Path of the SQLite database
+            memory_budget (int): Bytes of documents kept in memory
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.memory = LRUCache(memory_budget, sizeof=lambda entry: document_size(entry[1]))
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS documents (
+                    url TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    length INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL
+                )"""
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(documents)")]
+            if "duplicate_of" not in columns:
+                # Added with duplicate detection; older databases are upgraded in place
+                conn.execute("ALTER TABLE documents ADD COLUMN duplicate_of TEXT")
+            if "original" not in columns:
+                # The page's own text and the source URL of each removed paragraph
+                conn.execute("ALTER TABLE documents ADD COLUMN original TEXT")
+                conn.execute("ALTER TABLE documents ADD COLUMN removed TEXT")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS dependencies (
+                    url TEXT NOT NULL,
+                    source TEXT NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS dependencies_source ON dependencies (source)")
+            conn.execute("CREATE INDEX IF NOT EXISTS documents_content_hash ON documents (content_hash)")
+
+    def _connect(self):
+        # A connection per operation keeps the store safe to use from worker threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    def put(self, url, document, duplicate_of=None, original=None, removed=None):
+        """
+        Store the processed document of a URL
+
+        Args:
+            url (str): URL the document was extracted from
+            document (ProcessedDocument): Processed document
+            duplicate_of (str): URL of a stored page with the same content; if
+                given, only the reference is stored and get() returns that page
+            original (ProcessedDocument): The page's own document, when
+                document is a deduplicated copy of it
+            removed (dict): URL repeated by each paragraph of original left
+                out of document, by paragraph index
+
+        Returns:
+            dict: Metadata of the stored document
+        """
+        content_hash = document.content_hash()
+        fetched_at = time.time()
+        content = document.to_json() if duplicate_of is None else ""
+        length = len(document) if duplicate_of is None else 0
+        if duplicate_of is not None and original is None:
+            original = document
+        removed = removed or {}
+        sources = set(removed.values()) | ({duplicate_of} if duplicate_of else set())
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(url, content, content_hash, length, fetched_at, duplicate_of, original, removed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, content, content_hash, length, fetched_at, duplicate_of,
+                 original.to_json() if original is not None else None,
+                 json.dumps({str(index): source for index, source in removed.items()}) if removed else None)
+            )
+            conn.execute("DELETE FROM dependencies WHERE url = ?", (url,))
+            conn.executemany("INSERT INTO dependencies VALUES (?, ?)", [(url, source) for source in sorted(sources)])
+        self.memory.pop((url, 'original'))
+        if duplicate_of is None:
+            self.memory.put(url, (content_hash, document))
+        else:
+            self.memory.pop(url)
+        return {
+            "url": url,
+            "content_hash": content_hash,
+            "length": length,
+            "fetched_at": fetched_at,
+            "duplicate_of": duplicate_of,
+            "depends_on": sorted(sources)
+        }
+
+    def get(self, url, alongside=None):
+        """
+        Get the processed document of a URL
+
+        Args:
+            url (str): URL to look up
+            alongside (set): Stored URLs served together with this one, e.g.
+                the other URLs of a request. Text of the page repeating one
+                of them is left out, and the rest of its own text kept. If
+                None, the deduplicated document stored at ingestion.
+
+        Returns:
+            ProcessedDocument: The document, or None if the URL was never
+                extracted. Without alongside, a duplicate page gets the
+                document of the page it duplicates.
+        """
+        if alongside is not None:
+            return self._get_own(url, alongside)
+        seen = set()
+        with self._connect() as conn:
+            while True:
+                row = conn.execute(
+                    "SELECT content_hash, duplicate_of FROM documents WHERE url = ?", (url,)
+                ).fetchone()
+                if row is None:
+                    self.memory.pop(url)
+                    return None
+                if row[1] is None:
+                    break
+                # Duplicate page: follow the reference to the stored copy
+                seen.add(url)
+                url = row[1]
+                if url in seen:
+                    return None
+
+            # The hash check catches documents replaced by another worker process
+            cached = self.memory.get(url)
+            if cached is not None and cached[0] == row[0]:
+                return cached[1]
+
+            row = conn.execute(
+                "SELECT content_hash, content FROM documents WHERE url = ?", (url,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        document = ProcessedDocument.from_json(row[1])
+        self.memory.put(url, (row[0], document))
+        return document
+
+    def _get_own(self, url, alongside):
+        """The page's own document, without the text it repeats from URLs in alongside"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT content_hash, duplicate_of, removed, original IS NOT NULL FROM documents WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        content_hash, duplicate_of, removed, has_original = row
+        if not has_original:
+            return self.get(url)
+        if duplicate_of is not None and duplicate_of in alongside:
+            return self.get(url)
+
+        removed = {int(index): source for index, source in json.loads(removed or "{}").items()}
+        dropped = {index for index, source in removed.items() if source in alongside}
+        if duplicate_of is None and dropped == set(removed):
+            # Every repeated paragraph is served from its source: the stored deduplicated copy
+            return self.get(url)
+
+        cached = self.memory.get((url, 'original'))
+        if cached is not None and cached[0] == content_hash:
+            original = cached[1]
+        else:
+            with self._connect() as conn:
+                row = conn.execute("SELECT original FROM documents WHERE url = ?", (url,)).fetchone()
+            if row is None or row[0] is None:
+                return self.get(url)
+            original = ProcessedDocument.from_json(row[0])
+            self.memory.put((url, 'original'), (content_hash, original))
+        return original.without_paragraphs(dropped) if dropped else original
+
+    def original(self, url):
+        """
+        Get the page's own document, before any text repeated from other URLs was removed
+
+        Args:
+            url (str): URL to look up
+
+        Returns:
+            ProcessedDocument: The document, or None if the URL was never extracted
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT original FROM documents WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        if row[0] is None:
+            return self.get(url)
+        return ProcessedDocument.from_json(row[0])
+
+    def dependants(self, url):
+        """
+        List the URLs whose stored document depends on a URL's
+
+        Returns:
+            list: URLs stored as duplicates of url, or with paragraphs removed
+                because they repeat it
+        """
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT DISTINCT url FROM dependencies WHERE source = ? ORDER BY url", (url,)
+            )]
+
+    def __contains__(self, url):
+        return self.metadata(url) is not None
+
+    def metadata(self, url):
+        """
+        Get the metadata of a stored URL
+
+        Args:
+            url (str): URL to look up
+
+        Returns:
+            dict: 'url', 'content_hash', 'length', 'fetched_at',
+                'duplicate_of' and 'depends_on', or None
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT url, content_hash, length, fetched_at, duplicate_of FROM documents WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            sources = [source for (source,) in conn.execute(
+                "SELECT source FROM dependencies WHERE url = ? ORDER BY source", (url,)
+            )]
+        return {"url": row[0], "content_hash": row[1], "length": row[2], "fetched_at": row[3], "duplicate_of": row[4],
+                "depends_on": sources}
+
+    def urls(self):
+        """List all stored URLs"""
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT url FROM documents ORDER BY url")]
+
+    def content_hashes(self):
+        """Get the set of content hashes of all stored documents"""
+        with self._connect() as conn:
+            return {row[0] for row in conn.execute("SELECT DISTINCT content_hash FROM documents")}
+
+    def has_content(self, content_hash):
+        """Check whether any stored URL has a document with this content hash"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT 1 FROM documents WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone() is not None
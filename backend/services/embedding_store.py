@@ -0,0 +1,181 @@
+import logging
+import os
+import re
+import tempfile
+import time
+import numpy as np
+from .lru_cache import LRUCache
+
+_UNSAFE_RE = re.compile(r'[^\w.-]+')
+
+
+def normalize_rows(matrix):
+    """Scale each row of a matrix to unit length, so dot products are cosine similarities"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class EmbeddingStore:
+    """
+    Embedding matrices on disk, memory-mapped and keyed by content hash
+
+    Each matrix is a .npy file of unit-length rows under a namespace such as
+    "<model>/sentences", so it is computed once per version of a document and
+    shared by every process and model that uses the same encoder. Files are
+    opened with mmap, so only the pages actually read are loaded. Matrices of
+    content that is no longer stored are deleted with remove() or collect().
+    """
+
+    def __init__(self, directory, dtype='float16', max_open=1024):
+        """
+        Args:
+            directory (str): Directory holding the matrices
+            dtype (str): 'float16' (half the disk and page cache) or 'float32'
+            max_open (int): Number of memory-mapped matrices kept open
+        """
+        if dtype not in ('float16', 'float32'):
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self._open = LRUCache(max_open, sizeof=lambda matrix: 1)
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, namespace, content_hash):
+        parts = [_UNSAFE_RE.sub('_', part) for part in namespace.split('/')]
+        return os.path.join(self.directory, *parts, f"{content_hash}.npy")
+
+    def get(self, namespace, content_hash):
+        """
+        Get a stored matrix
+
+        Args:
+            namespace (str): Encoder and kind of texts, e.g. "all-MiniLM-L6-v2/sentences"
+            content_hash (str): Content hash of the document
+
+        Returns:
+            numpy.ndarray: Read-only memory-mapped matrix, or None if not stored
+        """
+        path = self._path(namespace, content_hash)
+        matrix = self._open.get(path)
+        if matrix is None:
+            try:
+                matrix = np.load(path, mmap_mode='r')
+            except (FileNotFoundError, ValueError):
+                return None
+            self._open.put(path, matrix)
+        return matrix
+
+    def put(self, namespace, content_hash, matrix):
+        """
+        Normalise and store a matrix
+
+        Args:
+            namespace (str): Encoder and kind of texts
+            content_hash (str): Content hash of the document
+            matrix (numpy.ndarray): One embedding per row
+
+        Returns:
+            numpy.ndarray: The stored matrix, memory-mapped
+        """
+        path = self._path(namespace, content_hash)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        rows = normalize_rows(matrix).astype(self.dtype)
+        # Write to a temporary file first so readers never see a partial matrix
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, rows)
+            os.replace(temporary, path)
+        except Exception:
+            os.unlink(temporary)
+            raise
+
+        self._open.pop(path)
+        return self.get(namespace, content_hash)
+
+    def get_or_compute(self, namespace, content_hash, compute):
+        """
+        Get a stored matrix, computing and storing it first if needed
+
+        Args:
+            namespace (str): Encoder and kind of texts
+            content_hash (str): Content hash of the document
+            compute (callable): Returns the matrix when it is not stored
+
+        Returns:
+            numpy.ndarray: Memory-mapped matrix
+        """
+        matrix = self.get(namespace, content_hash)
+        if matrix is None:
+            matrix = self.put(namespace, content_hash, compute())
+        return matrix
+
+    def _matrices(self):
+        """Yield the path and content hash of every stored matrix"""
+        for directory, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.npy'):
+                    yield os.path.join(directory, name), name[:-len('.npy')]
+
+    def _delete(self, path):
+        self._open.pop(path)
+        try:
+            # Readers that already mapped the file keep their pages until they close it
+            os.unlink(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def remove(self, content_hash):
+        """
+        Delete the matrices of a document version in every namespace
+
+        Args:
+            content_hash (str): Content hash of the document
+
+        Returns:
+            int: Number of matrices deleted
+        """
+        removed = 0
+        for directory, _, names in os.walk(self.directory):
+            if f"{content_hash}.npy" in names:
+                removed += self._delete(os.path.join(directory, f"{content_hash}.npy"))
+        return removed
+
+    def collect(self, referenced):
+        """
+        Delete the matrices of content hashes that are no longer referenced
+
+        Matrices are also computed for text that is never stored, such as
+        pasted text or a page served without the paragraphs it repeats from
+        another URL of the request; they are computed again when needed.
+        Files written after the pass starts are kept, as their documents may
+        be stored while it runs.
+
+        Args:
+            referenced (set): Content hashes to keep, e.g. those of the stored documents
+
+        Returns:
+            int: Number of matrices deleted
+        """
+        started = time.time()
+        removed = 0
+        for path, content_hash in list(self._matrices()):
+            if content_hash in referenced:
+                continue
+            try:
+                if os.path.getmtime(path) >= started:
+                    continue
+            except FileNotFoundError:
+                continue
+            removed += self._delete(path)
+        if removed:
+            self.logger.info(f"Deleted {removed} embedding matrices of content no longer stored")
+        return removed
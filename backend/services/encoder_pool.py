@@ -0,0 +1,202 @@
+import hashlib
+import logging
+import threading
+import weakref
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+from .embedding_store import normalize_rows
+from .lru_cache import LRUCache
+from .batching import MicroBatcher
+
+
+def text_hash(text):
+    """SHA-1 digest of a text, keying its embedding in the cache"""
+    return hashlib.sha1(text.encode('utf-8')).digest()
+
+
+class SharedEncoder:
+    """
+    A sentence encoder shared by every backend using the same model
+
+    Embeddings go through the pool's content-addressed cache, so a text
+    embedded once, by any backend, is not encoded again while it is cached.
+    When the pool sets a batch wait, texts missing from the cache are
+    encoded together with those of concurrent requests.
+    """
+
+    def __init__(self, pool, model_name, model):
+        """
+        Args:
+            pool (EncoderPool): Pool owning the cache
+            model_name (str): Name of the model, part of the cache keys
+            model (SentenceTransformer): Loaded model
+        """
+        self.pool = pool
+        self.model_name = model_name
+        self.model = model
+        self.batcher = None
+        if pool.batch_wait_ms is not None:
+            self.batcher = MicroBatcher(self._encode_batch, max_batch_size=pool.max_batch_size,
+                                        max_wait=pool.batch_wait_ms / 1000, name=f"encoder-batcher-{model_name}")
+    
+    def _encode_batch(self, texts):
+        """Encode texts with the model, without the cache"""
+        return list(normalize_rows(self.model.encode(texts, convert_to_numpy=True)))
+
+    def encode(self, texts):
+        """
+        Encode texts into unit-length embeddings, reusing cached ones
+
+        Args:
+            texts (list): Texts to encode
+
+        Returns:
+            numpy.ndarray: One float32 row per text
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        keys = [(self.model_name, text_hash(text)) for text in texts]
+        rows = [self.pool.cache.get(key) for key in keys]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        self.pool.record(len(texts) - len(missing), len(missing))
+
+        if missing:
+            # Texts repeated within the call are encoded once
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            encoded = self.batcher.submit(unique) if self.batcher is not None else self._encode_batch(unique)
+            # Copies, so a cached row does not keep the whole batch alive
+            by_text = {text: row.copy() for text, row in zip(unique, encoded)}
+            for i in missing:
+                rows[i] = by_text[texts[i]]
+                self.pool.cache.put(keys[i], rows[i])
+
+        if not rows:
+            return np.zeros((0, self.dimension()), dtype=np.float32)
+        return np.stack(rows)
+
+    def dimension(self):
+        """Size of the embeddings"""
+        return self.model.get_sentence_embedding_dimension()
+
+    def weight_bytes(self):
+        """Bytes of the model's weights, or None when they live outside PyTorch (ONNX Runtime)"""
+        parameters = list(self.model.parameters()) if isinstance(self.model, torch.nn.Module) else []
+        if not parameters:
+            return None
+        return sum(parameter.numel() * parameter.element_size() for parameter in parameters)
+
+
+class EncoderPool:
+    """
+    Sentence encoders shared by the embedding backends, with one embedding cache
+
+    Backends get their encoder by model name, so backends built on the same
+    checkpoint share one copy of its weights. The pool only keeps weak
+    references: an encoder is freed when the last backend using it is
+    unloaded, and loaded again by the next backend asking for it. Embeddings
+    of every encoder share a cache keyed by (model, text hash), bounded in bytes.
+    """
+
+    def __init__(self, cache_bytes=64 * 1024 * 1024, engine='torch', intra_op_threads=None, inter_op_threads=None,
+                 batch_wait_ms=None, max_batch_size=32):
+        """
+        Args:
+            cache_bytes (int): Bytes of embeddings kept in the cache
+            engine (str): Inference engine, 'torch', 'onnx' or 'onnx-int8';
+                PyTorch is used if the ONNX encoder cannot be loaded
+            intra_op_threads (int): ONNX Runtime intra-op threads
+            inter_op_threads (int): ONNX Runtime inter-op threads
+            batch_wait_ms (float): Milliseconds a request may wait to share
+                an encoding pass with concurrent requests, or None to encode
+                each request on its own
+            max_batch_size (int): Number of texts from which a shared batch
+                runs without waiting
+        """
+        self.logger = logging.getLogger(__name__)
+        self.engine = engine
+        self.batch_wait_ms = batch_wait_ms
+        self.max_batch_size = max_batch_size
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.cache = LRUCache(cache_bytes, sizeof=lambda row: row.nbytes)
+        self.hits = 0
+        self.misses = 0
+        self._encoders = weakref.WeakValueDictionary()
+        self._engines = {}
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    def get(self, model_name):
+        """
+        Get the shared encoder of a model, loading it if no backend holds it
+
+        Args:
+            model_name (str): SentenceTransformer model name
+
+        Returns:
+            SharedEncoder: Encoder; keep a reference for as long as it is used
+        """
+        with self._lock:
+            encoder = self._encoders.get(model_name)
+            if encoder is None:
+                encoder = SharedEncoder(self, model_name, self._load(model_name))
+                self._encoders[model_name] = encoder
+            return encoder
+
+    def _load(self, model_name):
+        """Load a SentenceTransformer with the configured inference engine, falling back to PyTorch"""
+        self._engines[model_name] = 'torch'
+        if self.engine != 'torch':
+            try:
+                from .onnx_runtime import sentence_transformer_kwargs
+                model = SentenceTransformer(model_name, device=self.device, **sentence_transformer_kwargs(
+                    self.engine, self.intra_op_threads, self.inter_op_threads
+                ))
+                self._engines[model_name] = self.engine
+                self.logger.info(f"Loaded encoder {model_name} ({self.engine})")
+                return model
+            except Exception as e:
+                self.logger.error(f"Error loading ONNX encoder, falling back to PyTorch: {str(e)}")
+        model = SentenceTransformer(model_name, device=self.device)
+        self.logger.info(f"Loaded encoder {model_name} on {self.device}")
+        return model
+
+    def engine_of(self, model_name):
+        """Inference engine the model was last loaded with"""
+        return self._engines.get(model_name, 'torch')
+
+    def record(self, hits, misses):
+        """Count cache lookups"""
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self):
+        """
+        Describe the loaded encoders and the embedding cache
+
+        Returns:
+            dict: 'encoders' (model name -> engine, weight bytes and batcher
+                stats) and 'cache' (entries, bytes, max_bytes, hits, misses, hit_rate)
+        """
+        lookups = self.hits + self.misses
+        return {
+            "encoders": {
+                name: {
+                    "engine": self.engine_of(name),
+                    "weight_bytes": encoder.weight_bytes(),
+                    "batching": encoder.batcher.stats() if encoder.batcher is not None else None
+                }
+                for name, encoder in list(self._encoders.items())
+            },
+            "cache": {
+                "entries": len(self.cache),
+                "bytes": self.cache.current_bytes,
+                "max_bytes": self.cache.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None
+            }
+        }
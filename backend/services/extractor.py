@@ -1,18 +1,143 @@
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 import html2text
+import codecs
+import contextlib
 import logging
+import re
+from urllib.parse import urljoin, urldefrag
+import lxml.html
+from lxml import etree
+from .scheduler import HostScheduler
+
+# Elements removed before extracting text
+DROPPED_TAGS = ("script", "style", "header", "footer", "nav", "noscript", "template")
+
+# Elements that start a new paragraph in the lxml engine output
+BLOCK_TAGS = frozenset([
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+    "figcaption", "figure", "form", "h1", "h2", "h3", "h4", "h5", "h6", "hr",
+    "li", "main", "ol", "p", "pre", "section", "table", "td", "th", "tr", "ul"
+])
+
+HEADING_LEVELS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+
+# Content types that are downloaded; anything else is rejected before reading the body
+HTML_CONTENT_TYPES = frozenset(["text/html", "application/xhtml+xml"])
+TEXT_CONTENT_TYPES = frozenset(["text/plain"])
+
+_HEADER_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+# Block boundaries are marked with NUL while rendering; parsed text never contains it
+_BLOCK_BREAK_RE = re.compile(r' ?(?:\x00 ?)+')
 
 class ContentExtractor:
     """Extract content from URLs"""
     
-    def __init__(self):
-        self.converter = html2text.HTML2Text()
-        self.converter.ignore_links = False
-        self.converter.ignore_images = True
-        self.converter.ignore_emphasis = False
-        self.converter.body_width = 0  # No wrapping
+    def __init__(self, timeout=10, max_per_host=4, pool_maxsize=16, engine='html2text',
+                 max_bytes=5 * 1024 * 1024, chunk_size=64 * 1024):
+        """
+        Args:
+            timeout (float): Request timeout in seconds
+            max_per_host (int): Maximum number of concurrent requests to a single host
+            pool_maxsize (int): Keep-alive connections kept open per host
+            engine (str): 'html2text' (BeautifulSoup + html2text markdown) or
+                'lxml' (single pass over the lxml tree, emitting plain text)
+            max_bytes (int): Maximum number of body bytes read per page; larger
+                pages are cut off at this size
+            chunk_size (int): Size of the chunks streamed from the network
+        """
+        if engine not in ('html2text', 'lxml'):
+            raise ValueError(f"Unknown extraction engine: {engine}")
+        self.engine = engine
         self.logger = logging.getLogger(__name__)
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        
+        # One shared session so connections to the same host are reused
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        })
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # Limits concurrent requests per host
+        self.scheduler = HostScheduler(max_per_host)
+    
+    def _make_converter(self):
+        """Create an html2text converter (they keep parse state, so one per call)"""
+        converter = html2text.HTML2Text()
+        converter.ignore_links = False
+        converter.ignore_images = True
+        converter.ignore_emphasis = False
+        converter.body_width = 0  # No wrapping
+        return converter
+    
+    def _detect_charset(self, content_type, head):
+        """
+        Determine the charset of a page without statistical detection
+        
+        Checks the Content-Type header, then a byte order mark, then a
+        <meta charset> declaration near the start of the document.
+        
+        Args:
+            content_type (str): Content-Type header of the response
+            head (bytes): First bytes of the body
+            
+        Returns:
+            str: Name of a codec known to Python
+        """
+        candidates = []
+        match = _HEADER_CHARSET_RE.search(content_type)
+        if match:
+            candidates.append(match.group(1))
+        
+        if head.startswith(codecs.BOM_UTF8):
+            candidates.insert(0, 'utf-8')
+        elif head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            candidates.insert(0, 'utf-16')
+        
+        match = _META_CHARSET_RE.search(head)
+        if match:
+            candidates.append(match.group(1).decode('ascii', 'ignore'))
+        
+        for candidate in candidates:
+            try:
+                return codecs.lookup(candidate).name
+            except LookupError:
+                continue
+        return 'utf-8'
+    
+    def _media_type(self, response):
+        """Get the media type of a response, without parameters"""
+        content_type = response.headers.get('Content-Type', 'text/html')
+        return content_type.split(';', 1)[0].strip().lower()
+    
+    def _iter_body(self, response):
+        """Yield body chunks, stopping once max_bytes have been read"""
+        received = 0
+        for chunk in response.iter_content(chunk_size=self.chunk_size):
+            if received + len(chunk) > self.max_bytes:
+                yield chunk[:self.max_bytes - received]
+                self.logger.warning(f"Cut off {response.url} after {self.max_bytes} bytes")
+                return
+            received += len(chunk)
+            yield chunk
+    
+    def _read_head(self, chunks, size=4096):
+        """Read at least size bytes (or the whole body) from a chunk iterator"""
+        head = b''
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= size:
+                break
+        return head
     
     def extract(self, url):
         """
@@ -29,41 +154,210 @@ class ContentExtractor:
         """
         self.logger.info(f"Extracting content from {url}")
         
-        try:
-            # Send request
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
+        with self.open(url) as response:
+            return self.parse(response)
+    
+    @contextlib.contextmanager
+    def open(self, url, headers=None, scheduler=None):
+        """
+        Open a streaming request to a URL
+        
+        Only the headers are read before yielding. The Content-Type is checked
+        first so binary downloads are rejected without reading their body.
+        The response is closed and the per-host slot released on exit.
+        
+        Args:
+            url (str): URL to fetch
+            headers (dict): Extra request headers, e.g. conditional request validators
+            scheduler (HostScheduler): Scheduler limiting requests to the host,
+                e.g. a rate-limited one for crawls; defaults to the extractor's own
             
-            # Parse HTML
-            soup = BeautifulSoup(response.text, 'lxml')
+        Yields:
+            requests.Response: The streaming response (status 200 or 304)
             
-            # Remove script and style elements
-            for script in soup(["script", "style", "header", "footer", "nav"]):
-                script.extract()
+        Raises:
+            Exception: If the request fails or the content type is not supported
+        """
+        with (scheduler or self.scheduler).slot(url):
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+            except requests.exceptions.RequestException as e:
+                self.logger.error(f"Request error for {url}: {str(e)}")
+                raise Exception(f"Failed to fetch content from {url}: {str(e)}")
             
-            # Extract title
-            title = ""
-            if soup.title:
-                title = soup.title.get_text()
+            try:
+                response.raise_for_status()
+                
+                media_type = self._media_type(response)
+                if response.status_code != 304 and media_type not in HTML_CONTENT_TYPES | TEXT_CONTENT_TYPES:
+                    raise Exception(f"Unsupported content type {media_type} for {url}")
+                
+                yield response
+                
+            except requests.exceptions.RequestException as e:
+                self.logger.error(f"Request error for {url}: {str(e)}")
+                raise Exception(f"Failed to fetch content from {url}: {str(e)}")
             
-            # Extract main content - focus on article, main, or content divs if available
-            main_content = soup.find('article') or soup.find('main') or soup.find(id='content') or soup
+            finally:
+                response.close()
+    
+    def parse(self, response, links=None):
+        """
+        Extract the main text content from a fetched page
+        
+        The body is streamed and never read past max_bytes. Plain-text
+        responses are returned without HTML parsing.
+        
+        Args:
+            response (requests.Response): Response yielded by open()
+            links (list): If given, absolute URLs of the page's links are
+                appended to it, including those in navigation removed from the text
             
-            # Convert HTML to text
-            text_content = self.converter.handle(str(main_content))
+        Returns:
+            str: Extracted content
             
-            # Combine title and content
-            full_content = f"# {title}\n\n{text_content}" if title else text_content
+        Raises:
+            Exception: If parsing fails
+        """
+        try:
+            chunks = self._iter_body(response)
+            head = self._read_head(chunks)
+            charset = self._detect_charset(response.headers.get('Content-Type', ''), head)
             
-            return full_content
+            if self._media_type(response) in TEXT_CONTENT_TYPES:
+                return (head + b''.join(chunks)).decode(charset, errors='replace')
+            if not head.strip():
+                return ""
+            
+            if self.engine == 'lxml':
+                return self._parse_lxml(head, chunks, charset, response.url, links)
+            return self._parse_html2text(head + b''.join(chunks), charset, response.url, links)
             
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Request error for {url}: {str(e)}")
-            raise Exception(f"Failed to fetch content from {url}: {str(e)}")
-        
         except Exception as e:
-            self.logger.error(f"Error extracting content from {url}: {str(e)}")
-            raise Exception(f"Error processing content from {url}: {str(e)}")
\ No newline at end of file
+            self.logger.error(f"Error extracting content from {response.url}: {str(e)}")
+            raise Exception(f"Error processing content from {response.url}: {str(e)}")
+    
+    def _parse_html2text(self, body, charset, base_url, links):
+        """Extract content with BeautifulSoup and convert it to markdown with html2text"""
+        # Parse HTML
+        soup = BeautifulSoup(body.decode(charset, errors='replace'), 'lxml')
+        
+        if links is not None:
+            base = soup.find('base', href=True)
+            links.extend(self._resolve_links(
+                base['href'] if base else None, base_url,
+                [(a['href'], a.get('rel')) for a in soup.find_all('a', href=True)]
+            ))
+        
+        # Remove script and style elements
+        for script in soup(list(DROPPED_TAGS)):
+            script.extract()
+        
+        # Extract title
+        title = ""
+        if soup.title:
+            title = soup.title.get_text()
+        
+        # Extract main content - focus on article, main, or content divs if available
+        main_content = soup.find('article') or soup.find('main') or soup.find(id='content') or soup
+        
+        # Convert HTML to text
+        text_content = self._make_converter().handle(str(main_content))
+        
+        # Combine title and content
+        full_content = f"# {title}\n\n{text_content}" if title else text_content
+        
+        return full_content
+    
+    def _parse_lxml(self, head, chunks, charset, base_url, links):
+        """Feed the streamed body into lxml's incremental parser and extract plain text"""
+        parser = lxml.html.HTMLParser(encoding=charset, remove_comments=True, remove_pis=True)
+        parser.feed(head)
+        for chunk in chunks:
+            parser.feed(chunk)
+        root = parser.close()
+        
+        if links is not None:
+            base = root.find('.//base[@href]')
+            links.extend(self._resolve_links(
+                base.get('href') if base is not None else None, base_url,
+                [(a.get('href'), a.get('rel', '').split()) for a in root.iter('a') if a.get('href')]
+            ))
+        
+        return self._render_tree(root)
+    
+    def _resolve_links(self, base_href, base_url, anchors):
+        """
+        Turn the href attributes of a page's anchors into absolute URLs
+        
+        Args:
+            base_href (str): href of the page's <base> element, if any
+            base_url (str): URL the page was fetched from (after redirects)
+            anchors (iterable): (href, rel) pairs; rel is a list of link types
+            
+        Returns:
+            list: Absolute http(s) URLs without fragments, in page order,
+                skipping rel="nofollow" links
+        """
+        if base_href:
+            base_url = urljoin(base_url, base_href.strip())
+        resolved = []
+        for href, rel in anchors:
+            if rel and 'nofollow' in rel:
+                continue
+            url = urldefrag(urljoin(base_url, href.strip()))[0]
+            if url.startswith(('http://', 'https://')):
+                resolved.append(url)
+        return resolved
+    
+    def _render_tree(self, root):
+        """
+        Render the main content of a parsed document as plain text
+        
+        Paragraph-level elements are separated by blank lines and headings
+        keep their markdown markers, matching the shape of the html2text output.
+        
+        Args:
+            root (lxml.html.HtmlElement): Root of the parsed document
+            
+        Returns:
+            str: Extracted content
+        """
+        etree.strip_elements(root, *DROPPED_TAGS, with_tail=False)
+        
+        title = (root.findtext('.//title') or '').strip()
+        
+        # Extract main content - focus on article, main, or content divs if available
+        main_content = root.find('.//article')
+        if main_content is None:
+            main_content = root.find('.//main')
+        if main_content is None:
+            main_content = root.get_element_by_id('content', None)
+        if main_content is None:
+            main_content = root
+        
+        parts = []
+        walker = etree.iterwalk(main_content, events=('start', 'end'))
+        for event, element in walker:
+            tag = element.tag
+            if event == 'start':
+                if tag == 'head':
+                    walker.skip_subtree()
+                    continue
+                if tag in BLOCK_TAGS:
+                    parts.append('\x00')
+                    if tag in HEADING_LEVELS:
+                        parts.append('#' * HEADING_LEVELS[tag] + ' ')
+                if element.text:
+                    parts.append(element.text)
+            else:
+                if tag in BLOCK_TAGS:
+                    parts.append('\x00')
+                if element.tail and element is not main_content:
+                    parts.append(element.tail)
+        
+        text_content = _WHITESPACE_RE.sub(' ', ''.join(parts))
+        text_content = _BLOCK_BREAK_RE.sub('\n\n', text_content).strip()
+        
+        # Combine title and content
+        return f"# {title}\n\n{text_content}" if title else text_content
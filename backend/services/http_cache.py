@@ -0,0 +1,172 @@
+import logging
+import os
+import re
+import sqlite3
+import time
+
+_MAX_AGE_RE = re.compile(r'max-age\s*=\s*"?(\d+)"?', re.IGNORECASE)
+
+class HTTPCache:
+    """Persistent conditional HTTP cache of processed page content, keyed by URL"""
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            path (str): Path of the SQLite database holding the cache
+            max_bytes (int): Total size of cached content before least recently
+                used entries are evicted
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.max_bytes = max_bytes
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    expires_at REAL NOT NULL,
+                    content TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+
+    def _connect(self):
+        # A connection per operation keeps the cache safe to use from worker threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _expires_at(self, response):
+        """Compute the freshness deadline of a response from its Cache-Control header"""
+        cache_control = response.headers.get('Cache-Control', '')
+        if 'no-cache' in cache_control.lower():
+            return 0.0
+        match = _MAX_AGE_RE.search(cache_control)
+        if match:
+            return time.time() + int(match.group(1))
+        return 0.0
+
+    def lookup(self, url):
+        """
+        Look up the cached entry for a URL
+
+        Args:
+            url (str): URL to look up
+
+        Returns:
+            dict: Entry with 'etag', 'last_modified', 'expires_at' and 'content',
+                or None if the URL is not cached
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT etag, last_modified, expires_at, content FROM responses WHERE url = ?",
+                (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+
+        return {
+            "etag": row[0],
+            "last_modified": row[1],
+            "expires_at": row[2],
+            "content": row[3]
+        }
+
+    def is_fresh(self, entry):
+        """Check whether an entry can be served without revalidation"""
+        return entry is not None and entry["expires_at"] > time.time()
+
+    def validators(self, entry):
+        """
+        Build conditional request headers for a cached entry
+
+        Args:
+            entry (dict): Entry returned by lookup(), or None
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since headers
+        """
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers['If-None-Match'] = entry["etag"]
+            if entry["last_modified"]:
+                headers['If-Modified-Since'] = entry["last_modified"]
+        return headers
+
+    def store(self, url, response, content):
+        """
+        Store processed content along with the response validators
+
+        Args:
+            url (str): URL the content was fetched from
+            response (requests.Response): The 200 response
+            content (str): Serialised processed content to reuse on revalidation
+        """
+        if 'no-store' in response.headers.get('Cache-Control', '').lower():
+            return
+
+        size = len(content.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    response.headers.get('ETag'),
+                    response.headers.get('Last-Modified'),
+                    self._expires_at(response),
+                    content,
+                    size,
+                    now
+                )
+            )
+            self._evict(conn)
+
+    def refresh(self, url, response):
+        """
+        Extend the freshness of an entry after a 304 Not Modified response
+
+        Args:
+            url (str): URL that was revalidated
+            response (requests.Response): The 304 response
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE responses SET expires_at = ?, last_access = ?, "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (
+                    self._expires_at(response),
+                    time.time(),
+                    response.headers.get('ETag'),
+                    response.headers.get('Last-Modified'),
+                    url
+                )
+            )
+
+    def _evict(self, conn):
+        """Drop least recently used entries until the cache fits its size budget"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        for url, size in conn.execute("SELECT url, size FROM responses ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((url,))
+            total -= size
+
+        conn.executemany("DELETE FROM responses WHERE url = ?", evicted)
+        self.logger.info(f"Evicted {len(evicted)} entries from HTTP cache")
@@ -0,0 +1,215 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .document import ProcessedDocument
+
+class IngestionPipeline:
+    """Fetch and process batches of URLs concurrently"""
+
+    def __init__(self, extractor, processor, max_workers=8, cache=None, store=None, deduplicator=None,
+                 lexical_index=None, embedding_store=None):
+        """
+        Args:
+            extractor (ContentExtractor): Extractor used to fetch and parse pages
+            processor (ContentProcessor): Processor used to clean extracted content
+            max_workers (int): Size of the worker pool shared by all requests
+            cache (HTTPCache): Optional conditional cache of processed pages
+            store (DocumentStore): Optional store receiving every ingested document
+            deduplicator (Deduplicator): Optional detector of pages and paragraphs
+                repeated across URLs, applied before documents are stored
+            lexical_index (LexicalIndex): Optional BM25 index updated with every
+                stored document
+            embedding_store (EmbeddingStore): Optional store of precomputed
+                embeddings; when a URL's content changes, the matrices of its
+                previous version are deleted unless another URL still has it
+        """
+        self.logger = logging.getLogger(__name__)
+        self.extractor = extractor
+        self.processor = processor
+        self.cache = cache
+        self.store = store
+        self.deduplicator = deduplicator
+        self.lexical_index = lexical_index
+        self.embedding_store = embedding_store
+        self.indexers = []
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ingest')
+
+    def add_indexer(self, indexer):
+        """
+        Register a callback run on every stored document, e.g. to precompute embeddings
+
+        Args:
+            indexer (callable): Called with (url, ProcessedDocument) after the
+                document is stored; errors are logged and do not fail ingestion
+        """
+        self.indexers.append(indexer)
+
+    def _cached_document(self, url):
+        """Look up a URL in the HTTP cache and restore its processed document"""
+        entry = self.cache.lookup(url)
+        if entry is None:
+            return None, None
+        try:
+            return entry, ProcessedDocument.from_json(entry["content"])
+        except (ValueError, KeyError):
+            # Entry written in an older format; fetch the page again
+            return None, None
+
+    def ingest_url(self, url, scheduler=None):
+        """
+        Extract and process a single URL
+
+        Args:
+            url (str): URL to ingest
+            scheduler (HostScheduler): Optional scheduler limiting requests to
+                the URL's host, instead of the extractor's own
+
+        Returns:
+            ProcessedDocument: Processed content, with the page's links
+        """
+        entry = document = None
+        if self.cache is not None:
+            entry, document = self._cached_document(url)
+            if self.cache.is_fresh(entry):
+                self.logger.info(f"Serving {url} from HTTP cache")
+                return document
+
+        headers = self.cache.validators(entry) if self.cache is not None else None
+        with self.extractor.open(url, headers=headers, scheduler=scheduler) as response:
+            if entry and response.status_code == 304:
+                # Unchanged upstream: reuse the processed document without parsing again
+                self.logger.info(f"{url} not modified, reusing cached content")
+                self.cache.refresh(url, response)
+                return document
+
+            links = []
+            document = self.processor.process_document(self.extractor.parse(response, links))
+            document.links = list(dict.fromkeys(links))
+
+        if self.cache is not None:
+            self.cache.store(url, response, document.to_json())
+        return document
+
+    def ingest_and_store(self, url, scheduler=None):
+        """
+        Ingest a URL and save the result to the document store
+
+        Args:
+            url (str): URL to ingest
+            scheduler (HostScheduler): Optional scheduler passed to ingest_url()
+
+        Returns:
+            tuple: (ProcessedDocument, metadata or None). Metadata comes from the
+                document store, with a 'dedup' entry when duplicates are detected.
+                The document has repeated paragraphs removed; a page duplicating
+                another URL is returned whole and marked 'duplicate_of'.
+        """
+        return self._store(url, self.ingest_url(url, scheduler))
+
+    def _store(self, url, document, seen=None):
+        """
+        Deduplicate, store and index the own document of a URL
+
+        When the stored document of a URL changes, pages stored as duplicates
+        of it or without paragraphs repeating it are deduplicated again from
+        their own text, so they neither point to text they no longer repeat
+        nor miss paragraphs it no longer has.
+
+        Args:
+            url (str): URL the document was extracted from
+            document (ProcessedDocument): The page's own processed document
+            seen (set): URLs already stored in this round of rechecks
+
+        Returns:
+            tuple: (ProcessedDocument, metadata or None), as ingest_and_store()
+        """
+        previous = self.store.metadata(url) if self.store is not None else None
+        if self.deduplicator is None:
+            metadata = self.store.put(url, document) if self.store is not None else None
+        else:
+            original = document
+            document, dedup, removed = self.deduplicator.deduplicate(url, document)
+            if self.store is not None:
+                metadata = self.store.put(
+                    url, document, duplicate_of=dedup["duplicate_of"],
+                    original=original if removed else None, removed=removed
+                )
+            else:
+                metadata = {"url": url, "duplicate_of": dedup["duplicate_of"]}
+            metadata["dedup"] = dedup
+
+        if not (metadata and metadata.get("duplicate_of")):
+            if self.lexical_index is not None:
+                self.lexical_index.add(url, document)
+            for indexer in self.indexers:
+                try:
+                    indexer(url, document)
+                except Exception as e:
+                    self.logger.error(f"Error indexing {url}: {str(e)}")
+        elif self.lexical_index is not None:
+            # Its text is now searched through the page it duplicates
+            self.lexical_index.remove(url)
+
+        if (self.embedding_store is not None and previous is not None
+                and previous["content_hash"] != metadata["content_hash"]
+                and not self.store.has_content(previous["content_hash"])):
+            self.embedding_store.remove(previous["content_hash"])
+
+        if self.deduplicator is not None and self.store is not None and previous is not None and (
+            previous["content_hash"] != metadata["content_hash"] or previous["duplicate_of"] != metadata["duplicate_of"]
+        ):
+            seen = seen if seen is not None else set()
+            seen.add(url)
+            for dependant in self.store.dependants(url):
+                original = self.store.original(dependant)
+                if dependant in seen or original is None:
+                    continue
+                seen.add(dependant)
+                self.logger.info(f"Checking {dependant} again for duplicates, as {url} changed")
+                try:
+                    self._store(dependant, original, seen)
+                except Exception as e:
+                    self.logger.error(f"Error checking {dependant} for duplicates: {str(e)}")
+        return document, metadata
+
+    def ingest(self, urls):
+        """
+        Extract and process several URLs in parallel
+
+        Each URL is fetched, parsed and processed in its own task, so parsing
+        of one page overlaps with network waits for the others. A failing URL
+        does not abort the batch.
+
+        Args:
+            urls (list): URLs to ingest
+
+        Returns:
+            list: One dict per unique URL, in input order, with keys 'url',
+                'content' (ProcessedDocument, None on failure), 'metadata'
+                (see ingest_and_store()) and 'error' (None on success)
+        """
+        results = {result["url"]: result for result in self.ingest_iter(urls)}
+        return [results[url] for url in dict.fromkeys(urls)]
+
+    def ingest_iter(self, urls):
+        """
+        Extract and process several URLs in parallel, yielding results as they complete
+
+        Args:
+            urls (list): URLs to ingest
+
+        Yields:
+            dict: Result for one URL, in completion order, shaped like the
+                items returned by ingest()
+        """
+        futures = {}
+        for url in dict.fromkeys(urls):
+            futures[self.executor.submit(self.ingest_and_store, url)] = url
+
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                document, metadata = future.result()
+                yield {"url": url, "content": document, "metadata": metadata, "error": None}
+            except Exception as e:
+                self.logger.error(f"Error processing {url}: {str(e)}")
+                yield {"url": url, "content": None, "metadata": None, "error": str(e)}
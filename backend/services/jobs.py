@@ -0,0 +1,335 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from .crawler import normalize_url
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+# Owners of the job queues running in this process
+_LOCAL_OWNERS = set()
+
+
+def owner_alive(owner):
+    """
+    Check whether the queue owning a job may still be running it
+
+    Owners are "host:pid-token". On this host, an owner is dead when its
+    process is gone, or when it has this process's pid (a restarted process
+    reusing it, as in containers) without being one of this process's
+    queues. Owners on other hosts cannot be checked and count as alive;
+    their jobs are reclaimed once their lease expires.
+
+    Args:
+        owner (str): Owner recorded on the job, or None
+
+    Returns:
+        bool: Whether the owner may be alive
+    """
+    if owner is None:
+        return False
+    if owner in _LOCAL_OWNERS:
+        return True
+    host, _, process = owner.rpartition(':')
+    if host and host != socket.gethostname():
+        return True
+    try:
+        pid = int(process.split('-')[0])
+    except ValueError:
+        return False
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The pid exists but belongs to another user
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    Persistent queue of background ingestion jobs
+
+    Jobs and their per-URL progress are stored in SQLite. A job is owned by
+    the process running it and kept alive by regular progress updates. Jobs
+    left queued or running by a process that is no longer alive are picked
+    up again as soon as a new queue starts, skipping URLs that were already
+    done; jobs of owners that cannot be checked (other hosts) are picked up
+    by a periodic scan once their lease expires. Crawl jobs discover their
+    URLs as they go and are restarted from the seed.
+    """
+
+    def __init__(self, path, pipeline, processor, max_workers=2, lease_seconds=120, crawler=None):
+        """
+        Args:
+            path (str): Path of the SQLite database holding the jobs
+            pipeline (IngestionPipeline): Pipeline used to ingest the URLs
+            processor (ContentProcessor): Processor used to summarise finished jobs
+            max_workers (int): Number of jobs run at the same time
+            lease_seconds (float): Time without progress after which a job
+                of an owner on another host is considered abandoned; also
+                the interval of the scan for abandoned jobs
+            crawler (Crawler): Crawler used by crawl jobs
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.pipeline = pipeline
+        self.processor = processor
+        self.crawler = crawler
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        _LOCAL_OWNERS.add(self.owner)
+        self._closed = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    owner TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    urls TEXT NOT NULL,
+                    progress TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT
+                )"""
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "options" not in columns:
+                # Added with crawl jobs; older databases are upgraded in place
+                conn.execute("ALTER TABLE jobs ADD COLUMN options TEXT")
+
+        self._resume()
+        thread = threading.Thread(target=self._sweep, daemon=True, name='job-queue')
+        thread.start()
+
+    def _connect(self):
+        # A connection per operation keeps the queue safe to use from worker threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    def submit(self, urls, crawl=None):
+        """
+        Queue an ingestion job
+
+        Args:
+            urls (list): URLs to ingest; for crawl jobs, the seed URL
+            crawl (dict): Optional crawl options 'depth', 'max_pages' and
+                'time_budget'; the job then follows same-site links from the seed
+
+        Returns:
+            str: Job id
+        """
+        if crawl is not None and self.crawler is None:
+            raise ValueError("Crawl jobs are not supported by this queue")
+
+        job_id = uuid.uuid4().hex
+        if crawl is not None:
+            # Progress is keyed by the URLs the crawler reports, which are normalised
+            urls = [normalize_url(urls[0])]
+        urls = list(dict.fromkeys(urls))
+        progress = {url: {"status": QUEUED} for url in urls}
+        options = json.dumps({"crawl": crawl}) if crawl is not None else None
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, created_at, updated_at, urls, progress, options) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, now, now, json.dumps(urls), json.dumps(progress), options)
+            )
+        self.executor.submit(self._run, job_id)
+        if crawl is not None:
+            self.logger.info(f"Queued crawl job {job_id} from {urls[0]}")
+        else:
+            self.logger.info(f"Queued ingestion job {job_id} for {len(urls)} URLs")
+        return job_id
+
+    def get(self, job_id):
+        """
+        Get the state of a job
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            dict: Job status, timestamps, per-URL progress and result, or
+                None if the job does not exist
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, status, created_at, updated_at, urls, progress, result, error, options "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        progress = json.loads(row[5])
+        done = sum(1 for item in progress.values() if item["status"] in (COMPLETED, FAILED))
+        return {
+            "job_id": row[0],
+            "status": row[1],
+            "created_at": row[2],
+            "updated_at": row[3],
+            "urls": json.loads(row[4]),
+            "completed_count": done,
+            "url_count": len(progress),
+            "progress": progress,
+            "result": json.loads(row[6]) if row[6] else None,
+            "error": row[7],
+            "crawl": json.loads(row[8])["crawl"] if row[8] else None
+        }
+
+    def _resume(self, startup=True):
+        """
+        Pick up jobs that were queued or running in a process that has gone away
+
+        Args:
+            startup (bool): Whether the queue is starting, when every
+                unowned queued job is left over from before the restart;
+                later scans leave recent ones to the workers they were
+                submitted to
+        """
+        stale = time.time() - self.lease_seconds
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, owner, updated_at FROM jobs WHERE status IN (?, ?) AND (owner IS NULL OR owner != ?)",
+                (QUEUED, RUNNING, self.owner)
+            ).fetchall()
+        for job_id, owner, updated_at in rows:
+            if owner is None and not startup and updated_at >= stale:
+                continue
+            if owner is not None and owner_alive(owner) and updated_at >= stale:
+                continue
+            self.logger.info(f"Resuming ingestion job {job_id}")
+            self.executor.submit(self._run, job_id, owner)
+
+    def _sweep(self):
+        while not self._closed.wait(self.lease_seconds):
+            try:
+                self._resume(startup=False)
+            except Exception as e:
+                self.logger.error(f"Error resuming abandoned jobs: {str(e)}")
+
+    def close(self):
+        """Stop scanning for abandoned jobs"""
+        self._closed.set()
+        _LOCAL_OWNERS.discard(self.owner)
+
+    def _claim(self, job_id, owner=None):
+        """
+        Atomically take ownership of a job from its previous owner
+
+        Returns:
+            bool: False if the job finished or another queue claimed it first
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, updated_at = ? WHERE id = ? AND status IN (?, ?) AND owner IS ?",
+                (RUNNING, self.owner, time.time(), job_id, QUEUED, RUNNING, owner)
+            )
+            return cursor.rowcount == 1
+
+    def _update(self, job_id, **fields):
+        """Update job columns and refresh its lease"""
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND owner = ?",
+                list(fields.values()) + [job_id, self.owner]
+            )
+
+    def _run(self, job_id, owner=None):
+        """Run a job in a worker thread, taking it over from owner"""
+        if not self._claim(job_id, owner):
+            return
+
+        job = self.get(job_id)
+        progress = job["progress"]
+        crawl = job["crawl"]
+        if crawl is not None:
+            results = self.crawler.crawl(
+                job["urls"][0],
+                max_depth=crawl.get("depth", 2),
+                max_pages=crawl.get("max_pages", 50),
+                time_budget=crawl.get("time_budget")
+            )
+            self.logger.info(f"Running crawl job {job_id} from {job['urls'][0]}")
+        else:
+            pending = [url for url, item in progress.items() if item["status"] not in (COMPLETED, FAILED)]
+            results = self.pipeline.ingest_iter(pending)
+            self.logger.info(f"Running ingestion job {job_id}: {len(pending)} of {len(progress)} URLs pending")
+
+        try:
+            if crawl is None:
+                for url in pending:
+                    progress[url] = {"status": RUNNING}
+                self._update(job_id, progress=json.dumps(progress))
+
+            for result in results:
+                if result["error"]:
+                    progress[result["url"]] = {"status": FAILED, "error": result["error"]}
+                else:
+                    progress[result["url"]] = {"status": COMPLETED, "document": result["metadata"]}
+                self._update(job_id, progress=json.dumps(progress))
+
+            self._update(
+                job_id,
+                status=COMPLETED,
+                result=json.dumps(self._summarize(progress))
+            )
+            self.logger.info(f"Finished ingestion job {job_id}")
+
+        except Exception as e:
+            self.logger.error(f"Ingestion job {job_id} failed: {str(e)}")
+            self._update(job_id, status=FAILED, error=str(e))
+
+    def _summarize(self, progress):
+        """Build the final result of a job from the stored documents"""
+        summary = ""
+        store = self.pipeline.store
+        if store is not None:
+            texts = []
+            for url, item in progress.items():
+                if item["status"] == COMPLETED and not (item.get("document") or {}).get("duplicate_of"):
+                    document = store.get(url)
+                    if document is not None:
+                        texts.append(document.text)
+            summary = self.processor.summarize(" ".join(texts)) if texts else ""
+
+        dedup = {"duplicate_documents": 0, "removed_paragraphs": 0, "removed_chars": 0}
+        for item in progress.values():
+            stats = (item.get("document") or {}).get("dedup")
+            if stats:
+                dedup["duplicate_documents"] += stats["duplicate_of"] is not None
+                dedup["removed_paragraphs"] += stats["removed_paragraphs"]
+                dedup["removed_chars"] += stats["removed_chars"]
+
+        return {
+            "summary": summary,
+            "dedup": dedup,
+            "succeeded": [url for url, item in progress.items() if item["status"] == COMPLETED],
+            "failed": [
+                {"url": url, "error": item.get("error")}
+                for url, item in progress.items() if item["status"] == FAILED
+            ]
+        }
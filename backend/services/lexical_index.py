@@ -0,0 +1,228 @@
+import logging
+import math
+import re
+import threading
+from collections import Counter
+import numpy as np
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from .lru_cache import LRUCache
+
+# Same tokens as scikit-learn's default TfidfVectorizer analyzer
+_TOKEN_RE = re.compile(r'\b\w\w+\b')
+
+
+def tokenize(text):
+    """Lowercase a text and split it into index terms, without English stop words"""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in ENGLISH_STOP_WORDS]
+
+
+class _Segment:
+    """Postings of the sentences of one document"""
+
+    def __init__(self, document):
+        text = document.text
+        self.content_hash = document.content_hash()
+        self.sentence_count = len(document.sentences)
+
+        postings = {}
+        lengths = np.zeros(self.sentence_count, dtype=np.float32)
+        for sentence_id, (start, end) in enumerate(document.sentences):
+            counts = Counter(tokenize(text[start:end]))
+            lengths[sentence_id] = sum(counts.values())
+            for term, count in counts.items():
+                postings.setdefault(term, []).append((sentence_id, count))
+
+        self.lengths = lengths
+        # term -> (sentence ids, term frequencies)
+        self.postings = {
+            term: (np.array([p[0] for p in entries], dtype=np.int32),
+                   np.array([p[1] for p in entries], dtype=np.float32))
+            for term, entries in postings.items()
+        }
+
+
+class LexicalIndex:
+    """
+    BM25 index over the sentences of ingested documents
+
+    Each URL's document is tokenised once, when it is ingested (or first
+    queried, if it is the version in the document store), into
+    per-sentence postings. Document frequencies are kept for
+    the whole index and updated as URLs are added or replaced, so a query
+    only tokenises the question and walks the postings of its terms.
+
+    Text that is not the indexed document of its URL (plain text sent with
+    a question, or a page served without its duplicate paragraphs removed)
+    is scored against the index statistics without being added to them;
+    its postings are only kept in a small LRU cache.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, transient_segments=32, store=None):
+        """
+        Args:
+            k1 (float): BM25 term frequency saturation
+            b (float): BM25 length normalisation
+            transient_segments (int): Number of documents outside the index
+                whose postings are cached
+            store (DocumentStore): Optional store of the ingested documents;
+                a queried page that is not indexed yet, e.g. ingested by an
+                earlier process, is indexed if it is the stored version
+        """
+        self.logger = logging.getLogger(__name__)
+        self.k1 = k1
+        self.b = b
+        self.store = store
+        self._segments = {}
+        self._document_frequency = Counter()
+        self._sentence_count = 0
+        self._total_length = 0.0
+        self._lock = threading.Lock()
+        # URLs removed from the index, e.g. duplicates of another page, not to be indexed again on a query
+        self._removed = set()
+        # content hash -> postings of text scored but not indexed
+        self._transient = LRUCache(transient_segments, sizeof=lambda segment: 1)
+
+    def __contains__(self, key):
+        return key in self._segments
+
+    def __len__(self):
+        return len(self._segments)
+
+    def add(self, key, document):
+        """
+        Index the sentences of a document, replacing any previous version
+
+        Args:
+            key (str): URL of the document
+            document (ProcessedDocument): Single-page document
+
+        Returns:
+            _Segment: The indexed postings
+        """
+        segment = _Segment(document)
+        with self._lock:
+            self._removed.discard(key)
+            self._remove(key)
+            self._segments[key] = segment
+            for term, (sentence_ids, _) in segment.postings.items():
+                self._document_frequency[term] += len(sentence_ids)
+            self._sentence_count += segment.sentence_count
+            self._total_length += float(segment.lengths.sum())
+        return segment
+
+    def remove(self, key):
+        """Remove a document from the index; queries score its text without indexing it again"""
+        with self._lock:
+            self._removed.add(key)
+            self._remove(key)
+
+    def _remove(self, key):
+        segment = self._segments.pop(key, None)
+        if segment is None:
+            return
+        for term, (sentence_ids, _) in segment.postings.items():
+            self._document_frequency[term] -= len(sentence_ids)
+            if self._document_frequency[term] <= 0:
+                del self._document_frequency[term]
+        self._sentence_count -= segment.sentence_count
+        self._total_length -= float(segment.lengths.sum())
+
+    def _idf(self, term):
+        df = self._document_frequency.get(term, 0)
+        return math.log(1 + (self._sentence_count - df + 0.5) / (df + 0.5))
+
+    def max_score(self, question):
+        """
+        Upper bound of the BM25 score of any text for a question
+
+        Dividing scores by this bound maps them to the 0-1 range.
+        """
+        terms = set(tokenize(question))
+        return sum(self._idf(term) for term in terms) * (self.k1 + 1)
+
+    def _is_stored(self, url, content_hash):
+        """Check whether a page is the stored document of its URL, not a version built for one request"""
+        if self.store is None:
+            return False
+        metadata = self.store.metadata(url)
+        return metadata is not None and not metadata["duplicate_of"] and metadata["content_hash"] == content_hash
+
+    def _segments_for(self, document):
+        """Find the indexed segment and first sentence of each source of a document"""
+        segments = []
+        for url, first, part in document.split_sources():
+            content_hash = part.content_hash()
+            segment = self._segments.get(url) if url is not None else None
+            if (segment is None and url is not None and url not in self._removed
+                    and self._is_stored(url, content_hash)):
+                # Ingested before this index was built, e.g. by an earlier process: index it now
+                segment = self.add(url, part)
+            elif segment is None or segment.content_hash != content_hash:
+                # Plain text, or another version of the page: score it without touching the statistics
+                segment = self._transient.get(content_hash)
+                if segment is None:
+                    segment = _Segment(part)
+                    self._transient.put(content_hash, segment)
+            segments.append((segment, first))
+        return segments
+
+    def score(self, question, document, groups=None, group_count=None):
+        """
+        Score the sentences of a document, or groups of them, against a question
+
+        Args:
+            question (str): Question
+            document (ProcessedDocument): Document from a single URL, combined
+                from several URLs, or built from plain text
+            groups (numpy.ndarray): Optional group id of each sentence of the
+                document (-1 to leave it out), e.g. the chunk it belongs to
+            group_count (int): Number of groups
+
+        Returns:
+            numpy.ndarray: BM25 score of each sentence, or of each group when
+                groups are given
+        """
+        terms = set(tokenize(question))
+        sentence_count = len(document.sentences)
+        if groups is None:
+            scores = np.zeros(sentence_count, dtype=np.float32)
+        else:
+            group_tf = {term: np.zeros(group_count, dtype=np.float32) for term in terms}
+            group_lengths = np.zeros(group_count, dtype=np.float32)
+
+        segments = self._segments_for(document)
+        avg_length = max(self._total_length / max(self._sentence_count, 1), 1.0)
+        idf = {term: self._idf(term) for term in terms}
+        k1, b = self.k1, self.b
+
+        for segment, offset in segments:
+            if groups is not None:
+                segment_groups = groups[offset:offset + segment.sentence_count]
+                kept = segment_groups >= 0
+                np.add.at(group_lengths, segment_groups[kept], segment.lengths[kept])
+
+            for term in terms:
+                entry = segment.postings.get(term)
+                if entry is None:
+                    continue
+                sentence_ids, tf = entry
+                if groups is None:
+                    norm = k1 * (1 - b + b * segment.lengths[sentence_ids] / avg_length)
+                    scores[offset + sentence_ids] += idf[term] * tf * (k1 + 1) / (tf + norm)
+                else:
+                    ids = segment_groups[sentence_ids]
+                    kept = ids >= 0
+                    np.add.at(group_tf[term], ids[kept], tf[kept])
+
+        if groups is None:
+            return scores
+
+        # Groups are scored as if each were one text with the summed term counts
+        avg_group_length = max(float(group_lengths.mean()), 1.0) if group_count else 1.0
+        norm = k1 * (1 - b + b * group_lengths / avg_group_length)
+        scores = np.zeros(group_count, dtype=np.float32)
+        for term in terms:
+            tf = group_tf[term]
+            scores += idf[term] * tf * (k1 + 1) / (tf + norm)
+        return scores
+
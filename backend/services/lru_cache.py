@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """Thread-safe least-recently-used cache bounded by the total size of its values"""
+
+    def __init__(self, max_bytes, sizeof=len):
+        """
+        Args:
+            max_bytes (int): Total size of cached values before eviction
+            sizeof (callable): Returns the size in bytes of a value
+        """
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Get a value and mark it as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        """Insert or replace a value, evicting least recently used values if needed"""
+        size = self.sizeof(value)
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def pop(self, key, default=None):
+        """Remove a value and return it"""
+        with self._lock:
+            entry = self._remove(key)
+            return default if entry is None else entry[0]
+
+    def clear(self):
+        """Remove all values"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[1]
+        return entry
@@ -0,0 +1,246 @@
+import contextlib
+import gc
+import logging
+import os
+import threading
+import time
+
+
+def resident_bytes():
+    """Resident set size of the process in bytes, or 0 where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+class ModelEntry:
+    """Load state of a registered backend"""
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.model = None
+        self.error = None
+        self.load_time = None
+        self.resident_bytes = 0
+        self.last_used = None
+        self.users = 0
+        self.loads = 0
+
+
+class ModelRegistry:
+    """
+    QA backends loaded on first use and unloaded when idle
+
+    Backends are registered as factories and built the first time a request
+    needs them. Loads are single-flight and run one at a time: concurrent
+    first requests wait for the same load, and the process's RSS growth
+    during a load is recorded as the backend's resident size. A backend that
+    has not been used for idle_ttl seconds is unloaded, as are the least
+    recently used backends when the loaded ones exceed the memory budget.
+    Backends in use by a request are never unloaded. A backend whose factory
+    fails is reported unavailable and not retried.
+    """
+
+    def __init__(self, idle_ttl=None, memory_budget=None, sweep_interval=60):
+        """
+        Args:
+            idle_ttl (float): Seconds without use after which a backend is
+                unloaded, or None to keep backends loaded
+            memory_budget (int): Bytes of resident backends before the least
+                recently used ones are unloaded, or None for no limit
+            sweep_interval (float): Seconds between checks for idle backends
+        """
+        self.logger = logging.getLogger(__name__)
+        self.idle_ttl = idle_ttl
+        self.memory_budget = memory_budget
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._closed = threading.Event()
+
+        if idle_ttl:
+            # Idle backends are also unloaded when no request comes in to notice them
+            interval = min(sweep_interval, idle_ttl)
+            thread = threading.Thread(target=self._sweep, args=(interval,), daemon=True, name='model-registry')
+            thread.start()
+
+    def register(self, name, factory):
+        """
+        Register a backend
+
+        Args:
+            name (str): model_type of the backend
+            factory (callable): Builds the backend; called with no arguments
+        """
+        with self._lock:
+            self._entries[name] = ModelEntry(name, factory)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def available(self, name):
+        """Check whether a backend is registered and has not failed to load"""
+        entry = self._entries.get(name)
+        return entry is not None and entry.error is None
+
+    def loaded(self, name):
+        """Get a backend if it is loaded, without loading it or marking it as used"""
+        entry = self._entries.get(name)
+        return entry.model if entry is not None else None
+
+    @contextlib.contextmanager
+    def use(self, name):
+        """
+        Get a backend for the duration of a request, loading it if needed
+
+        Args:
+            name (str): model_type of the backend
+
+        Yields:
+            The backend, or None if it is not registered or failed to load
+        """
+        entry = self._entries.get(name)
+        model = self._acquire(entry) if entry is not None else None
+        try:
+            yield model
+        finally:
+            if model is not None:
+                with self._lock:
+                    entry.users -= 1
+                    entry.last_used = time.monotonic()
+                self.evict()
+
+    def _acquire(self, entry):
+        with self._lock:
+            if entry.model is not None:
+                entry.users += 1
+                return entry.model
+        if entry.error is not None:
+            return None
+
+        with self._load_lock:
+            # Whoever held the lock may have loaded this very backend
+            with self._lock:
+                if entry.model is not None:
+                    entry.users += 1
+                    return entry.model
+            if entry.error is not None:
+                return None
+
+            self.logger.info(f"Loading {entry.name} model")
+            before = resident_bytes()
+            start = time.perf_counter()
+            try:
+                model = entry.factory()
+            except Exception as e:
+                self.logger.error(f"Failed to load {entry.name} model: {str(e)}")
+                entry.error = str(e)
+                return None
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                entry.model = model
+                entry.load_time = elapsed
+                # Memory freed by an earlier unload may be reused without growing RSS; keep the first measurement
+                entry.resident_bytes = max(resident_bytes() - before, entry.resident_bytes)
+                entry.loads += 1
+                entry.users += 1
+                entry.last_used = time.monotonic()
+            self.logger.info(f"Loaded {entry.name} model in {elapsed:.2f}s ({entry.resident_bytes / 2**20:.0f} MB)")
+        # Make room for the new backend before the request runs
+        self.evict()
+        return model
+
+    def unload(self, name):
+        """
+        Unload a backend unless a request is using it
+
+        Returns:
+            bool: Whether the backend was unloaded
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.model is None or entry.users:
+                return False
+            entry.model = None
+        # Release the weights now rather than at the next collection
+        gc.collect()
+        self.logger.info(f"Unloaded {name} model")
+        return True
+
+    def evict(self):
+        """Unload backends idle for longer than the TTL, then the least recently used ones over the memory budget"""
+        now = time.monotonic()
+        with self._lock:
+            loaded = sorted(
+                (entry for entry in self._entries.values() if entry.model is not None),
+                key=lambda entry: entry.last_used
+            )
+            total = sum(entry.resident_bytes for entry in loaded)
+
+        # The most recently used backend stays even when it alone exceeds the budget
+        for entry in loaded[:-1]:
+            idle = self.idle_ttl and now - entry.last_used >= self.idle_ttl
+            over_budget = self.memory_budget and total > self.memory_budget
+            if (idle or over_budget) and self.unload(entry.name):
+                total -= entry.resident_bytes
+        if loaded and self.idle_ttl and now - loaded[-1].last_used >= self.idle_ttl:
+            self.unload(loaded[-1].name)
+
+    def _sweep(self, interval):
+        while not self._closed.wait(interval):
+            try:
+                self.evict()
+            except Exception as e:
+                self.logger.error(f"Error unloading idle models: {str(e)}")
+
+    def close(self):
+        """Stop unloading idle backends in the background"""
+        self._closed.set()
+
+    def status(self):
+        """
+        Describe the load state of every backend
+
+        Returns:
+            dict: model_type -> dict with 'loaded', 'available', 'load_time_ms'
+                of the last load, 'resident_bytes' measured during it,
+                'idle_seconds', 'loads' and 'error'
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "loaded": entry.model is not None,
+                    "available": entry.error is None,
+                    "load_time_ms": round(entry.load_time * 1000, 1) if entry.load_time is not None else None,
+                    "resident_bytes": entry.resident_bytes if entry.model is not None else 0,
+                    "idle_seconds": round(now - entry.last_used, 1) if entry.model is not None and not entry.users else 0,
+                    "loads": entry.loads,
+                    "error": entry.error
+                }
+                for name, entry in self._entries.items()
+            }
+
+
+class LazyModel:
+    """A registered backend usable wherever a loaded one is, e.g. as a cascade stage"""
+
+    def __init__(self, registry, name):
+        """
+        Args:
+            registry (ModelRegistry): Registry of the backend
+            name (str): model_type of the backend
+        """
+        self.registry = registry
+        self.name = name
+
+    def answer_question(self, question, content):
+        """Answer a question with the backend, loading it if needed"""
+        with self.registry.use(self.name) as model:
+            if model is None:
+                raise RuntimeError(f"The {self.name} model is not available")
+            return model.answer_question(question, content)
@@ -0,0 +1,216 @@
+import logging
+import os
+import re
+import tempfile
+from importlib import metadata
+import onnxruntime
+import torch
+
+# Inference engines for the transformer models: eager PyTorch, ONNX Runtime
+# over the exported fp32 graph, or over its int8 dynamically quantised copy
+ENGINES = ('torch', 'onnx', 'onnx-int8')
+
+# Files for the quantised encoders published with the sentence-transformers
+# checkpoints; the AVX2 build runs on any x86-64 CPU from the last decade
+SENTENCE_TRANSFORMER_FILES = {
+    'onnx': 'onnx/model.onnx',
+    'onnx-int8': 'onnx/model_quint8_avx2.onnx'
+}
+
+# Oldest sentence-transformers release loading ONNX encoders (backend='onnx')
+MIN_SENTENCE_TRANSFORMERS = (3, 2)
+
+# Oldest PyTorch release whose exporter takes the dynamo flag; earlier ones
+# always export through TorchScript
+TORCH_DYNAMO_FLAG = (2, 5)
+
+
+def package_version(name):
+    """
+    Get the release numbers of an installed package
+
+    Args:
+        name (str): Distribution name, e.g. 'sentence-transformers'
+
+    Returns:
+        tuple: Leading numeric components of the version, e.g. (2, 2, 2) for
+            2.2.2 or (2, 5) for 2.5.0rc1, or None if it is not installed
+    """
+    try:
+        version = metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+    numbers = []
+    for part in version.split('.'):
+        digits = re.match(r'\d+', part)
+        if digits is None:
+            break
+        numbers.append(int(digits.group()))
+        if digits.group() != part:
+            break
+    return tuple(numbers)
+
+
+def session_options(intra_op_threads=None, inter_op_threads=None):
+    """
+    Build ONNX Runtime session options for CPU inference
+
+    Args:
+        intra_op_threads (int): Threads used inside an operator (matrix
+            products), or None for one per physical core
+        inter_op_threads (int): Threads running independent operators in
+            parallel, or None for the default
+
+    Returns:
+        onnxruntime.SessionOptions: Session options
+    """
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if intra_op_threads:
+        options.intra_op_num_threads = intra_op_threads
+    if inter_op_threads:
+        options.inter_op_num_threads = inter_op_threads
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_PARALLEL
+    return options
+
+
+def sentence_transformer_kwargs(engine, intra_op_threads=None, inter_op_threads=None):
+    """
+    Keyword arguments loading a SentenceTransformer with the given engine
+
+    Args:
+        engine (str): One of ENGINES
+        intra_op_threads (int): ONNX Runtime intra-op threads
+        inter_op_threads (int): ONNX Runtime inter-op threads
+
+    Returns:
+        dict: Extra SentenceTransformer arguments; empty for PyTorch
+
+    Raises:
+        RuntimeError: If the installed sentence-transformers cannot load ONNX encoders
+    """
+    if engine == 'torch':
+        return {}
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown inference engine {engine!r}, expected one of {ENGINES}")
+    version = package_version('sentence-transformers')
+    if version is not None and version < MIN_SENTENCE_TRANSFORMERS:
+        raise RuntimeError(
+            f"ONNX encoders need sentence-transformers>={'.'.join(map(str, MIN_SENTENCE_TRANSFORMERS))}, "
+            f"found {'.'.join(map(str, version))}"
+        )
+    return {
+        'backend': 'onnx',
+        'model_kwargs': {
+            'file_name': SENTENCE_TRANSFORMER_FILES[engine],
+            'provider': 'CPUExecutionProvider',
+            'session_options': session_options(intra_op_threads, inter_op_threads)
+        }
+    }
+
+
+class QuestionAnsweringGraph(torch.nn.Module):
+    """Extractive QA model exported with its [CLS] embedding as an extra output"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        hidden = self.model.base_model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+        start_logits, end_logits = self.model.qa_outputs(hidden).split(1, dim=-1)
+        return start_logits.squeeze(-1), end_logits.squeeze(-1), hidden[:, 0]
+
+
+class OnnxQuestionAnsweringModel:
+    """
+    ONNX Runtime session for an extractive question answering model
+
+    The PyTorch model is exported once to ONNX next to its quantised copy,
+    both cached on disk under the model name; later starts load the file.
+    A single graph gives the start and end logits of the reader and the
+    [CLS] embedding used to rank chunks.
+    """
+
+    OUTPUTS = ('start_logits', 'end_logits', 'embedding')
+
+    def __init__(self, model, model_name, directory='data/onnx', quantize=False,
+                 intra_op_threads=None, inter_op_threads=None):
+        """
+        Args:
+            model (transformers.PreTrainedModel): PyTorch model with a
+                base_model and a qa_outputs head, exported if no file exists
+            model_name (str): Name of the model, used for the file name
+            directory (str): Directory of the exported models
+            quantize (bool): Whether to run the int8 dynamically quantised graph
+            intra_op_threads (int): ONNX Runtime intra-op threads
+            inter_op_threads (int): ONNX Runtime inter-op threads
+        """
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, model_name.replace('/', '--'))
+        self.path = f"{base}.int8.onnx" if quantize else f"{base}.onnx"
+
+        if not os.path.exists(f"{base}.onnx"):
+            self._export(model, f"{base}.onnx")
+        if quantize and not os.path.exists(self.path):
+            self._quantize(f"{base}.onnx", self.path)
+
+        self.session = onnxruntime.InferenceSession(
+            self.path,
+            sess_options=session_options(intra_op_threads, inter_op_threads),
+            providers=['CPUExecutionProvider']
+        )
+        self.logger.info(f"Loaded ONNX model {self.path}")
+
+    def _write(self, path, write):
+        """Write a model file through a temporary file so readers never see a partial graph"""
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp.onnx')
+        os.close(fd)
+        try:
+            write(temporary)
+            os.replace(temporary, path)
+        except Exception:
+            os.unlink(temporary)
+            raise
+
+    def _export(self, model, path):
+        """Export the PyTorch model to ONNX with dynamic batch and sequence axes"""
+        self.logger.info(f"Exporting {path}")
+        example = torch.ones((2, 16), dtype=torch.long, device=next(model.parameters()).device)
+        axes = {0: 'batch', 1: 'sequence'}
+        # Releases taking the flag default to the dynamo exporter; keep the TorchScript one everywhere
+        options = {'dynamo': False} if (package_version('torch') or ()) >= TORCH_DYNAMO_FLAG else {}
+        self._write(path, lambda temporary: torch.onnx.export(
+            QuestionAnsweringGraph(model).eval(),
+            (example, example),
+            temporary,
+            input_names=['input_ids', 'attention_mask'],
+            output_names=list(self.OUTPUTS),
+            dynamic_axes={
+                'input_ids': axes, 'attention_mask': axes,
+                'start_logits': axes, 'end_logits': axes, 'embedding': {0: 'batch'}
+            },
+            opset_version=17,
+            **options
+        ))
+
+    def _quantize(self, source, path):
+        """Quantise the weights of the exported graph to int8; activations are quantised at run time"""
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        self.logger.info(f"Quantising {source} to {path}")
+        self._write(path, lambda temporary: quantize_dynamic(source, temporary, weight_type=QuantType.QInt8))
+
+    def run(self, features, outputs=OUTPUTS):
+        """
+        Run the model
+
+        Args:
+            features (dict): input_ids and attention_mask tensors
+            outputs (tuple): Names of the outputs wanted
+
+        Returns:
+            list: torch.Tensor for each output, on the CPU
+        """
+        inputs = {key: features[key].cpu().numpy() for key in ('input_ids', 'attention_mask')}
+        return [torch.from_numpy(output) for output in self.session.run(list(outputs), inputs)]
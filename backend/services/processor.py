@@ -2,6 +2,12 @@ import re
 import nltk
 from nltk.tokenize import sent_tokenize
 import logging
+from .text_normalizer import clean_text
+from .document import ProcessedDocument
+
+_CODE_BLOCK_RE = re.compile(r'```[^`]*```')
+_BLOCK_SPLIT_RE = re.compile(r'\n[ \t\r\f\v]*\n\s*')
+_HEADING_MARKER_RE = re.compile(r'(#{1,6})\s')
 
 # Download required NLTK resources
 try:
@@ -27,29 +33,52 @@ class ContentProcessor:
         """
         self.logger.info("Processing content")
         
-        # Remove extra whitespace
-        processed = re.sub(r'\s+', ' ', content)
+        # Clean with the precompiled normaliser
+        processed = clean_text(content)
         
-        # Remove markdown syntax
-        processed = re.sub(r'##+', '', processed)  # Remove heading markers
-        processed = re.sub(r'\*\*|\*', '', processed)  # Remove bold/italic markers
-        processed = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', processed)  # Replace links with just the text
-        processed = re.sub(r'!\[[^\]]*\]\([^)]+\)', '', processed)  # Remove images
-        processed = re.sub(r'```[^`]*```', '', processed)  # Remove code blocks
+        return processed
+    
+    def process_document(self, content):
+        """
+        Process extracted content into a structured document
         
-        # Remove URLs
-        processed = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', processed)
+        Each blank-line separated block is cleaned like process() does and
+        becomes a paragraph. Blocks starting with markdown heading markers
+        are recorded as headings; the leading level-1 heading is the title.
         
-        # Replace multiple newlines with a single one
-        processed = re.sub(r'\n+', '\n', processed)
+        Args:
+            content (str): Raw content extracted from URL
+            
+        Returns:
+            ProcessedDocument: Processed content with paragraph, heading and
+                sentence offsets
+        """
+        self.logger.info("Processing content into a document")
         
-        # Remove any remaining special characters
-        processed = re.sub(r'[^\w\s\.\,\;\:\-\'\"\?\!]', ' ', processed)
+        # Fenced code blocks may span blank lines, so drop them before splitting
+        if '```' in content:
+            content = _CODE_BLOCK_RE.sub('', content)
         
-        # Final cleanup of extra spaces
-        processed = re.sub(r'\s+', ' ', processed).strip()
+        title = ""
+        blocks = []
+        for block in _BLOCK_SPLIT_RE.split(content):
+            block = block.strip()
+            if not block:
+                continue
+            
+            level = 0
+            match = _HEADING_MARKER_RE.match(block)
+            if match:
+                level = len(match.group(1))
+            
+            cleaned = clean_text(block)
+            if not cleaned:
+                continue
+            if level == 1 and not title and not blocks:
+                title = cleaned
+            blocks.append((cleaned, level))
         
-        return processed
+        return ProcessedDocument.from_blocks(blocks, title)
     
     def summarize(self, content, max_sentences=5):
         """
@@ -1,45 +1,67 @@
 import spacy
 import logging
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-import re
+from .text_normalizer import normalize_whitespace
+from .document import as_document
+from .retrieval import HybridRetriever
+from .lru_cache import LRUCache
+
+# Components never needed to analyse questions, which only use tokens, the
+# dependency parse and entities; content is never run through spaCy
+EXCLUDED_PIPES = ["tagger", "attribute_ruler", "lemmatizer", "senter"]
 
 class QuestionAnsweringModel:
     """Answer questions based on content using NLP techniques"""
     
-    def __init__(self):
+    def __init__(self, retriever=None):
+        """
+        Args:
+            retriever (HybridRetriever): Retrieval stage shared by the backends,
+                over the BM25 index built at ingestion; a private one is used
+                if omitted
+        """
         self.logger = logging.getLogger(__name__)
+        self.retriever = retriever if retriever is not None else HybridRetriever()
         try:
             # Load spaCy model
-            self.nlp = spacy.load('en_core_web_md')
+            self.nlp = spacy.load('en_core_web_md', exclude=EXCLUDED_PIPES)
             self.logger.info("Loaded spaCy model successfully")
         except Exception as e:
             self.logger.error(f"Error loading spaCy model: {str(e)}")
             # Fallback to smaller model if available
             try:
-                self.nlp = spacy.load('en_core_web_sm')
+                self.nlp = spacy.load('en_core_web_sm', exclude=EXCLUDED_PIPES)
                 self.logger.info("Loaded fallback spaCy model")
             except:
                 self.logger.error("Could not load any spaCy model")
                 self.nlp = None
+        
+        # Parsed questions, so repeated questions skip spaCy entirely
+        self._question_docs = LRUCache(256, sizeof=lambda doc: 1)
     
     def _preprocess_text(self, text):
         """Clean and preprocess text"""
-        # Basic cleaning
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
+        # Basic cleaning (a no-op for content already normalised by the processor)
+        return normalize_whitespace(text)
     
-    def _split_into_chunks(self, text, max_chunk_size=5000):
-        """Split text into manageable chunks"""
-        # Simple sentence-based chunking
-        sentences = [sent.text for sent in self.nlp(text).sents]
+    def _split_into_chunks(self, document, max_chunk_size=5000):
+        """
+        Split a document into manageable chunks
+        
+        Returns:
+            tuple: (list of chunks, each a list of sentence strings, and an
+                array giving the chunk of each sentence of the document, -1
+                for skipped sentences)
+        """
+        # Sentence-based chunking over the boundaries computed at ingestion
+        sentences = document.sentence_texts()
+        groups = np.full(len(sentences), -1, dtype=np.int64)
         
         chunks = []
         current_chunk = []
         current_size = 0
         
-        for sentence in sentences:
+        for index, sentence in enumerate(sentences):
             # Skip very short sentences 
             if len(sentence) < 5:
                 continue
@@ -50,54 +72,56 @@ class QuestionAnsweringModel:
             else:
                 # Save current chunk and start a new one
                 if current_chunk:
-                    chunks.append(" ".join(current_chunk))
+                    chunks.append(current_chunk)
                 current_chunk = [sentence]
                 current_size = len(sentence)
+            groups[index] = len(chunks)
         
         # Add the last chunk if not empty
         if current_chunk:
-            chunks.append(" ".join(current_chunk))
+            chunks.append(current_chunk)
             
-        return chunks
+        return chunks, groups
     
-    def _find_most_relevant_chunk(self, question, chunks):
+    def _find_most_relevant_chunk(self, question, document, chunks, groups):
         """Find the most relevant text chunk for the question"""
         if not chunks:
-            return "", 0
-            
-        # Use TF-IDF to vectorize the question and chunks
-        vectorizer = TfidfVectorizer(stop_words='english')
+            return [], 0
         
         # If only one chunk, return it
         if len(chunks) == 1:
             return chunks[0], 1.0
             
-        # Vectorize the chunks
+        # Rank the chunks with the shared retrieval stage; only the question is tokenised here
         try:
-            tfidf_matrix = vectorizer.fit_transform(chunks + [question])
-            
-            # Get the question vector (last in the matrix)
-            question_vector = tfidf_matrix[-1]
-            
-            # Calculate cosine similarity between question and each chunk
-            chunk_vectors = tfidf_matrix[:-1]
-            similarities = cosine_similarity(question_vector, chunk_vectors).flatten()
-            
-            # Get the index of the most similar chunk
-            most_similar_idx = np.argmax(similarities)
-            
-            return chunks[most_similar_idx], similarities[most_similar_idx]
+            passages = self.retriever.retrieve(question, document, groups, len(chunks), top_k=1)
+            most_similar_idx, confidence, _ = passages[0]
+            return chunks[most_similar_idx], confidence
         except Exception as e:
             self.logger.error(f"Error finding relevant chunk: {str(e)}")
             # Fallback to first chunk
             return chunks[0], 0.5
     
-    def _extract_answer(self, question, text):
-        """Extract the answer from the text based on the question"""
-        try:
-            # Process the question and text with spaCy
+    def _parse_question(self, question):
+        """Run the trimmed spaCy pipeline over a question, reusing earlier parses"""
+        question_doc = self._question_docs.get(question)
+        if question_doc is None:
             question_doc = self.nlp(question)
-            text_doc = self.nlp(text)
+            self._question_docs.put(question, question_doc)
+        return question_doc
+    
+    def _extract_answer(self, question, sentences):
+        """
+        Extract the answer from a chunk based on the question
+        
+        Args:
+            question (str): Question
+            sentences (list): Sentences of the chunk, as segmented at ingestion
+        """
+        try:
+            # Only the question needs spaCy; sentence boundaries come from the document
+            question_doc = self._parse_question(question)
+            lowered = [sentence.lower() for sentence in sentences]
             
             # Check what type of question we're dealing with
             question_tokens = [token.text.lower() for token in question_doc]
@@ -112,28 +136,29 @@ class QuestionAnsweringModel:
             # Get named entities in the question
             question_entities = [ent.text for ent in question_doc.ents]
             
+            # Keywords with their weight: subjects and objects count more
+            weighted_keywords = [
+                (token.text.lower(), 1.0 if token.dep_ in ['nsubj', 'dobj', 'pobj'] else 0.5)
+                for token in question_doc if token.is_alpha and not token.is_stop
+            ]
+            lowered_entities = [ent.lower() for ent in question_entities]
+            
             # Find sentences in the text that contain question entities
             relevant_sentences = []
-            for sent in text_doc.sents:
+            for sentence, sentence_lower in zip(sentences, lowered):
                 # Score based on question entities
                 score = 0
-                for ent in question_entities:
-                    if ent.lower() in sent.text.lower():
+                for ent in lowered_entities:
+                    if ent in sentence_lower:
                         score += 1.5
                 
                 # Also check for keyword matches
-                for token in question_doc:
-                    if token.is_alpha and not token.is_stop:
-                        # Give higher weight to subject and objects in the question
-                        if token.dep_ in ['nsubj', 'dobj', 'pobj']:
-                            if token.text.lower() in sent.text.lower():
-                                score += 1.0
-                        # Regular keywords
-                        elif token.text.lower() in sent.text.lower():
-                            score += 0.5
+                for keyword, weight in weighted_keywords:
+                    if keyword in sentence_lower:
+                        score += weight
                 
                 if score > 0:
-                    relevant_sentences.append((sent.text, score))
+                    relevant_sentences.append((sentence, score))
             
             # Sort by relevance score
             relevant_sentences.sort(key=lambda x: x[1], reverse=True)
@@ -146,15 +171,15 @@ class QuestionAnsweringModel:
                 best_sentence = None
                 best_score = 0
                 
-                for sent in text_doc.sents:
+                for sentence, sentence_lower in zip(sentences, lowered):
                     score = 0
                     for keyword in keywords:
-                        if keyword in sent.text.lower():
+                        if keyword in sentence_lower:
                             score += 1
                     
                     if score > best_score:
                         best_score = score
-                        best_sentence = sent.text
+                        best_sentence = sentence
                 
                 if best_sentence:
                     return best_sentence, best_score / len(keywords), best_sentence
@@ -180,7 +205,7 @@ class QuestionAnsweringModel:
         
         Args:
             question (str): Question to answer
-            content (str): Content to search for answers
+            content (ProcessedDocument or str): Content to search for answers
             
         Returns:
             tuple: (answer, confidence, context)
@@ -192,13 +217,13 @@ class QuestionAnsweringModel:
         
         # Preprocess
         question = self._preprocess_text(question)
-        content = self._preprocess_text(content)
+        document = as_document(content)
         
         # Split content into manageable chunks
-        chunks = self._split_into_chunks(content)
+        chunks, groups = self._split_into_chunks(document)
         
         # Find most relevant chunk
-        most_relevant_chunk, chunk_confidence = self._find_most_relevant_chunk(question, chunks)
+        most_relevant_chunk, chunk_confidence = self._find_most_relevant_chunk(question, document, chunks, groups)
         
         # Extract answer from the most relevant chunk
         answer, answer_confidence, context = self._extract_answer(question, most_relevant_chunk)
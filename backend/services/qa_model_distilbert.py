@@ -2,15 +2,66 @@ import logging
 import torch
 from transformers import AutoTokenizer, AutoModelForQuestionAnswering
 import numpy as np
-import re
+from .text_normalizer import normalize_whitespace
+from .document import as_document
+from .retrieval import HybridRetriever
+from .batching import MicroBatcher
+
+# Number of BM25 candidate chunks scanned with DistilBERT embeddings
+CANDIDATE_CHUNKS = 4
+
+# Reader modes: 'window' reads the top chunks in overlapping windows in one
+# batched pass; 'chunk' reads the single most similar chunk, truncated to 512 tokens
+READER_MODES = ('window', 'chunk')
+
+# Number of questions whose windows answer_questions() reads in one batched pass
+QUESTIONS_PER_PASS = 8
 
 class DistilBERTQuestionAnsweringModel:
     """Answer questions based on content using DistilBERT"""
     
-    def __init__(self):
+    def __init__(self, retriever=None, batch_size=8, num_threads=None, reader='window',
+                 reader_chunks=3, max_seq_length=384, doc_stride=128, max_answer_length=30,
+                 engine='torch', onnx_dir='data/onnx', intra_op_threads=None, inter_op_threads=None,
+                 batch_wait_ms=None, max_batch_size=32):
+        """
+        Args:
+            retriever (HybridRetriever): Retrieval stage shared by the backends,
+                over the BM25 index built at ingestion; a private one is used
+                if omitted
+            batch_size (int): Number of chunks or windows per forward pass
+            num_threads (int): Number of CPU threads used by PyTorch, or None
+                to keep its default
+            reader (str): Reader mode, one of READER_MODES
+            reader_chunks (int): Number of top chunks read in 'window' mode
+            max_seq_length (int): Tokens per window, question included
+            doc_stride (int): Tokens shared by consecutive windows of a chunk
+            max_answer_length (int): Longest answer span, in tokens
+            engine (str): Inference engine, 'torch', 'onnx' or 'onnx-int8';
+                PyTorch is used if ONNX Runtime is unavailable
+            onnx_dir (str): Directory of the exported ONNX models
+            intra_op_threads (int): ONNX Runtime intra-op threads
+            inter_op_threads (int): ONNX Runtime inter-op threads
+            batch_wait_ms (float): Milliseconds a request may wait to share a
+                forward pass with concurrent requests, or None to run each
+                request on its own
+            max_batch_size (int): Number of sequences from which a shared
+                batch runs without waiting
+        """
         self.logger = logging.getLogger(__name__)
+        if reader not in READER_MODES:
+            raise ValueError(f"Unknown reader mode {reader!r}, expected one of {READER_MODES}")
+        self.retriever = retriever if retriever is not None else HybridRetriever()
+        self.batch_size = batch_size
+        self.reader = reader
+        self.reader_chunks = reader_chunks
+        self.max_seq_length = max_seq_length
+        self.doc_stride = doc_stride
+        self.max_answer_length = max_answer_length
+        if num_threads:
+            torch.set_num_threads(num_threads)
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        self.logger.info(f"Using device: {self.device}")
+        self.logger.info(f"Using device: {self.device} ({torch.get_num_threads()} threads)")
         
         try:
             # Load model and tokenizer
@@ -22,45 +73,116 @@ class DistilBERTQuestionAnsweringModel:
         except Exception as e:
             self.logger.error(f"Error loading DistilBERT model: {str(e)}")
             raise e
+        
+        self.engine = 'torch'
+        self.onnx_model = None
+        if engine != 'torch':
+            try:
+                from .onnx_runtime import OnnxQuestionAnsweringModel
+                self.onnx_model = OnnxQuestionAnsweringModel(
+                    self.model, self.model_name, onnx_dir, quantize=engine == 'onnx-int8',
+                    intra_op_threads=intra_op_threads, inter_op_threads=inter_op_threads
+                )
+                self.engine = engine
+                # Every forward pass now goes through ONNX Runtime; free the PyTorch weights
+                self.model = None
+            except Exception as e:
+                self.logger.error(f"Error loading ONNX model, falling back to PyTorch: {str(e)}")
+        self.logger.info(f"Inference engine: {self.engine}")
+        
+        if self.reader == 'window' and not self.tokenizer.is_fast:
+            # Windows are mapped back to the text with offset mappings, which only fast tokenizers give
+            self.logger.warning("Tokenizer has no offset mapping, falling back to the chunk reader")
+            self.reader = 'chunk'
+        
+        self.batcher = None
+        if batch_wait_ms is not None:
+            self.batcher = MicroBatcher(self._forward, max_batch_size=max_batch_size,
+                                        max_wait=batch_wait_ms / 1000, name='distilbert-batcher')
     
     def _preprocess_text(self, text):
         """Clean and preprocess text"""
-        # Basic cleaning
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
+        # Basic cleaning (a no-op for content already normalised by the processor)
+        return normalize_whitespace(text)
+    
+    def _estimate_tokens(self, text):
+        """Rough estimate of the number of wordpiece tokens in a text"""
+        # Wordpiece splits roughly 1.3 tokens per whitespace-separated word
+        return int(len(text.split()) * 1.3) + 1
+    
+    def _split_into_pieces(self, sentences, max_chunk_tokens):
+        """
+        Split an oversized paragraph into pieces that each fit the token budget
+        
+        Args:
+            sentences (list): (sentence index, sentence) pairs of the paragraph
+            max_chunk_tokens (int): Token budget
+            
+        Returns:
+            list: (sentence index, piece) pairs
+        """
+        pieces = []
+        for index, sentence in sentences:
+            if self._estimate_tokens(sentence) <= max_chunk_tokens:
+                pieces.append((index, sentence))
+                continue
+            # A single sentence longer than the budget: cut it by words
+            words = sentence.split()
+            step = max(1, int(max_chunk_tokens / 1.3))
+            for i in range(0, len(words), step):
+                pieces.append((index, " ".join(words[i:i+step])))
+        return pieces
     
-    def _split_into_chunks(self, text, max_chunk_size=512):
-        """Split text into chunks that fit within BERT's max token limit"""
-        # Split into paragraphs
-        paragraphs = text.split("\n\n")
+    def _split_into_chunks(self, document, max_chunk_tokens=384):
+        """
+        Split a document into chunks that fit within BERT's max token limit
         
+        Paragraphs are packed together up to the budget; paragraphs larger
+        than the budget are split on sentence boundaries. The budget leaves
+        room for the question and special tokens in the 512-token window.
+        
+        Returns:
+            tuple: (list of chunk strings, and an array giving the chunk of
+                each sentence of the document, -1 for skipped sentences)
+        """
+        text = document.text
+        groups = np.full(len(document.sentences), -1, dtype=np.int64)
         chunks = []
         current_chunk = []
         current_length = 0
         
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
+        for indices in document.paragraph_sentence_indices():
+            if not indices:
                 continue
-                
-            # Rough estimate of tokens (words + some extra for tokenization)
-            para_length = len(para.split())
             
-            if current_length + para_length <= max_chunk_size:
-                current_chunk.append(para)
-                current_length += para_length
+            sentences = [(index, text[document.sentences[index][0]:document.sentences[index][1]]) for index in indices]
+            para = " ".join(sentence for _, sentence in sentences)
+            para_length = self._estimate_tokens(para)
+            if para_length <= max_chunk_tokens:
+                pieces = [(indices, para)]
             else:
-                # Save current chunk and start a new one
-                if current_chunk:
+                pieces = [([index], piece) for index, piece in self._split_into_pieces(sentences, max_chunk_tokens)]
+            
+            for piece_indices, piece in pieces:
+                piece_length = para_length if len(pieces) == 1 else self._estimate_tokens(piece)
+                
+                if current_length + piece_length > max_chunk_tokens and current_chunk:
+                    # Save current chunk and start a new one
                     chunks.append(" ".join(current_chunk))
-                current_chunk = [para]
-                current_length = para_length
+                    current_chunk = []
+                    current_length = 0
+                current_chunk.append(piece)
+                current_length += piece_length
+                for index in piece_indices:
+                    # A sentence cut into pieces belongs to the chunk of its first piece
+                    if groups[index] < 0:
+                        groups[index] = len(chunks)
         
         # Add the last chunk if not empty
         if current_chunk:
             chunks.append(" ".join(current_chunk))
             
-        return chunks
+        return chunks, groups
     
     def _find_most_relevant_chunk(self, question, chunks):
         """Find the most relevant text chunk for the question using DistilBERT embeddings"""
@@ -76,46 +198,104 @@ class DistilBERTQuestionAnsweringModel:
         self.logger.info(f"Finding most relevant chunk among {len(chunks)} chunks for question: '{question}'")
             
         try:
-            # Tokenize question
-            question_tokens = self.tokenizer(question, return_tensors="pt")
-            question_tokens = {k: v.to(self.device) for k, v in question_tokens.items()}
+            # The question is embedded in the same batched pass as the chunks
+            embeddings = self._embed_texts([question] + chunks)
+            question_embedding, chunk_embeddings = embeddings[0], embeddings[1:]
             
-            # Get question embedding (use last hidden state's [CLS] token)
-            with torch.no_grad():
-                question_outputs = self.model(**question_tokens, output_hidden_states=True)
-                question_embedding = question_outputs.hidden_states[-1][0, 0, :].cpu().numpy()
-            
-            # Get embeddings for each chunk
-            chunk_scores = []
-            for chunk in chunks:
-                self.logger.debug(f"Processing chunk {i+1}/{len(chunks)} (length: {len(chunk)})")
-                chunk_tokens = self.tokenizer(chunk, return_tensors="pt", truncation=True, max_length=512)
-                chunk_tokens = {k: v.to(self.device) for k, v in chunk_tokens.items()}
-                
-                with torch.no_grad():
-                    chunk_outputs = self.model(**chunk_tokens, output_hidden_states=True)
-                    chunk_embedding = chunk_outputs.hidden_states[-1][0, 0, :].cpu().numpy()
-                
-                # Calculate cosine similarity
-                similarity = np.dot(question_embedding, chunk_embedding) / (
-                    np.linalg.norm(question_embedding) * np.linalg.norm(chunk_embedding)
-                )
-                chunk_scores.append(similarity)
-                self.logger.debug(f"Chunk {i+1} similarity score: {similarity:.4f}")
+            # Calculate cosine similarities
+            chunk_scores = chunk_embeddings @ question_embedding / (
+                np.linalg.norm(chunk_embeddings, axis=1) * np.linalg.norm(question_embedding)
+            )
+            for i, (chunk, similarity) in enumerate(zip(chunks, chunk_scores)):
+                self.logger.debug(f"Chunk {i+1}/{len(chunks)} (length: {len(chunk)}) similarity score: {similarity:.4f}")
             
             # Get the index of the most similar chunk
-            most_similar_idx = np.argmax(chunk_scores)
+            most_similar_idx = int(np.argmax(chunk_scores))
 
             self.logger.info(f"Selected chunk {most_similar_idx+1}/{len(chunks)} with score: {chunk_scores[most_similar_idx]:.4f}")
             self.logger.info(f"Selected chunk preview: '{chunks[most_similar_idx][:100]}...'")
             
-            return chunks[most_similar_idx], chunk_scores[most_similar_idx]
+            return chunks[most_similar_idx], float(chunk_scores[most_similar_idx])
             
         except Exception as e:
             self.logger.error(f"Error finding relevant chunk: {str(e)}")
             # Fallback to first chunk
             return chunks[0], 0.5
     
+    def _model_outputs(self, features):
+        """Run the model over a padded batch: start logits, end logits and [CLS] embeddings"""
+        if self.onnx_model is not None:
+            return self.onnx_model.run(features)
+        # The encoder and QA head are run directly, so no other layer's hidden states are kept
+        hidden = self.model.base_model(**features).last_hidden_state
+        start_logits, end_logits = self.model.qa_outputs(hidden).split(1, dim=-1)
+        return start_logits.squeeze(-1), end_logits.squeeze(-1), hidden[:, 0, :]
+    
+    def _qa_logits(self, features):
+        """Run the model over a batch and get its start and end logits"""
+        if self.onnx_model is not None:
+            return self.onnx_model.run(features, ('start_logits', 'end_logits'))
+        outputs = self.model(**features)
+        return outputs.start_logits, outputs.end_logits
+    
+    def _forward(self, inputs):
+        """
+        Run the model over tokenised inputs of any lengths
+        
+        Inputs are sorted by length and run in padded mini-batches of
+        similar lengths, so little compute goes to padding.
+        
+        Args:
+            inputs (list): (input_ids, attention_mask) pairs of token id lists
+            
+        Returns:
+            list: (start logits, end logits, [CLS] embedding) numpy arrays
+                for each input, in order, with logits cut to its own length
+        """
+        order = np.argsort([len(input_ids) for input_ids, _ in inputs], kind='stable')
+        outputs = [None] * len(inputs)
+        with torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                features = self.tokenizer.pad(
+                    {
+                        "input_ids": [inputs[i][0] for i in batch],
+                        "attention_mask": [inputs[i][1] for i in batch]
+                    },
+                    return_tensors="pt"
+                )
+                features = {k: v.to(self.device) for k, v in features.items()}
+                start_logits, end_logits, embeddings = (
+                    output.float().cpu().numpy() for output in self._model_outputs(features)
+                )
+                for row, i in enumerate(batch):
+                    length = len(inputs[i][0])
+                    outputs[i] = (start_logits[row, :length], end_logits[row, :length], embeddings[row])
+        return outputs
+    
+    def _infer(self, inputs):
+        """Run tokenised inputs through the model, batched with concurrent requests when a batcher is set"""
+        if self.batcher is not None:
+            return self.batcher.submit(inputs)
+        return self._forward(inputs)
+    
+    def _embed_texts(self, texts):
+        """
+        Get the [CLS] embedding of the last hidden layer for each text
+        
+        Texts are tokenised in one call and run in length-sorted, padded
+        mini-batches. Other layers' hidden states are never materialised.
+        
+        Args:
+            texts (list): Texts to embed, each truncated to 512 tokens
+            
+        Returns:
+            numpy.ndarray: One embedding per text, in input order
+        """
+        encodings = self.tokenizer(texts, truncation=True, max_length=512)
+        outputs = self._infer(list(zip(encodings["input_ids"], encodings["attention_mask"])))
+        return np.stack([embedding for _, _, embedding in outputs])
+    
     def _extract_answer(self, question, text):
         """Extract the answer from the text based on the question using DistilBERT"""
         try:
@@ -136,11 +316,7 @@ class DistilBERTQuestionAnsweringModel:
             
             # Get model predictions
             with torch.no_grad():
-                outputs = self.model(**inputs)
-            
-            # Get start and end logits
-            start_logits = outputs.start_logits
-            end_logits = outputs.end_logits
+                start_logits, end_logits = self._qa_logits(inputs)
             
             # Get the most likely start and end positions
             start_idx = torch.argmax(start_logits).item()
@@ -193,13 +369,190 @@ class DistilBERTQuestionAnsweringModel:
             self.logger.error(f"Error extracting answer: {str(e)}")
             return "Error processing the question.", 0.0, ""
     
+    def _best_spans(self, start_logits, end_logits, context_mask):
+        """
+        Find the best valid answer span of each window
+        
+        All (start, end) pairs of a window are scored at once as the sum of
+        the start and end log-probabilities; pairs outside the context, with
+        the end before the start or longer than max_answer_length are masked.
+        
+        Args:
+            start_logits (numpy.ndarray): Start logits, one row per window
+            end_logits (numpy.ndarray): End logits, one row per window
+            context_mask (numpy.ndarray): Whether each token belongs to the context
+            
+        Returns:
+            tuple: (start, end, start probability, end probability and joint
+                log-probability of the best span of each window)
+        """
+        def log_softmax(logits):
+            logits = np.where(context_mask, logits, -np.inf)
+            logits = logits - logits.max(axis=1, keepdims=True)
+            return logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+        
+        start_scores = log_softmax(start_logits)
+        end_scores = log_softmax(end_logits)
+        length = start_scores.shape[1]
+        # Upper band of width max_answer_length: end >= start and end < start + max_answer_length
+        band = np.triu(np.ones((length, length), dtype=bool)) & ~np.triu(np.ones((length, length), dtype=bool), self.max_answer_length)
+        
+        spans = start_scores[:, :, None] + end_scores[:, None, :]
+        spans = np.where(band, spans, -np.inf).reshape(len(spans), -1)
+        best = spans.argmax(axis=1)
+        rows = np.arange(len(spans))
+        starts, ends = best // length, best % length
+        return (starts, ends, np.exp(start_scores[rows, starts]), np.exp(end_scores[rows, ends]),
+                spans[rows, best])
+    
+    def _read_windows(self, question, chunks):
+        """
+        Extract the best answer span from several chunks in one batched pass
+        
+        Args:
+            question (str): Question
+            chunks (list): Candidate chunk strings, best first
+            
+        Returns:
+            tuple: (answer, confidence, context)
+        """
+        return self._read_windows_many([(question, chunks)])[0]
+    
+    def _read_windows_many(self, reads):
+        """
+        Extract the best answer span of each question from its chunks, all in one batched pass
+        
+        Each chunk is paired with its question and cut into overlapping
+        windows of max_seq_length tokens, doc_stride tokens apart, so nothing
+        past the 512-token limit is lost. The windows of every question run
+        through the model together, the best valid span of each window is
+        found over its start and end logits, and each question's best span
+        is mapped back to the chunk text with the tokenizer's offset mapping.
+        
+        Args:
+            reads (list): (question, candidate chunk strings, best first) pairs
+            
+        Returns:
+            list: (answer, confidence, context) for each pair, in order
+        """
+        try:
+            samples = [(r, chunk) for r, (_, chunks) in enumerate(reads) for chunk in chunks]
+            encodings = self.tokenizer(
+                [reads[r][0] for r, _ in samples],
+                [chunk for _, chunk in samples],
+                truncation="only_second",
+                max_length=self.max_seq_length,
+                stride=self.doc_stride,
+                return_overflowing_tokens=True,
+                return_offsets_mapping=True
+            )
+            windows = encodings["overflow_to_sample_mapping"]
+            self.logger.info(f"Reading {len(samples)} chunks of {len(reads)} questions as {len(windows)} windows")
+            outputs = self._infer(list(zip(encodings["input_ids"], encodings["attention_mask"])))
+            
+            read_windows = [[] for _ in reads]
+            for window, sample in enumerate(windows):
+                read_windows[samples[sample][0]].append(window)
+            return [
+                self._best_answer(encodings, outputs, [samples[sample][1] for sample in windows], indices)
+                for indices in read_windows
+            ]
+            
+        except Exception as e:
+            self.logger.error(f"Error extracting answer: {str(e)}")
+            return [("Error processing the question.", 0.0, "")] * len(reads)
+    
+    def _best_answer(self, encodings, outputs, texts, indices):
+        """
+        Find the best answer span among some of the windows read together
+        
+        Args:
+            encodings: Tokenizer encodings of all the windows
+            outputs (list): _forward() outputs of all the windows
+            texts (list): Chunk text of each window
+            indices (list): Windows of the question, in chunk order
+            
+        Returns:
+            tuple: (answer, confidence, context)
+        """
+        if not indices:
+            return "I couldn't find a specific answer in the provided content.", 0.1, ""
+        
+        best = None
+        for start in range(0, len(indices), self.batch_size):
+            # Spans are searched a few windows at a time to bound the (window, start, end) score array
+            batch = indices[start:start + self.batch_size]
+            length = max(len(outputs[i][0]) for i in batch)
+            start_logits = np.zeros((len(batch), length), dtype=np.float32)
+            end_logits = np.zeros((len(batch), length), dtype=np.float32)
+            context_mask = np.zeros((len(batch), length), dtype=bool)
+            for row, i in enumerate(batch):
+                start_logits[row, :len(outputs[i][0])] = outputs[i][0]
+                end_logits[row, :len(outputs[i][1])] = outputs[i][1]
+                sequence_ids = encodings.sequence_ids(i)
+                context_mask[row, :len(sequence_ids)] = [sequence_id == 1 for sequence_id in sequence_ids]
+            
+            spans = self._best_spans(start_logits, end_logits, context_mask)
+            row = int(np.argmax(spans[4]))
+            if best is None or spans[4][row] > best[0]:
+                best = (spans[4][row], batch[row]) + tuple(spans[k][row] for k in range(4))
+        
+        _, window, start_idx, end_idx, start_prob, end_prob = best
+        chunk = texts[window]
+        offsets = encodings["offset_mapping"][window]
+        answer = chunk[offsets[start_idx][0]:offsets[end_idx][1]]
+        confidence = float(start_prob + end_prob) / 2
+        self.logger.info(f"Extracted answer '{answer}' from window {indices.index(window)+1} with confidence {confidence:.4f}")
+        
+        # Context: the text of up to 10 context tokens either side of the answer
+        sequence_ids = encodings.sequence_ids(window)
+        context_tokens = [i for i, sequence_id in enumerate(sequence_ids) if sequence_id == 1]
+        context_start = max(context_tokens[0], start_idx - 10)
+        context_end = min(context_tokens[-1], end_idx + 10)
+        context = chunk[offsets[context_start][0]:offsets[context_end][1]]
+        
+        if not answer.strip() or answer.strip() in ".,;:!?-":
+            self.logger.warning("Answer is empty or just punctuation, returning fallback message")
+            return "I couldn't find a specific answer in the provided content.", 0.1, ""
+        
+        return answer, confidence, context
+    
+    def _prepare(self, content):
+        """
+        Split content into chunks for the reader
+        
+        Returns:
+            tuple: (document, chunk strings, chunk of each sentence)
+        """
+        document = as_document(content)
+        self.logger.info(f"Content length after preprocessing: {len(document)}")
+        
+        # Split content into manageable chunks
+        chunks, groups = self._split_into_chunks(document)
+        self.logger.info(f"Split content into {len(chunks)} chunks")
+        return document, chunks, groups
+    
+    def _candidate_chunks(self, question, prepared):
+        """Get the chunks of _prepare()d content read for a question, best first"""
+        document, chunks, groups = prepared
+        # Only the best BM25 chunks from the shared retrieval stage are read
+        top_k = self.reader_chunks if self.reader == 'window' else CANDIDATE_CHUNKS
+        if len(chunks) > top_k:
+            try:
+                passages = self.retriever.retrieve(question, document, groups, len(chunks), top_k=top_k)
+                chunks = [chunks[i] for i, _, _ in passages]
+                self.logger.info(f"Kept {len(chunks)} candidate chunks from the retrieval stage")
+            except Exception as e:
+                self.logger.error(f"Error retrieving candidate chunks: {str(e)}")
+        return chunks
+    
     def answer_question(self, question, content):
         """
         Answer a question based on the content
         
         Args:
             question (str): Question to answer
-            content (str): Content to search for answers
+            content (ProcessedDocument or str): Content to search for answers
             
         Returns:
             tuple: (answer, confidence, context)
@@ -213,25 +566,67 @@ class DistilBERTQuestionAnsweringModel:
         
         # Preprocess
         question = self._preprocess_text(question)
-        content = self._preprocess_text(content)
-
-        self.logger.info(f"Content length after preprocessing: {len(content)}")
-        
-        # Split content into manageable chunks
-        chunks = self._split_into_chunks(content)
-        self.logger.info(f"Split content into {len(chunks)} chunks")
-        
-        # Find most relevant chunk
-        most_relevant_chunk, chunk_confidence = self._find_most_relevant_chunk(question, chunks)
-        
-        # Extract answer from the most relevant chunk
-        answer, answer_confidence, context = self._extract_answer(question, most_relevant_chunk)
+        prepared = self._prepare(content)
+        chunks = self._candidate_chunks(question, prepared)
         
-        # Combine confidences
-        confidence = (chunk_confidence + answer_confidence) / 2
+        if self.reader == 'window':
+            # One batched pass over windows of the candidate chunks; the span probabilities are the confidence
+            if not chunks:
+                return "I couldn't find a specific answer in the provided content.", 0.1, ""
+            answer, confidence, context = self._read_windows(question, chunks)
+        else:
+            # Find most relevant chunk
+            most_relevant_chunk, chunk_confidence = self._find_most_relevant_chunk(question, chunks)
+            
+            # Extract answer from the most relevant chunk
+            answer, answer_confidence, context = self._extract_answer(question, most_relevant_chunk)
+            
+            # Combine confidences
+            confidence = (chunk_confidence + answer_confidence) / 2
 
         self.logger.info(f"Final answer: '{answer}'")
         self.logger.info(f"Final confidence: {confidence:.4f}")
         self.logger.info(f"====== END QUESTION ======")
         
-        return answer, confidence, context
\ No newline at end of file
+        return answer, confidence, context
+    
+    def answer_questions(self, questions, content):
+        """
+        Answer several questions about the same content
+        
+        The content is chunked once. In 'window' mode, the windows of
+        QUESTIONS_PER_PASS questions at a time are read in one batched pass,
+        and their answers are yielded as each pass completes.
+        
+        Args:
+            questions (list): Questions to answer
+            content (ProcessedDocument or str): Content to search for answers
+            
+        Yields:
+            tuple: (answer, confidence, context) for each question, in order
+        """
+        self.logger.info(f"Answering {len(questions)} questions using DistilBERT")
+        questions = [self._preprocess_text(question) for question in questions]
+        prepared = self._prepare(content) if content else None
+        
+        for start in range(0, len(questions), QUESTIONS_PER_PASS):
+            group = questions[start:start + QUESTIONS_PER_PASS]
+            reads = {}
+            if prepared is not None and self.reader == 'window':
+                reads = {i: (question, self._candidate_chunks(question, prepared)) for i, question in enumerate(group) if question}
+                reads = {i: read for i, read in reads.items() if read[1]}
+            answers = dict(zip(reads, self._read_windows_many(list(reads.values())))) if reads else {}
+            
+            for i, question in enumerate(group):
+                if prepared is None or not question:
+                    yield "No content available to answer this question.", 0.0, ""
+                elif self.reader != 'window':
+                    most_relevant_chunk, chunk_confidence = self._find_most_relevant_chunk(
+                        question, self._candidate_chunks(question, prepared)
+                    )
+                    answer, answer_confidence, context = self._extract_answer(question, most_relevant_chunk)
+                    yield answer, (chunk_confidence + answer_confidence) / 2, context
+                elif i in answers:
+                    yield answers[i]
+                else:
+                    yield "I couldn't find a specific answer in the provided content.", 0.1, ""
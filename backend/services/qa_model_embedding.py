@@ -0,0 +1,372 @@
+import logging
+import numpy as np
+from .text_normalizer import normalize_whitespace
+from .document import as_document
+from .retrieval import chunk_groups
+from .encoder_pool import EncoderPool
+
+class EmbeddingQuestionAnsweringModel:
+    """
+    Answer questions by ranking chunks of sentences with a sentence encoder
+    
+    Base of the backends built on a SentenceTransformer checkpoint, which
+    differ in the number of sentences per chunk. Sentence and chunk
+    embeddings come from the encoder pool, the embedding store and the ANN
+    index; only the questions are encoded per request.
+    """
+    
+    # Name of the backend in logs
+    NAME = "sentence embeddings"
+    
+    # Answer returned when answering a question fails, or None to raise the error
+    ERROR_ANSWER = None
+    
+    def __init__(self, chunk_size, model_name="all-MiniLM-L6-v2", embedding_store=None, ann_index=None,
+                 ann_min_chunks=2000, retriever=None, encoder_pool=None):
+        """
+        Args:
+            chunk_size (int): Number of sentences per chunk
+            model_name (str): SentenceTransformer model name
+            embedding_store (EmbeddingStore): Optional store of precomputed
+                sentence and chunk embeddings, keyed by document content hash
+            ann_index (IVFIndex): Optional approximate nearest-neighbour index
+                over the chunk embeddings of ingested documents
+            ann_min_chunks (int): Number of chunks in a request from which the
+                index is used instead of exact search
+            retriever (HybridRetriever): Optional shared retrieval stage; chunks
+                are then ranked by fusing BM25 with embedding similarity
+            encoder_pool (EncoderPool): Pool sharing one copy of each encoder
+                and an embedding cache between backends; a private one is
+                used if omitted
+        """
+        self.logger = logging.getLogger(__name__)
+        self.chunk_size = chunk_size
+        self.embedding_store = embedding_store
+        self.ann_index = ann_index
+        self.ann_min_chunks = ann_min_chunks
+        self.retriever = retriever
+        self.encoder_pool = encoder_pool if encoder_pool is not None else EncoderPool()
+        
+        try:
+            self.model_name = model_name
+            self.encoder = self.encoder_pool.get(self.model_name)
+            self.logger.info(f"Loaded {self.NAME} model: {self.model_name}")
+        except Exception as e:
+            self.logger.error(f"Error loading {self.NAME} model: {str(e)}")
+            raise e
+    
+    def _preprocess_text(self, text):
+        """Clean and preprocess text"""
+        # Basic cleaning (a no-op for content already normalised by the processor)
+        return normalize_whitespace(text)
+    
+    def _split_into_sentences(self, document):
+        """Get the sentences of a document worth processing"""
+        # Boundaries were computed once at ingestion
+        return document.sentence_texts(min_length=10)
+    
+    def _chunk_sentences(self, sentences):
+        """Group sentences into chunks (lists of sentences) for processing"""
+        chunk_size = self.chunk_size
+        chunks = []
+        for i in range(0, len(sentences), chunk_size):
+            chunks.append(sentences[i:i+chunk_size])
+        return chunks
+    
+    def _encode(self, texts):
+        """Encode texts into unit-length embeddings"""
+        return self.encoder.encode(texts)
+    
+    def _document_embeddings(self, document):
+        """
+        Get the sentences and chunks of a single-source document with their embeddings
+        
+        With an embedding store, each version of a document is encoded only
+        once; later questions read the memory-mapped matrices.
+        
+        Returns:
+            tuple: (sentences, chunks, sentence embeddings, chunk embeddings)
+        """
+        sentences = self._split_into_sentences(document)
+        chunks = self._chunk_sentences(sentences)
+        if not sentences:
+            return sentences, chunks, None, None
+        
+        def encode_sentences():
+            return self._encode(sentences)
+        
+        def encode_chunks():
+            return self._encode([" ".join(chunk) for chunk in chunks])
+        
+        if self.embedding_store is None:
+            return sentences, chunks, encode_sentences(), encode_chunks()
+        
+        content_hash = document.content_hash()
+        sentence_embeddings = self.embedding_store.get_or_compute(
+            f"{self.model_name}/sentences", content_hash, encode_sentences
+        )
+        chunk_embeddings = self.embedding_store.get_or_compute(
+            self.chunk_namespace(), content_hash, encode_chunks
+        )
+        return sentences, chunks, sentence_embeddings, chunk_embeddings
+    
+    def chunk_namespace(self):
+        """Embedding store namespace of the chunk embeddings, also indexed for ANN search"""
+        return f"{self.model_name}/chunks-{self.chunk_size}"
+    
+    def index_document(self, url, document):
+        """
+        Precompute the embeddings of an ingested document
+        
+        Args:
+            url (str): URL the document was extracted from
+            document (ProcessedDocument): Processed single-page document
+        """
+        if self.embedding_store is not None:
+            self._document_embeddings(document)
+            if self.ann_index is not None:
+                self.ann_index.add(url, document.content_hash())
+    
+    def _find_most_relevant_chunks(self, question_embedding, parts, top_k=3, sources=None):
+        """
+        Find the most relevant text chunks for the question
+        
+        Args:
+            question_embedding (numpy.ndarray): Unit-length question embedding
+            parts (list): _document_embeddings() results, one per source
+            top_k (int): Number of chunks to return
+            sources (list): Optional (url, content hash) of each part, used to
+                search large requests through the ANN index
+            
+        Returns:
+            tuple: ((part index, chunk index) of the top chunks, their scores)
+        """
+        refs = [(p, c) for p, part in enumerate(parts) for c in range(len(part[1]))]
+        if not refs:
+            return [], []
+            
+        # If only one chunk, return it
+        if len(refs) == 1:
+            return refs, [1.0]
+        
+        try:
+            if self.ann_index is not None and sources is not None and len(refs) >= self.ann_min_chunks:
+                return self._search_index(question_embedding, parts, top_k, sources)
+            
+            # Cosine similarities against the precomputed chunk embeddings
+            similarities = np.concatenate([
+                np.asarray(part[3] @ question_embedding, dtype=np.float32) for part in parts if part[1]
+            ])
+            
+            # Get top-k chunk indices and scores
+            top_k = min(top_k, len(refs))
+            top_indices = np.argsort(-similarities, kind='stable')[:top_k]
+            top_scores = [float(similarities[i]) for i in top_indices]
+            
+            return [refs[i] for i in top_indices], top_scores
+            
+        except Exception as e:
+            self.logger.error(f"Error finding relevant chunks: {str(e)}")
+            # Fallback to first chunk
+            return refs[:1], [0.5]
+    
+    def _search_index(self, question_embedding, parts, top_k, sources):
+        """Find the top chunks with the ANN index, searching unindexed parts exactly"""
+        positions = {}
+        for p, (url, _) in enumerate(sources):
+            if url is not None and parts[p][1]:
+                positions[url] = p
+        results, missing = self.ann_index.search(
+            question_embedding, {url: sources[p][1] for url, p in positions.items()}, top_k
+        )
+        candidates = [((positions[url], row), score) for url, row, score in results]
+        
+        # Plain text and pages not indexed at this version are scored exactly
+        for p, part in enumerate(parts):
+            url = sources[p][0]
+            if part[1] and (url is None or url in missing or url not in positions):
+                similarities = np.asarray(part[3] @ question_embedding, dtype=np.float32)
+                for c in np.argsort(-similarities, kind='stable')[:top_k]:
+                    candidates.append(((p, int(c)), float(similarities[c])))
+        
+        candidates.sort(key=lambda candidate: -candidate[1])
+        candidates = candidates[:top_k]
+        return [ref for ref, _ in candidates], [score for _, score in candidates]
+    
+    def _retrieve_chunks(self, question, question_embedding, document, sources, parts, top_k=3):
+        """
+        Rank the chunks with the shared retrieval stage, fusing BM25 and embeddings
+        
+        Args:
+            question (str): Question
+            question_embedding (numpy.ndarray): Unit-length question embedding
+            document (ProcessedDocument): Document the parts were split from
+            sources (list): split_sources() of the document
+            parts (list): _document_embeddings() results, one per source
+            top_k (int): Number of chunks to return
+            
+        Returns:
+            tuple: ((part index, chunk index) of the top chunks, their similarities)
+        """
+        groups, offsets = chunk_groups(document, sources, self.chunk_size, min_length=10)
+        refs = [(p, c) for p, part in enumerate(parts) for c in range(len(part[1]))]
+        
+        # The dense side proposes its own best chunks (through the ANN index on large requests)
+        dense_refs, _ = self._find_most_relevant_chunks(
+            question_embedding, parts, top_k=self.retriever.candidates,
+            sources=[(url, part.content_hash()) for url, _, part in sources]
+        )
+        
+        def dense(ids):
+            return [float(parts[refs[i][0]][3][refs[i][1]] @ question_embedding) for i in ids]
+        
+        passages = self.retriever.retrieve(
+            question, document, groups, len(refs), top_k=top_k,
+            dense=dense, dense_candidates=[offsets[p] + c for p, c in dense_refs]
+        )
+        return [refs[i] for i, _, _ in passages], [similarity for _, _, similarity in passages]
+    
+    def _extract_answer(self, question_embedding, parts, top_chunks, top_scores):
+        """Extract the answer from the most relevant chunks"""
+        try:
+            if not top_chunks:
+                return "I couldn't find relevant information in the provided content.", 0.1, ""
+            
+            # Use the sentences of the chunks for more granular matching,
+            # scored against their precomputed embeddings
+            all_sentences = []
+            similarities = []
+            for p, c in top_chunks:
+                sentences, chunks, sentence_embeddings, _ = parts[p]
+                start = c * self.chunk_size
+                end = start + len(chunks[c])
+                all_sentences.extend(sentences[start:end])
+                similarities.append(np.asarray(sentence_embeddings[start:end] @ question_embedding, dtype=np.float32))
+            
+            if not all_sentences:
+                return "I couldn't find relevant information in the provided content.", 0.1, ""
+            
+            similarities = np.concatenate(similarities)
+            
+            # Get top-5 sentence indices
+            top_k = min(5, len(all_sentences))
+            top_indices = np.argsort(-similarities, kind='stable')[:top_k]
+            top_values = [float(similarities[i]) for i in top_indices]
+            
+            # Get the top sentences
+            top_sentences = [all_sentences[i] for i in top_indices]
+            
+            # Construct answer from top sentences (max 3)
+            answer_sentences = top_sentences[:3]
+            answer = " ".join(answer_sentences)
+            
+            # Calculate confidence based on similarity scores
+            confidence = float(top_values[0] if top_values else 0.5)
+            
+            # Provide wider context
+            context_sentences = top_sentences
+            context = " ".join(context_sentences)
+            
+            return answer, confidence, context
+            
+        except Exception as e:
+            self.logger.error(f"Error extracting answer: {str(e)}")
+            return "Error processing the question.", 0.0, ""
+    
+    def _prepare(self, content):
+        """
+        Split content into sources, sentences and chunks, with their stored embeddings
+        
+        Returns:
+            tuple: (document, its split_sources(), the _document_embeddings()
+                of each source, and the (url, content hash) of each source)
+        """
+        document = as_document(content)
+        split = document.split_sources()
+        parts = [self._document_embeddings(part) for _, _, part in split]
+        sources = [(url, part.content_hash()) for url, _, part in split]
+        return document, split, parts, sources
+    
+    def _answer(self, question, question_embedding, prepared):
+        """Answer a preprocessed, encoded question about _prepare()d content"""
+        document, split, parts, sources = prepared
+        
+        # Find most relevant chunks
+        if self.retriever is not None:
+            top_chunks, top_scores = self._retrieve_chunks(question, question_embedding, document, split, parts)
+        else:
+            top_chunks, top_scores = self._find_most_relevant_chunks(question_embedding, parts, sources=sources)
+        
+        # Extract answer from the most relevant chunks
+        return self._extract_answer(question_embedding, parts, top_chunks, top_scores)
+    
+    def _failed(self, e):
+        """Answer of a question that failed, unless the backend raises errors"""
+        if self.ERROR_ANSWER is None:
+            raise e
+        self.logger.error(f"Error answering question: {str(e)}", exc_info=True)
+        return self.ERROR_ANSWER, 0.0, ""
+    
+    def answer_question(self, question, content):
+        """
+        Answer a question based on the content
+        
+        Args:
+            question (str): Question to answer
+            content (ProcessedDocument or str): Content to search for answers
+            
+        Returns:
+            tuple: (answer, confidence, context)
+        """
+        self.logger.info(f"Answering question using {self.NAME}: {question}")
+        
+        if not content or not question:
+            return "No content available to answer this question.", 0.0, ""
+        
+        try:
+            # Preprocess
+            question = self._preprocess_text(question)
+            
+            # Split each source into sentences and chunks, with their stored embeddings
+            prepared = self._prepare(content)
+            
+            # Only the question is encoded per request
+            question_embedding = self._encode([question])[0]
+            
+            return self._answer(question, question_embedding, prepared)
+        except Exception as e:
+            return self._failed(e)
+    
+    def answer_questions(self, questions, content):
+        """
+        Answer several questions about the same content
+        
+        The content is split and its embeddings loaded once, and all the
+        questions are encoded in one batch.
+        
+        Args:
+            questions (list): Questions to answer
+            content (ProcessedDocument or str): Content to search for answers
+            
+        Yields:
+            tuple: (answer, confidence, context) for each question, in order
+        """
+        self.logger.info(f"Answering {len(questions)} questions using {self.NAME}")
+        questions = [self._preprocess_text(question) for question in questions]
+        try:
+            prepared = self._prepare(content) if content else None
+            embeddings = iter(self._encode([question for question in questions if question]) if prepared else ())
+        except Exception as e:
+            failed = self._failed(e)
+            for _ in questions:
+                yield failed
+            return
+        
+        for question in questions:
+            if prepared is None or not question:
+                yield "No content available to answer this question.", 0.0, ""
+                continue
+            try:
+                yield self._answer(question, next(embeddings), prepared)
+            except Exception as e:
+                yield self._failed(e)
@@ -2,12 +2,16 @@ import nltk
 import re
 import string
 import logging
-from nltk.tokenize import sent_tokenize, word_tokenize
+import numpy as np
+from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+from .text_normalizer import normalize_whitespace
+from .document import as_document
+from .retrieval import HybridRetriever
+
+_URL_RE = re.compile(r'http[s]?://\S+')
+_PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
 
 # Download required NLTK resources
 try:
@@ -22,8 +26,15 @@ except LookupError:
 class NLTKQuestionAnsweringModel:
     """Answer questions based on content using NLTK and advanced NLP techniques"""
     
-    def __init__(self):
+    def __init__(self, retriever=None):
+        """
+        Args:
+            retriever (HybridRetriever): Retrieval stage shared by the backends,
+                over the BM25 index built at ingestion; a private one is used
+                if omitted
+        """
         self.logger = logging.getLogger(__name__)
+        self.retriever = retriever if retriever is not None else HybridRetriever()
         self.stop_words = set(stopwords.words('english'))
         self.lemmatizer = WordNetLemmatizer()
         self.logger.info("Initialized NLTK Advanced QA Model")
@@ -31,12 +42,12 @@ class NLTKQuestionAnsweringModel:
     def _preprocess_text(self, text):
         """Clean and preprocess text"""
         # Basic cleaning
-        text = text.lower()
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = normalize_whitespace(text).lower()
         # Remove URLs
-        text = re.sub(r'http[s]?://\S+', '', text)
+        if 'http' in text:
+            text = _URL_RE.sub('', text)
         # Remove punctuation
-        text = "".join([char for char in text if char not in string.punctuation])
+        text = text.translate(_PUNCTUATION_TABLE)
         return text
     
     def _tokenize_and_lemmatize(self, text):
@@ -64,10 +75,10 @@ class NLTKQuestionAnsweringModel:
         
         return key_terms, q_type
     
-    def _split_into_sentences(self, text):
-        """Split text into sentences for processing"""
-        sentences = sent_tokenize(text)
-        return [s.strip() for s in sentences if len(s.strip()) > 10]
+    def _split_into_sentences(self, document):
+        """Get the sentences of a document worth processing"""
+        # Boundaries were computed once at ingestion; no need to run punkt again
+        return document.sentence_texts(min_length=10)
     
     def _score_sentences(self, sentences, key_terms, q_type):
         """Score sentences based on key terms and question type"""
@@ -104,13 +115,12 @@ class NLTKQuestionAnsweringModel:
             
             sentence_scores.append((sentence, score))
         
-        # Sort by score in descending order
-        sentence_scores.sort(key=lambda x: x[1], reverse=True)
+        # Scores stay in sentence order so they can be combined with lexical scores
         return sentence_scores
     
-    def _find_most_relevant_chunks(self, question, text):
-        """Split text into chunks and find most relevant ones"""
-        sentences = self._split_into_sentences(text)
+    def _find_most_relevant_chunks(self, question, document):
+        """Split a document into chunks and find most relevant ones"""
+        sentences = self._split_into_sentences(document)
         
         if not sentences:
             return [], 0
@@ -120,41 +130,39 @@ class NLTKQuestionAnsweringModel:
         # For short text, just use all sentences
         if len(sentences) <= 10:
             return sentences, 0.7
-            
-        # Score all sentences
-        scored_sentences = self._score_sentences(sentences, key_terms, q_type)
         
-        # Use TF-IDF to find semantic similarity between question and sentences
+        # Each sentence kept by _split_into_sentences is a passage for the retrieval stage
+        groups = np.full(len(document.sentences), -1, dtype=np.int64)
+        groups[document.sentence_indices(min_length=10)] = np.arange(len(sentences))
+        
         try:
-            # Create a corpus with the question and all sentences
-            corpus = [question] + [s[0] for s in scored_sentences]
-            
-            # Create TF-IDF vectors
-            vectorizer = TfidfVectorizer()
-            tfidf_matrix = vectorizer.fit_transform(corpus)
-            
-            # Calculate cosine similarity between question and each sentence
-            similarities = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:]).flatten()
-            
-            # Combine TF-IDF similarity with our custom scoring
-            for i, (sent, score) in enumerate(scored_sentences):
-                scored_sentences[i] = (sent, score + (similarities[i] * 3))  # Weight TF-IDF higher
-                
-            # Re-sort after adding TF-IDF scores
-            scored_sentences.sort(key=lambda x: x[1], reverse=True)
-            
-            # Take top 5 sentences or fewer
-            top_sentences = [s[0] for s in scored_sentences[:5]]
-            avg_score = sum([s[1] for s in scored_sentences[:5]]) / len(scored_sentences[:5]) if scored_sentences else 0
-            confidence = min(avg_score / 10, 0.95)  # Normalize to 0-1 range
-            
-            return top_sentences, confidence
-            
+            # BM25 candidates, with scores scaled to 0-1; only they are tokenised and lemmatised
+            passages = self.retriever.retrieve(question, document, groups, len(sentences),
+                                               top_k=self.retriever.candidates)
         except Exception as e:
-            self.logger.error(f"Error in TF-IDF processing: {str(e)}")
-            # Fallback to basic scoring
+            self.logger.error(f"Error in lexical scoring: {str(e)}")
+            # Fallback to basic scoring of every sentence
+            scored_sentences = self._score_sentences(sentences, key_terms, q_type)
+            scored_sentences.sort(key=lambda x: x[1], reverse=True)
             top_sentences = [s[0] for s in scored_sentences[:5]]
             return top_sentences, 0.5
+        
+        candidates = [sentences[i] for i, _, _ in passages]
+        scored_sentences = self._score_sentences(candidates, key_terms, q_type)
+        
+        # Combine lexical similarity with our custom scoring
+        for i, (sent, score) in enumerate(scored_sentences):
+            scored_sentences[i] = (sent, score + (passages[i][1] * 3))  # Weight lexical similarity higher
+            
+        # Sort after adding lexical scores
+        scored_sentences.sort(key=lambda x: x[1], reverse=True)
+        
+        # Take top 5 sentences or fewer
+        top_sentences = [s[0] for s in scored_sentences[:5]]
+        avg_score = sum([s[1] for s in scored_sentences[:5]]) / len(scored_sentences[:5]) if scored_sentences else 0
+        confidence = min(avg_score / 10, 0.95)  # Normalize to 0-1 range
+        
+        return top_sentences, confidence
     
     def _extract_answer(self, question, relevant_sentences):
         """Extract and format the answer from relevant sentences"""
@@ -194,7 +202,7 @@ class NLTKQuestionAnsweringModel:
         
         Args:
             question (str): Question to answer
-            content (str): Content to search for answers
+            content (ProcessedDocument or str): Content to search for answers
             
         Returns:
             tuple: (answer, confidence, context)
@@ -205,7 +213,7 @@ class NLTKQuestionAnsweringModel:
             return "No content available to answer this question.", 0.0, ""
         
         # Find relevant sentences
-        relevant_chunks, chunk_confidence = self._find_most_relevant_chunks(question, content)
+        relevant_chunks, chunk_confidence = self._find_most_relevant_chunks(question, as_document(content))
         
         # Extract the answer
         answer, answer_confidence, context = self._extract_answer(question, relevant_chunks)
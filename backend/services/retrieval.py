@@ -0,0 +1,143 @@
+import logging
+import numpy as np
+from .lexical_index import LexicalIndex
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuse several rankings of the same items
+
+    Each item scores the sum of 1 / (k + rank) over the rankings it appears
+    in, so items ranked well by several retrievers rise to the top without
+    having to calibrate their scores against each other.
+
+    Args:
+        rankings (list): Lists of item ids, best first
+        k (int): Damping constant; larger values flatten the rank weights
+
+    Returns:
+        dict: item id -> fused score
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return fused
+
+
+def chunk_groups(document, sources, chunk_size, min_length=0):
+    """
+    Number the fixed-size sentence chunks of each source of a document
+
+    Args:
+        document (ProcessedDocument): Document, possibly combined from several URLs
+        sources (list): split_sources() of the document
+        chunk_size (int): Number of sentences per chunk
+        min_length (int): Sentences with this many characters or fewer are
+            left out of the chunks, as by sentence_texts()
+
+    Returns:
+        tuple: (array giving the passage id of each sentence of the document,
+            -1 for skipped sentences, and the first passage id of each source)
+    """
+    groups = np.full(len(document.sentences), -1, dtype=np.int64)
+    offsets = []
+    offset = 0
+    for _, first, part in sources:
+        indices = np.array(part.sentence_indices(min_length), dtype=np.int64)
+        groups[first + indices] = offset + np.arange(len(indices)) // chunk_size
+        offsets.append(offset)
+        offset += -(-len(indices) // chunk_size)
+    return groups, offsets
+
+
+class HybridRetriever:
+    """
+    Candidate passage retrieval shared by the QA backends
+
+    A backend describes its passages (chunks, sentences) as a group id per
+    sentence of the document. Passages are scored with the prebuilt BM25
+    postings, the best few are kept as candidates, and a backend with its
+    own embeddings can re-rank them: its dense similarities are fused with
+    the BM25 ranking by reciprocal rank fusion. Readers then only look at
+    the few passages returned.
+    """
+
+    def __init__(self, lexical_index=None, candidates=50, rrf_k=60, dense=True):
+        """
+        Args:
+            lexical_index (LexicalIndex): BM25 index of ingested documents; a
+                private index is used if omitted
+            candidates (int): Number of passages kept from BM25 (and from the
+                dense retriever, when there is one) before fusion
+            rrf_k (int): Reciprocal rank fusion damping constant
+            dense (bool): Whether dense re-ranking offered by backends is used
+        """
+        self.logger = logging.getLogger(__name__)
+        self.lexical_index = lexical_index if lexical_index is not None else LexicalIndex()
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.dense = dense
+
+    def lexical_scores(self, question, document, groups=None, group_count=None):
+        """
+        BM25 scores of the sentences or passages of a document, scaled to 0-1
+
+        Args:
+            question (str): Question
+            document (ProcessedDocument): Document to search
+            groups (numpy.ndarray): Passage id of each sentence (-1 to leave it
+                out), or None to score sentences
+            group_count (int): Number of passages
+
+        Returns:
+            numpy.ndarray: Score of each sentence or passage
+        """
+        scores = self.lexical_index.score(question, document, groups, group_count)
+        max_score = self.lexical_index.max_score(question)
+        return scores / max_score if max_score else scores
+
+    def retrieve(self, question, document, groups, group_count, top_k=3, candidates=None,
+                 dense=None, dense_candidates=None):
+        """
+        Find the passages of a document most relevant to a question
+
+        Args:
+            question (str): Question
+            document (ProcessedDocument): Document to search
+            groups (numpy.ndarray): Passage id of each sentence of the document,
+                -1 for sentences outside every passage
+            group_count (int): Number of passages
+            top_k (int): Number of passages returned
+            candidates (int): Number of BM25 candidates, overriding the default
+            dense (callable): Optional scorer taking an array of passage ids and
+                returning their dense similarities to the question
+            dense_candidates (list): Optional passage ids proposed by the
+                backend's own dense search, best first, added to the candidates
+
+        Returns:
+            list: (passage id, BM25 score scaled to 0-1, dense similarity or
+                None) tuples, best first
+        """
+        if not group_count:
+            return []
+        candidates = min(candidates or self.candidates, group_count)
+
+        lexical = self.lexical_scores(question, document, groups, group_count)
+        # Stable order, so passages without any question term keep document order
+        lexical_ranking = np.argsort(-lexical, kind='stable')[:candidates]
+
+        if dense is None or not self.dense:
+            return [(int(i), float(lexical[i]), None) for i in lexical_ranking[:top_k]]
+
+        pool = list(dict.fromkeys([int(i) for i in lexical_ranking] + list(dense_candidates or [])[:candidates]))
+        similarities = np.asarray(dense(np.array(pool, dtype=np.int64)), dtype=np.float32)
+        dense_by_id = dict(zip(pool, similarities.tolist()))
+
+        # Passages without any question term are left out of the lexical ranking
+        matched = [int(i) for i in lexical_ranking if lexical[i] > 0]
+        dense_ranking = [pool[i] for i in np.argsort(-similarities, kind='stable')]
+        fused = reciprocal_rank_fusion([matched, dense_ranking], self.rrf_k)
+
+        ranked = sorted(fused, key=lambda i: -fused[i])[:top_k]
+        return [(i, float(lexical[i]), dense_by_id[i]) for i in ranked]
@@ -0,0 +1,47 @@
+import contextlib
+import threading
+import time
+from urllib.parse import urlsplit
+
+class HostScheduler:
+    """Limit concurrency and request rate per host"""
+
+    def __init__(self, max_per_host=4, min_interval=0.0):
+        """
+        Args:
+            max_per_host (int): Maximum number of concurrent requests to a single host
+            min_interval (float): Minimum number of seconds between the starts of
+                two requests to the same host
+        """
+        self.max_per_host = max_per_host
+        self.min_interval = min_interval
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                # [concurrency slots, lock guarding the next start time, next start time]
+                state = [threading.BoundedSemaphore(self.max_per_host), threading.Lock(), 0.0]
+                self._hosts[host] = state
+        return state
+
+    @contextlib.contextmanager
+    def slot(self, url):
+        """
+        Wait for a free slot and the rate limit of the URL's host
+
+        Args:
+            url (str): URL about to be requested
+        """
+        state = self._host_state(urlsplit(url).netloc.lower())
+        with state[0]:
+            if self.min_interval > 0:
+                with state[1]:
+                    now = time.monotonic()
+                    start = max(now, state[2])
+                    state[2] = start + self.min_interval
+                if start > now:
+                    time.sleep(start - now)
+            yield
@@ -0,0 +1,65 @@
+import re
+
+# Patterns used by clean_text, compiled once. They reproduce the sequence of
+# substitutions ContentProcessor.process has always applied; passes are
+# skipped when their trigger characters are absent.
+_HEADING_RE = re.compile(r'##+')
+_LINK_RE = re.compile(r'\[([^\]]+)\]\([^)]+\)')
+_IMAGE_RE = re.compile(r'!\[[^\]]*\]\([^)]+\)')
+_CODE_BLOCK_RE = re.compile(r'```[^`]*```')
+_URL_RE = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+# Special characters and whitespace both collapse into a single space
+_SEPARATOR_RE = re.compile(r'[^\w.,;:\-\'"?!]+')
+
+
+class NormalizedText(str):
+    """Text whose whitespace is already collapsed to single spaces and stripped"""
+    __slots__ = ()
+
+
+def normalize_whitespace(text):
+    """
+    Collapse runs of whitespace to single spaces and strip the ends
+
+    Text that has already been normalised is returned as is.
+
+    Args:
+        text (str): Text to normalise
+
+    Returns:
+        NormalizedText: Normalised text
+    """
+    if isinstance(text, NormalizedText):
+        return text
+    return NormalizedText(' '.join(text.split()))
+
+
+def clean_text(content):
+    """
+    Strip markdown, URLs and special characters from extracted content
+
+    Produces exactly the same output as the original chain of re.sub passes
+    in ContentProcessor.process. None of the markup patterns depend on the
+    kind of whitespace they span, so whitespace is only collapsed once, in
+    the final pass together with special characters.
+
+    Args:
+        content (str): Raw content extracted from URL
+
+    Returns:
+        NormalizedText: Cleaned content
+    """
+    text = content
+    if '##' in text:
+        text = _HEADING_RE.sub('', text)
+    if '*' in text:
+        text = text.replace('*', '')
+    if '](' in text:
+        text = _LINK_RE.sub(r'\1', text)
+        if '![' in text:
+            text = _IMAGE_RE.sub('', text)
+    if '```' in text:
+        text = _CODE_BLOCK_RE.sub('', text)
+    if 'http' in text:
+        text = _URL_RE.sub('', text)
+    return NormalizedText(_SEPARATOR_RE.sub(' ', text).strip())
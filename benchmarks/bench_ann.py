@@ -0,0 +1,118 @@
+# Benchmark of the IVF approximate nearest-neighbour index for dense retrieval
+#
+# Fills a temporary embedding store with clustered synthetic chunk embeddings
+# (one matrix per "page"), indexes them and reports recall@k and query latency
+# against exact search, for several n_probe values, over the whole corpus and
+# over a subset of pages as a request with a URL list would see it. Each
+# in-memory vector encoding (float16, int8, binary with full-precision
+# rescoring) is reported with its bytes per vector.
+#
+# Usage:
+#   python benchmarks/bench_ann.py [--pages N] [--chunks N] [--dim N] [--lists N] [--k N]
+#                                  [--quantization float16,int8,binary] [--rescore N]
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.ann_index import IVFIndex
+from backend.services.embedding_store import EmbeddingStore, normalize_rows
+
+NAMESPACE = "bench/chunks"
+
+
+def synthetic_pages(rng, pages, chunks, dim, topics=200):
+    """Chunk embeddings of pages that each mix a few topics"""
+    centres = normalize_rows(rng.standard_normal((topics, dim)))
+    for _ in range(pages):
+        page_topics = rng.choice(topics, 3, replace=False)
+        picked = centres[rng.choice(page_topics, chunks)]
+        yield normalize_rows(picked + 0.6 * rng.standard_normal((chunks, dim)) / np.sqrt(dim))
+
+
+def exact_search(store, documents, query, k):
+    """Reference search scoring every chunk of the requested pages"""
+    results = []
+    for url, content_hash in documents.items():
+        scores = np.asarray(store.get(NAMESPACE, content_hash) @ query, dtype=np.float32)
+        for row in np.argsort(-scores)[:k]:
+            results.append((url, int(row), float(scores[row])))
+    results.sort(key=lambda result: -result[2])
+    return results[:k]
+
+
+def measure(index, store, documents, queries, k, n_probe):
+    """Average recall@k and latency of the index, and latency of exact search"""
+    recall, ann_time, exact_time = 0.0, 0.0, 0.0
+    for query in queries:
+        start = time.perf_counter()
+        results, _ = index.search(query, documents, k, n_probe=n_probe)
+        ann_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = exact_search(store, documents, query, k)
+        exact_time += time.perf_counter() - start
+
+        found = {(url, row) for url, row, _ in results}
+        recall += len(found & {(url, row) for url, row, _ in expected}) / len(expected)
+    return recall / len(queries), ann_time / len(queries), exact_time / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the IVF index against exact search')
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--chunks', type=int, default=50, help='Chunks per page')
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--lists', type=int, default=256)
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--subset', type=int, default=200, help='Pages in the restricted search')
+    parser.add_argument('--quantization', default='float16,int8,binary', help='Comma-separated vector encodings')
+    parser.add_argument('--rescore', type=int, default=None, help='Candidates rescored per result when quantised')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directory:
+        store = EmbeddingStore(os.path.join(directory, 'embeddings'))
+        documents = {}
+        for page, matrix in enumerate(synthetic_pages(rng, args.pages, args.chunks, args.dim)):
+            url, content_hash = f"https://example.com/{page}", f"{page:040x}"
+            store.put(NAMESPACE, content_hash, matrix)
+            documents[url] = content_hash
+
+        # Queries close to stored chunks, as questions are close to their answers
+        queries = []
+        for _ in range(args.queries):
+            url = list(documents)[rng.integers(args.pages)]
+            row = store.get(NAMESPACE, documents[url])[rng.integers(args.chunks)].astype(np.float32)
+            queries.append(normalize_rows(row + 0.3 * rng.standard_normal(args.dim) / np.sqrt(args.dim))[0])
+        subset = dict(list(documents.items())[:args.subset])
+
+        for quantization in args.quantization.split(','):
+            path = os.path.join(directory, f'ann-{quantization}.sqlite3')
+            index = IVFIndex(path, store, NAMESPACE, n_lists=args.lists, min_train_size=args.pages * args.chunks,
+                             quantization=quantization, rescore=args.rescore)
+            start = time.perf_counter()
+            for url, content_hash in documents.items():
+                index.add(url, content_hash)
+            print(f"{quantization}: indexed {len(index)} vectors from {args.pages} pages in "
+                  f"{time.perf_counter() - start:.1f} s, {index.memory_usage() / len(index):.1f} bytes per vector "
+                  f"(float32: {args.dim * 4})")
+
+            for label, requested in (("all pages", documents), (f"{len(subset)} pages", subset)):
+                for n_probe in (1, 4, 8, 16, 32):
+                    recall, ann_time, exact_time = measure(index, store, requested, queries, args.k, n_probe)
+                    print(f"{label:>10}  n_probe {n_probe:3d}   recall@{args.k} {recall:5.3f}   "
+                          f"ivf {ann_time * 1000:7.2f} ms   exact {exact_time * 1000:7.2f} ms")
+
+            # Reopening reads the document table and centroids back from disk
+            start = time.perf_counter()
+            reopened = IVFIndex(path, store, NAMESPACE, n_lists=args.lists, quantization=quantization)
+            print(f"Reloaded {len(reopened)} vectors in {time.perf_counter() - start:.1f} s")
+
+if __name__ == '__main__':
+    main()
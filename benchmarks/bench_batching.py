@@ -0,0 +1,94 @@
+# Throughput and latency of concurrent DistilBERT requests with and without
+# the micro-batching scheduler
+#
+# At each concurrency level, that many threads answer questions from the
+# fixed question set over the same document as fast as they can, as request
+# handlers would under load. Without batching every request runs its own
+# forward passes; with it, requests arriving within the wait window share
+# one padded batch. Latency is per request, queueing included.
+#
+# Usage:
+#   python benchmarks/bench_batching.py [--concurrency 1,4,16] [--requests N] [--wait-ms MS] [--max-batch N] [--threads N]
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.qa_model_distilbert import DistilBERTQuestionAnsweringModel
+from bench_onnx import FACTS, build_document
+
+
+def run(model, document, questions, concurrency, requests):
+    """
+    Answer requests questions from concurrency threads
+
+    Returns:
+        tuple: (elapsed seconds, list of request latencies in seconds)
+    """
+    latencies = []
+    lock = threading.Lock()
+    remaining = iter(range(requests))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(remaining, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            model.answer_question(questions[i % len(questions)], document)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark micro-batching of concurrent DistilBERT requests')
+    parser.add_argument('--concurrency', default='1,4,16')
+    parser.add_argument('--requests', type=int, default=32, help='Requests per concurrency level and mode')
+    parser.add_argument('--wait-ms', type=float, default=5)
+    parser.add_argument('--max-batch', type=int, default=32)
+    parser.add_argument('--threads', type=int, default=None, help='PyTorch threads')
+    args = parser.parse_args()
+
+    document = build_document()
+    questions = [question for _, question in FACTS]
+    models = {
+        'off': DistilBERTQuestionAnsweringModel(num_threads=args.threads),
+        'on': DistilBERTQuestionAnsweringModel(
+            num_threads=args.threads, batch_wait_ms=args.wait_ms, max_batch_size=args.max_batch
+        )
+    }
+    for model in models.values():
+        # The first question pays for lazy initialisation
+        model.answer_question(questions[0], document)
+
+    print(f"{'threads':>7} {'batching':>8} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'req/batch':>10}")
+    for concurrency in (int(level) for level in args.concurrency.split(',')):
+        for mode, model in models.items():
+            before = model.batcher.stats() if model.batcher is not None else None
+            elapsed, latencies = run(model, document, questions, concurrency, args.requests)
+            per_batch = ''
+            if before is not None:
+                after = model.batcher.stats()
+                per_batch = f"{(after['requests'] - before['requests']) / (after['batches'] - before['batches']):.1f}"
+            latencies = np.array(latencies) * 1000
+            print(f"{concurrency:>7} {mode:>8} {len(latencies) / elapsed:7.2f} {np.percentile(latencies, 50):8.1f} "
+                  f"{np.percentile(latencies, 95):8.1f} {per_batch:>10}")
+
+
+if __name__ == '__main__':
+    main()
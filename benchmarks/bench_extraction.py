@@ -0,0 +1,104 @@
+# Compare the html2text and lxml extraction engines on saved HTML pages
+#
+# Usage:
+#   python benchmarks/bench_extraction.py [DIRECTORY_OF_HTML_FILES] [--repeat N]
+#
+# Without a directory a set of synthetic documentation-style pages is generated.
+import argparse
+import glob
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.extractor import ContentExtractor
+from backend.services.processor import ContentProcessor
+
+
+def synthetic_pages(count=20, sections=60):
+    """Generate documentation-like pages with navigation, scripts and markup"""
+    pages = []
+    for page in range(count):
+        body = []
+        for section in range(sections):
+            body.append(
+                f"<h2>Section {section}</h2>"
+                f"<p>The <b>option {section}</b> controls how page {page} behaves. "
+                f"See <a href='/docs/{section}.html'>the reference</a> for details, "
+                f"or read the <em>café</em> guide.</p>"
+                f"<ul><li>First item {section}</li><li>Second item {section}</li></ul>"
+                f"<pre>config.set('option{section}', True)</pre>"
+            )
+        html = (
+            "<html><head><meta charset='utf-8'><title>Page {0}</title>"
+            "<style>body {{ color: black; }}</style></head><body>"
+            "<nav>{1}</nav><main>{2}</main><footer>Copyright</footer>"
+            "<script>var tracking = true;</script></body></html>"
+        ).format(page, "".join(f"<a href='/{i}'>Link {i}</a>" for i in range(50)), "".join(body))
+        pages.append((f"synthetic-{page}.html", html.encode('utf-8')))
+    return pages
+
+
+def load_pages(directory):
+    """Load saved HTML files from a directory"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.htm*'))):
+        with open(path, 'rb') as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def make_response(name, body):
+    """Wrap saved bytes in a Response as if they had been fetched"""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = f"file://{name}"
+    response.headers['Content-Type'] = 'text/html'
+    response._content = body
+    response._content_consumed = True
+    return response
+
+
+def run(engine, pages, repeat):
+    extractor = ContentExtractor(engine=engine)
+    processor = ContentProcessor()
+    outputs = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        outputs = [processor.process(extractor.parse(make_response(name, body))) for name, body in pages]
+    elapsed = time.perf_counter() - start
+    return elapsed, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare extraction engines on saved HTML pages')
+    parser.add_argument('directory', nargs='?', help='Directory of saved .html files')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_pages(args.directory) if args.directory else synthetic_pages()
+    if not pages:
+        print("No HTML pages found")
+        return
+
+    total_bytes = sum(len(body) for _, body in pages) * args.repeat
+    results = {}
+    for engine in ('html2text', 'lxml'):
+        elapsed, outputs = run(engine, pages, args.repeat)
+        results[engine] = outputs
+        print(
+            f"{engine:10s} {elapsed:8.3f}s  "
+            f"{len(pages) * args.repeat / elapsed:8.1f} pages/s  "
+            f"{total_bytes / elapsed / 1e6:6.2f} MB/s  "
+            f"{sum(len(o) for o in outputs)} chars of text"
+        )
+
+    identical = sum(a == b for a, b in zip(results['html2text'], results['lxml']))
+    print(f"Processed output identical for {identical}/{len(pages)} pages")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# Micro-benchmark of ContentProcessor text cleaning on large inputs
+#
+# Compares the fused, precompiled normaliser against the original chain of
+# re.sub passes and checks that both produce identical output.
+#
+# Usage:
+#   python benchmarks/bench_normalizer.py [--size-mb N] [--repeat N]
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.text_normalizer import clean_text, normalize_whitespace
+
+
+def legacy_process(content):
+    """The original ContentProcessor.process substitution chain"""
+    processed = re.sub(r'\s+', ' ', content)
+    processed = re.sub(r'##+', '', processed)
+    processed = re.sub(r'\*\*|\*', '', processed)
+    processed = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', processed)
+    processed = re.sub(r'!\[[^\]]*\]\([^)]+\)', '', processed)
+    processed = re.sub(r'```[^`]*```', '', processed)
+    processed = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', processed)
+    processed = re.sub(r'\n+', '\n', processed)
+    processed = re.sub(r'[^\w\s\.\,\;\:\-\'\"\?\!]', ' ', processed)
+    processed = re.sub(r'\s+', ' ', processed).strip()
+    return processed
+
+
+def markdown_document(size):
+    """Build html2text-style markdown of roughly the given size in characters"""
+    block = (
+        "## Installing the *client*\n\n"
+        "Run **pip install client** and see [the guide](https://example.com/guide?x=1) "
+        "for details. ![logo](/img/logo.png) Prices start at $5 (VAT incl.) — café & co.\n\n"
+        "```\nclient.connect(host='localhost')\n```\n\n"
+        "  * Item one\n  * Item two\t\twith tabs\n\n"
+    )
+    return block * (size // len(block) + 1)
+
+
+def random_document(rng, length=400):
+    """Random mix of markup and special characters for equivalence checking"""
+    alphabet = "ab #*[]()!`h:/ps.\n\t\u00a0é,;-'\"?$%_"
+    tokens = ["http://", "https://", "```", "](", "![", "##", "**"]
+    parts = []
+    while sum(len(p) for p in parts) < length:
+        if rng.random() < 0.2:
+            parts.append(rng.choice(tokens))
+        else:
+            parts.append(rng.choice(alphabet))
+    return "".join(parts)
+
+
+def timed(function, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function(text)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the content normaliser')
+    parser.add_argument('--size-mb', type=float, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fuzz', type=int, default=5000, help='Random documents checked for equivalence')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for _ in range(args.fuzz):
+        document = random_document(rng)
+        assert clean_text(document) == legacy_process(document), repr(document)
+    print(f"Equivalent on {args.fuzz} random documents")
+
+    document = markdown_document(int(args.size_mb * 1024 * 1024))
+    legacy_time, legacy_output = timed(legacy_process, document, args.repeat)
+    fused_time, fused_output = timed(clean_text, document, args.repeat)
+    assert legacy_output == fused_output
+    print(f"process  legacy {legacy_time * 1000:8.1f} ms   fused {fused_time * 1000:8.1f} ms   "
+          f"speed-up {legacy_time / fused_time:4.1f}x on {len(document) / 1e6:.1f}M chars")
+
+    # What each QA backend used to redo per question on already-processed content
+    legacy_time, _ = timed(lambda text: re.sub(r'\s+', ' ', text).strip(), fused_output, args.repeat)
+    reuse_time, _ = timed(normalize_whitespace, fused_output, args.repeat)
+    print(f"backend preprocessing  legacy {legacy_time * 1000:8.1f} ms   reused {reuse_time * 1000:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# Latency, throughput, memory and answer agreement of the DistilBERT
+# inference engines: eager PyTorch, ONNX Runtime and ONNX Runtime over the
+# int8 dynamically quantised graph
+#
+# Every engine answers the same fixed question set over the same document.
+# Agreement is the share of answers identical to the PyTorch answers; RSS
+# is the growth of the process's resident memory while loading the engine,
+# exporting the graph if needed.
+#
+# Usage:
+#   python benchmarks/bench_onnx.py [--engines torch,onnx,onnx-int8] [--threads N] [--repeat N] [--onnx-dir DIR]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.qa_model_distilbert import DistilBERTQuestionAnsweringModel
+
+FACTS = [
+    ("The library was founded in 1892 by Margaret Hale.", "Who founded the library?"),
+    ("Its main reading room seats 340 readers under a glass dome.", "How many readers does the reading room seat?"),
+    ("The building was designed by the architect Thomas Ward.", "Who designed the building?"),
+    ("In 1954 a fire destroyed the east wing and 20,000 books.", "When did a fire destroy the east wing?"),
+    ("The collection moved to Riverside Avenue in 1978.", "Where did the collection move in 1978?"),
+    ("Today the library holds about 2.3 million volumes.", "How many volumes does the library hold?"),
+    ("Admission is free for residents of the county.", "Who can enter for free?"),
+    ("The rare books department opened in 1921.", "When did the rare books department open?"),
+]
+
+FILLER = (
+    "Visitors often spend the afternoon in the gardens behind the main hall. "
+    "Guided tours leave from the entrance every hour during the summer months. "
+    "The café on the ground floor serves coffee and light lunches. "
+)
+
+
+def build_document(paragraphs=12):
+    """A document with the facts spread between paragraphs of filler"""
+    blocks = []
+    for i in range(paragraphs):
+        block = FILLER * 3
+        if i < len(FACTS):
+            block += FACTS[i][0]
+        blocks.append(block)
+    return "\n\n".join(blocks)
+
+
+def rss_bytes():
+    """Current resident set size of the process"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DistilBERT inference engines')
+    parser.add_argument('--engines', default='torch,onnx,onnx-int8')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='PyTorch threads and ONNX Runtime intra-op threads')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--onnx-dir', default=None, help='Exported models; a temporary directory if omitted')
+    args = parser.parse_args()
+
+    onnx_dir = args.onnx_dir or tempfile.mkdtemp(prefix='onnx-')
+    document = build_document()
+    questions = [question for _, question in FACTS]
+    reference = None
+
+    print(f"{'engine':<10} {'load MB':>8} {'p50 ms':>8} {'p95 ms':>8} {'q/s':>7} {'agreement':>10}")
+    for engine in args.engines.split(','):
+        before = rss_bytes()
+        model = DistilBERTQuestionAnsweringModel(
+            num_threads=args.threads, engine=engine, onnx_dir=onnx_dir, intra_op_threads=args.threads
+        )
+        # The first question pays for lazy initialisation in either runtime
+        model.answer_question(questions[0], document)
+        loaded = rss_bytes() - before
+
+        latencies = []
+        answers = []
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            answers = []
+            for question in questions:
+                question_start = time.perf_counter()
+                answers.append(model.answer_question(question, document)[0])
+                latencies.append(time.perf_counter() - question_start)
+        elapsed = time.perf_counter() - start
+
+        if reference is None:
+            reference = answers
+        agreement = sum(a == b for a, b in zip(answers, reference)) / len(questions)
+        latencies = np.array(latencies) * 1000
+        print(f"{model.engine:<10} {loaded / 2**20:8.0f} {np.percentile(latencies, 50):8.1f} "
+              f"{np.percentile(latencies, 95):8.1f} {len(latencies) / elapsed:7.2f} {agreement:10.0%}")
+        del model
+
+
+if __name__ == '__main__':
+    main()
@@ -37,6 +37,8 @@ const Answer = ({ answer }) => {
         return 'NLTK Advanced';
       case 'distilbert':
         return 'DistilBERT';
+      case 'sentence-transformer':
+        return 'Sentence Transformer';
       default:
         return 'TF-IDF + spaCy';
     }
@@ -87,6 +89,19 @@ const Answer = ({ answer }) => {
             </small>
           </div>
         )}
+
+        {answer.stages && (
+          <div className="mt-2">
+            <small className="text-muted">
+              <strong>Stages:</strong>{' '}
+              {answer.stages.map((stage) => (
+                stage.skipped
+                  ? `${getModelDisplayName(stage.model)} (skipped)`
+                  : `${getModelDisplayName(stage.model)} ${formatConfidence(stage.confidence)} in ${Math.round(stage.time_ms)} ms`
+              )).join(' → ')}
+            </small>
+          </div>
+        )}
       </Card.Body>
     </Card>
   );
@@ -69,6 +69,7 @@ const QuestionInput = ({
         confidence: response.data.confidence,
         context: response.data.context,
         model_used: response.data.model_used,
+        stages: response.data.stages,
         timestamp: new Date().toISOString()
       };
       